@@ -14,6 +14,9 @@ osu.scores_db.load_pp()
 avg_map_length = sum([beatmap.length for beatmap in osu.osu_db.map_list()]) / float(len(osu.osu_db.map_list()))
 print(timedelta(milliseconds=avg_map_length))
 
+# Same thing using the columnar view of the maps (requires numpy)
+print(timedelta(milliseconds=float(osu.osu_db.table()["length"].mean())))
+
 # Get all top 100 ranked scores before 2020 and print
 scores = osu.scores_db.get_best_scores_before(datetime.datetime(year=2019, month=3, day=1, tzinfo=timezone.utc), names=["flubb 4", "ito", "biglizard"], ranked_only=False)
 for x, score in enumerate(scores[:10]):
@@ -2,13 +2,14 @@ import osutools
 import discord
 from discord.ext import commands
 
-osu = osutools.OsuClientV1("token")
+# the async client doesn't block the bot's event loop while waiting on the api
+osu = osutools.AsyncOsuClientV1("token", max_concurrency=64, timeout=10)
 bot = commands.Bot(command_prefix="!")
 
 
 @bot.command(name="profile")
 async def profile(ctx, *, username):
-    user = osu.fetch_user(username=username)
+    user = await osu.fetch_user(username=username)
     embed = discord.Embed(title=f"osu! Profile for {user.username}")
     embed.set_thumbnail(url=user.avatar_url)
     embed.add_field(name="Rank", value=f"#{user.rank}")
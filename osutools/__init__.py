@@ -1,8 +1,28 @@
 from .osuclient import OsuClientV1
+from .asyncclient import AsyncOsuClientV1
+from .transport import (
+    Transport,
+    HTTPTransport,
+    LocalTransport,
+    AsyncTransport,
+    AiohttpTransport,
+    ThreadedTransport,
+)
+from .ratelimit import RequestScheduler, Priority
+from .cache import ResponseCache, CachePolicy
+from .bulk import BulkResult
+from .mirror import BeatmapMirror
+from .watcher import RecentScoreWatcher
 from .user import User
 from .map import Map, LocalMap
 from .score import Score, RecentScore, MultiScore, LocalScore
-from .match import Match, Game
-from .db import OsuDB, ScoresDB, Collections
+from .match import Match, Game, MatchTracker, MatchEvent, MatchEventType
+from .db import OsuDB, ScoresDB, Collections, DbDiff, Mapset
+from .ppstore import PPStore
+from .filecache import OsuFileCache
+from .table import MapTable
+from .query import Query
+from .textindex import TextIndex
+from .pphistory import PPHistory
 from . import utils
 from . import exceptions
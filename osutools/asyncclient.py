@@ -0,0 +1,404 @@
+import asyncio
+
+from .osuclient import OsuClientV1
+from .utils import *
+from .transport import AsyncTransport, AiohttpTransport, ThreadedTransport, aiohttp
+from .ratelimit import RequestScheduler, Priority, lane
+from .cache import ResponseCache, CacheState, request_key
+from .bulk import AsyncSingleFlight, run_many_async
+from .exceptions import RequestException
+
+
+class AsyncOsuClientV1(OsuClientV1):
+    """asyncio version of OsuClientV1. Every fetch_* method is a coroutine with the same arguments as the blocking
+    client, plus an optional per-call timeout, and returns the same User/Score/Map/Match objects. Helper methods on
+    those objects that make api calls (e.g. Score.fetch_map) return coroutines when they came from this client.
+
+    Attributes:
+        api_key (str): the api key for your osu! application
+        transport (AsyncTransport): the http layer requests are sent through
+        max_concurrency (int): maximum number of requests in flight at once
+        timeout (float): default number of seconds a fetch can take before raising asyncio.TimeoutError (None to wait
+            forever)
+    """
+
+    def __init__(
+        self,
+        key: str,
+        transport: AsyncTransport = None,
+        max_concurrency: int = 32,
+        timeout: float = None,
+        rate_limit: float = None,
+        scheduler: RequestScheduler = None,
+        cache: ResponseCache = None,
+        lazy_models: bool = False,
+    ):
+        """Initialise the client with an api key.
+
+        Args:
+            key: The api key for your osu! application.
+            transport: the http layer to send requests through. Defaults to an AiohttpTransport if aiohttp is
+                installed, otherwise a pooled HTTPTransport running on a thread pool.
+            max_concurrency: maximum number of requests in flight at once, further calls wait for a free slot
+            timeout: default number of seconds a fetch can take before raising asyncio.TimeoutError
+            rate_limit: maximum requests per minute to send, creates a RequestScheduler with default settings
+            scheduler: a RequestScheduler to wait in before each request, to share one key's budget between clients
+            cache: a ResponseCache to answer repeated requests from
+            lazy_models: make returned objects only convert the fields that are actually read
+        """
+        if transport is None:
+            if aiohttp is not None:
+                transport = AiohttpTransport(pool_size=max_concurrency)
+            else:
+                transport = ThreadedTransport(max_workers=max_concurrency)
+        super().__init__(
+            key,
+            transport=transport,
+            rate_limit=rate_limit,
+            scheduler=scheduler,
+            cache=cache,
+            lazy_models=lazy_models,
+        )
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        self._in_flight = AsyncSingleFlight()
+
+    async def _request_api(self, url: str, params: dict, timeout: float = None, cache: bool = True):
+        """Private method to generalise api requests.
+
+        Args:
+            url: the api endpoint to request to (e.g. "get_user")
+            params: dict of prepared parameters for the endpoint you are attempting to request
+            timeout: seconds to wait for the rate limiter, a concurrency slot and the response, defaults to the
+                client's timeout
+            cache: whether the response cache may be used, if the client has one. Identical requests in flight are
+                merged either way
+
+        Returns:
+            dict: results of the api request (or None if unsuccessful)
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        # identical requests made while one is already in flight wait for and share its response
+        key = request_key(url, params)
+        if not cache or self.cache is None or not self.cache.cacheable(url):
+            return await asyncio.wait_for(
+                self._in_flight.do(key, self._send, url, params), timeout
+            )
+        state, response = self.cache.lookup(key)
+        if state == CacheState.STALE and self.cache.begin_refresh(key):
+            asyncio.ensure_future(self._refresh(url, params, key))
+        if state != CacheState.MISS:
+            return response
+        return await asyncio.wait_for(
+            self._in_flight.do(key, self._send_and_store, url, params, key), timeout
+        )
+
+    async def _send(self, url: str, params: dict):
+        """Send a request to the api, bypassing the cache.
+
+        Args:
+            url: the api endpoint to request to (e.g. "get_user")
+            params: dict of prepared parameters for the endpoint you are attempting to request
+
+        Returns:
+            dict: results of the api request (or None if unsuccessful)
+        """
+        # created here rather than in __init__ so it belongs to the loop the client is used from
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        params = dict(params, k=self.api_key)
+        if self.scheduler is not None:
+            await self.scheduler.acquire_async()
+        async with self._semaphore:
+            body = await self.transport.get(url, params)
+        return self._read_response(body)
+
+    async def _send_and_store(self, url: str, params: dict, key):
+        response = await self._send(url, params)
+        self.cache.put(key, response)
+        return response
+
+    async def _refresh(self, url: str, params: dict, key):
+        """Re-request a stale cached response in the background."""
+        try:
+            with lane(Priority.BULK):
+                self.cache.put(
+                    key, await asyncio.wait_for(self._send(url, params), self.timeout)
+                )
+        except (Exception, RequestException):
+            # the stale response keeps being served until it expires or a refresh succeeds
+            pass
+        finally:
+            self.cache.end_refresh(key)
+
+    async def fetch_user(
+        self,
+        user_id: int = None,
+        username: str = None,
+        mode: Mode = Mode.STANDARD,
+        timeout: float = None,
+    ):
+        """Make an api request to get information about a given user.
+
+        Args:
+            user_id: id of the user
+            username: name of the user
+            mode: enum representing the osu! gamemode you want the information for
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            osupy.User: User object representing the requested user
+        """
+        params = self._user_query(user_id, username, mode)
+        if params is None:
+            return
+        return self._parse_user(await self._request_api("get_user", params, timeout))
+
+    async def fetch_scores(
+        self,
+        map_id: int,
+        username: str = None,
+        user_id: int = None,
+        mode: Mode = Mode.STANDARD,
+        mods: Mods = None,
+        limit: int = 50,
+        timeout: float = None,
+    ):
+        """Make an api request to retrieve information about scores on a given beatmap.
+
+        Args:
+            map_id: the id of the beatmap to retrieve scores for
+            username: username of a player to filter by
+            user_id: id of a player to filter by
+            mode: enum representing the osu! gamemode you want information for
+            mods: enum representing the mod combination to filter by
+            limit: number of scores to retrieve (max 100)
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            [Score]: List of Score objects containing information about a given score
+        """
+        params = self._scores_query(map_id, username, user_id, mode, mods, limit)
+        return self._parse_scores(
+            await self._request_api("get_scores", params, timeout), map_id
+        )
+
+    async def fetch_map(self, map_id: int, timeout: float = None):
+        """Wrapper for the api call of selecting a map from an id and taking the first one.
+
+        Args:
+            map_id: the map to get information for
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            Map: Map object containing information about the map requested
+        """
+        return (await self.fetch_maps(map_id=map_id, timeout=timeout))[0]
+
+    async def fetch_maps(
+        self,
+        set_id: int = None,
+        map_id: int = None,
+        username: str = None,
+        user_id: int = None,
+        map_hash: str = None,
+        mode: Mode = Mode.STANDARD,
+        converts: bool = False,
+        limit: int = 500,
+        mods: Mods = Mods.NM,
+        since: datetime = None,
+        timeout: float = None,
+    ):
+        """Api call to search osu!'s beatmap pool.
+
+        Args:
+            set_id: the id of a beatmapset to filter by
+            map_id: the id of a specific map to return
+            username: filter by mapper's username
+            user_id: filter by mapper's id
+            map_hash: the md5 hash of a beatmap
+            mode: enum representing the osu! gamemode to filter by
+            converts: whether to include converted maps for a gamemode
+            limit: number of maps to return (max and default 500)
+            mods: enum representing the mod combination to filter by
+            since: limit beatmaps found to between this date and the present
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            [Map]: List of Map objects containing information about the maps requested
+        """
+        params = self._maps_query(
+            set_id, map_id, username, user_id, map_hash, mode, converts, limit, mods, since
+        )
+        return self._parse_maps(await self._request_api("get_beatmaps", params, timeout))
+
+    async def fetch_user_best(
+        self,
+        username: str = None,
+        user_id: int = None,
+        mode: Mode = Mode.STANDARD,
+        limit: int = 10,
+        timeout: float = None,
+    ):
+        """Api request to find a users best scores.
+
+        Args:
+            username: username of user
+            user_id: id of a user
+            mode: enum representing mode to get the top plays from
+            limit: number of best scores to retrieve (max 100)
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            [Score]: List of Score objects representing the user's best plays
+        """
+        params = self._user_best_query(username, user_id, mode, limit)
+        if params is None:
+            return
+        return self._parse_user_best(
+            await self._request_api("get_user_best", params, timeout)
+        )
+
+    async def fetch_user_recent(
+        self,
+        username: str = None,
+        user_id: int = None,
+        mode: Mode = Mode.STANDARD,
+        limit: int = 10,
+        timeout: float = None,
+    ):
+        """Api request to retrieve a user's recent scores (within the last 24 hours).
+
+        Args:
+            username: username of user
+            user_id: id of user
+            mode: enum representing osu! gamemode to retrieve scores for
+            limit: number of scores to retrieve (max 100)
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            [RecentScore]: List of RecentScore objects representing a user's recent plays
+        """
+        params = self._user_recent_query(username, user_id, mode, limit)
+        return self._parse_user_recent(
+            await self._request_api("get_user_recent", params, timeout)
+        )
+
+    async def fetch_replay(self, score_id: int, timeout: float = None):
+        """Api request to fetch a replay for a given score
+
+        Args:
+            score_id: score to retrieve replay for
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            str: base64 representation of LZMA stream, not .osr file.
+        """
+        return self._parse_replay(
+            await self._request_api("get_replay", {"s": score_id}, timeout)
+        )
+
+    async def fetch_match(self, match_id: int, timeout: float = None):
+        """Api request to fetch details about a given multiplayer lobby, past or ongoing
+
+        Args:
+            match_id: id of the match
+            timeout: seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            Match: Match object representing all the information available about the match requested.
+        """
+        return self._parse_match(
+            await self._request_api("get_match", {"mp": match_id}, timeout)
+        )
+
+    async def fetch_maps_many(
+        self,
+        map_ids,
+        mode: Mode = Mode.STANDARD,
+        concurrency: int = 8,
+        priority: Priority = Priority.BULK,
+    ):
+        """Fetch many maps at once. Duplicate ids are only requested once, and identical requests already in flight
+        from elsewhere are shared rather than repeated.
+
+        Args:
+            map_ids: ids of the maps to fetch
+            mode: enum representing the osu! gamemode to get the maps for
+            concurrency: maximum number of requests running at once
+            priority: rate limiter lane the requests run in
+
+        Returns:
+            [BulkResult]: a result for each id in map_ids, in the same order, whose value is the Map (or None if no
+            map has that id). An id that fails has error set instead of failing the whole batch.
+        """
+
+        async def fetch(map_id):
+            maps = await self.fetch_maps(map_id=map_id, mode=mode)
+            return maps[0] if maps else None
+
+        return await run_many_async(fetch, map_ids, concurrency, priority)
+
+    async def fetch_users_many(
+        self,
+        users,
+        mode: Mode = Mode.STANDARD,
+        concurrency: int = 8,
+        priority: Priority = Priority.BULK,
+    ):
+        """Fetch many users at once. Duplicates are only requested once.
+
+        Args:
+            users: user ids (ints) and/or usernames (strs) to fetch
+            mode: enum representing the osu! gamemode you want the information for
+            concurrency: maximum number of requests running at once
+            priority: rate limiter lane the requests run in
+
+        Returns:
+            [BulkResult]: a result for each item of users, in the same order, whose value is the User (or None if
+            they don't exist)
+        """
+
+        async def fetch(user):
+            if isinstance(user, str):
+                return await self.fetch_user(username=user, mode=mode)
+            return await self.fetch_user(user_id=user, mode=mode)
+
+        return await run_many_async(fetch, users, concurrency, priority)
+
+    async def fetch_user_best_many(
+        self,
+        user_ids,
+        mode: Mode = Mode.STANDARD,
+        limit: int = 100,
+        concurrency: int = 8,
+        priority: Priority = Priority.BULK,
+    ):
+        """Fetch the best scores of many users at once. Duplicates are only requested once.
+
+        Args:
+            user_ids: ids of the users
+            mode: enum representing mode to get the top plays from
+            limit: number of best scores to retrieve per user (max 100)
+            concurrency: maximum number of requests running at once
+            priority: rate limiter lane the requests run in
+
+        Returns:
+            [BulkResult]: a result for each id in user_ids, in the same order, whose value is the list of Scores
+        """
+
+        async def fetch(user_id):
+            return await self.fetch_user_best(user_id=user_id, mode=mode, limit=limit)
+
+        return await run_many_async(fetch, user_ids, concurrency, priority)
+
+    async def close(self):
+        """Close the connections held by the client's transport."""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .ratelimit import Priority, lane
+from .exceptions import RequestException
+
+
+class BulkResult:
+    """Outcome of one item of a bulk fetch. A failed item doesn't fail the rest of the batch, it just has error set.
+
+    Attributes:
+        key: the id/name that was requested
+        value: what the fetch returned (None if the item failed or didn't exist)
+        error: the exception raised while fetching the item, or None if it succeeded
+    """
+
+    def __init__(self, key, value=None, error: BaseException = None):
+        self.key = key
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def unwrap(self):
+        """Get the value, re-raising the item's error if it failed.
+
+        Returns:
+            object: the fetched value
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"{self.key}: failed with {self.error!r}"
+        return f"{self.key}: {self.value}"
+
+
+def _unique(keys):
+    return list(dict.fromkeys(keys))
+
+
+def run_many(fetch, keys, workers: int = 8, priority: Priority = Priority.BULK, owner=None):
+    """Run a blocking fetch for every key on a thread pool.
+
+    Args:
+        fetch: function taking a key and returning its value
+        keys: keys to fetch, duplicates are only fetched once
+        workers: maximum number of fetches running at once
+        priority: rate limiter lane the fetches run in
+        owner: rate limiter owner the fetches run as
+
+    Returns:
+        [BulkResult]: a result for each key, in the same order as keys
+    """
+    keys = list(keys)
+
+    def run(key):
+        with lane(priority, owner):
+            try:
+                return BulkResult(key, fetch(key))
+            except (Exception, RequestException) as e:
+                return BulkResult(key, error=e)
+
+    unique = _unique(keys)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique) or 1))) as executor:
+        results = dict(zip(unique, executor.map(run, unique)))
+    return [results[key] for key in keys]
+
+
+async def run_many_async(
+    fetch, keys, concurrency: int = 8, priority: Priority = Priority.BULK, owner=None
+):
+    """Run a fetch coroutine for every key, at most concurrency at a time.
+
+    Args:
+        fetch: coroutine function taking a key and returning its value
+        keys: keys to fetch, duplicates are only fetched once
+        concurrency: maximum number of fetches running at once
+        priority: rate limiter lane the fetches run in
+        owner: rate limiter owner the fetches run as
+
+    Returns:
+        [BulkResult]: a result for each key, in the same order as keys
+    """
+    keys = list(keys)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(key):
+        async with semaphore:
+            with lane(priority, owner):
+                try:
+                    return BulkResult(key, await fetch(key))
+                except asyncio.CancelledError:
+                    raise
+                except (Exception, RequestException) as e:
+                    return BulkResult(key, error=e)
+
+    unique = _unique(keys)
+    results = dict(zip(unique, await asyncio.gather(*[run(key) for key in unique])))
+    return [results[key] for key in keys]
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Merges concurrent calls for the same key into one: the first caller runs the function and everyone who asks for
+    the same key while it's running waits for and shares its result (or exception)."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        """Run fn(*args) unless a call for key is already in flight, in which case wait for that one.
+
+        Args:
+            key: hashable key identifying the call
+            fn: function to run
+            *args: arguments to pass to fn
+
+        Returns:
+            object: what fn returned
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn(*args)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class _AsyncCall:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight, for coroutines running on one event loop. A caller being cancelled only cancels
+    the shared call if nobody else is still waiting for it."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def _forget(self, key, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, fn, *args):
+        """Await fn(*args) unless a call for key is already in flight, in which case wait for that one.
+
+        Args:
+            key: hashable key identifying the call
+            fn: coroutine function to run
+            *args: arguments to pass to fn
+
+        Returns:
+            object: what fn returned
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn(*args)))
+            call.future.add_done_callback(lambda _: self._forget(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.future)
+        except asyncio.CancelledError:
+            if call.waiters == 1:
+                call.future.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def __len__(self):
+        return len(self._calls)
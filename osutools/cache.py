@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+class CacheState(Enum):
+    """Result of looking a request up in the cache"""
+
+    MISS = 0
+    FRESH = 1
+    STALE = 2
+
+
+def beatmaps_ttl(maps_json):
+    """get_beatmaps responses made up of only ranked, approved or loved maps are effectively immutable, anything else
+    (pending, wip, graveyard, qualified) can still be updated by its mapper."""
+    if maps_json and all(map_info["approved"] in ("1", "2", "4") for map_info in maps_json):
+        return 7 * DAY
+    return 10 * MINUTE
+
+
+def match_ttl(match_json):
+    """Finished matches never change, ongoing ones change every game."""
+    if match_json and match_json["match"]["end_time"]:
+        return DAY
+    return 5
+
+
+def request_key(endpoint: str, params: dict):
+    """Build the key identifying a request, used for caching and merging identical requests. Values are compared as
+    strings so b=1 and b="1" share a key, and the api key is left out.
+
+    Args:
+        endpoint: name of the endpoint (e.g. "get_user")
+        params: the request parameters
+
+    Returns:
+        tuple: hashable key
+    """
+    return (
+        endpoint,
+        tuple(sorted((name, str(value)) for name, value in params.items() if name != "k")),
+    )
+
+
+class CachePolicy:
+    """How long responses from an endpoint are kept.
+
+    Attributes:
+        ttl: seconds a response is fresh for, or a function taking the response and returning the seconds
+        stale_ttl: seconds after expiring that a response can still be returned while it's refreshed in the background
+            (stale-while-revalidate), 0 to always wait for a fresh response
+    """
+
+    def __init__(self, ttl, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def ttl_for(self, response):
+        return self.ttl(response) if callable(self.ttl) else self.ttl
+
+
+DEFAULT_POLICIES = {
+    "get_beatmaps": CachePolicy(beatmaps_ttl, stale_ttl=HOUR),
+    "get_user": CachePolicy(MINUTE, stale_ttl=5 * MINUTE),
+    "get_scores": CachePolicy(MINUTE, stale_ttl=5 * MINUTE),
+    "get_user_best": CachePolicy(5 * MINUTE, stale_ttl=15 * MINUTE),
+    "get_user_recent": CachePolicy(5),
+    "get_match": CachePolicy(match_ttl),
+    "get_replay": CachePolicy(DAY),
+}
+"""dict: CachePolicy used for each endpoint when a ResponseCache isn't given its own."""
+
+
+class CacheStats:
+    """Counters for a ResponseCache.
+
+    Attributes:
+        hits: lookups answered with a fresh response
+        stale_hits: lookups answered with an expired response while it's refreshed
+        misses: lookups that had to go to the api
+        evictions: responses dropped to stay under max_entries
+        expirations: responses dropped because they were too old to use
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+    def __repr__(self):
+        return (
+            f"hits={self.hits} stale_hits={self.stale_hits} misses={self.misses} "
+            f"evictions={self.evictions} expirations={self.expirations}"
+        )
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """In-memory LRU cache of decoded api responses, with a TTL policy per endpoint. Thread safe, and one cache can be
+    shared by several clients.
+
+    Attributes:
+        policies: dict of endpoint name to CachePolicy, endpoints without one aren't cached
+        max_entries: maximum number of responses kept, the least recently used are evicted past this
+        stats: CacheStats counters
+    """
+
+    def __init__(self, policies: dict = None, max_entries: int = 10000):
+        """Create an empty cache.
+
+        Args:
+            policies: dict of endpoint name to CachePolicy, merged over DEFAULT_POLICIES. Map an endpoint to None to
+                stop it being cached.
+            max_entries: maximum number of responses kept
+        """
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    key = staticmethod(request_key)
+
+    def cacheable(self, endpoint: str):
+        return self.policies.get(endpoint) is not None
+
+    def lookup(self, key):
+        """Look up a request.
+
+        Args:
+            key: key built with request_key()
+
+        Returns:
+            (CacheState, object): whether the response was found and is fresh or stale, and the response
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.fresh_until:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return CacheState.FRESH, entry.value
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self.stats.stale_hits += 1
+                    return CacheState.STALE, entry.value
+                del self._entries[key]
+                self.stats.expirations += 1
+            self.stats.misses += 1
+            return CacheState.MISS, None
+
+    def put(self, key, response):
+        """Store a response.
+
+        Args:
+            key: key built with request_key()
+            response: the decoded response
+        """
+        policy = self.policies.get(key[0])
+        if policy is None:
+            return
+        now = time.monotonic()
+        fresh_until = now + policy.ttl_for(response)
+        entry = _Entry(response, fresh_until, fresh_until + policy.stale_ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._refreshing.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def begin_refresh(self, key):
+        """Claim the background refresh of a stale entry, so concurrent lookups don't all refresh it.
+
+        Returns:
+            bool: True if the caller should refresh it
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def invalidate(self, endpoint: str = None):
+        """Drop cached responses.
+
+        Args:
+            endpoint: only drop responses from this endpoint, or everything if None
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == endpoint]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
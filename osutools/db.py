@@ -1,114 +1,639 @@
 import json
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
 
 from .utils import *
+from .dbschema import (
+    DOUBLE,
+    INT,
+    INT_DOUBLES,
+    STRING,
+    TIMING_POINTS,
+    Field,
+    Schema,
+    decode_string,
+    gc_paused,
+    mapped,
+)
+from .snapshot import SnapshotCache
 from .map import LocalMap
+from .oppai import Oppai
+from .ppstore import PPStore
 from .score import LocalScore
 
 
-class OsuDB:
-    def __init__(self, client, path):
+DB_HEADER = struct.Struct("<II")
+"""struct.Struct: version and number of entries, at the start of collection.db and scores.db"""
+TARGET_PRACTICE = Mods.Target.value
+
+
+def _approved(ranked_status):
+    # why is this different to the online api
+    return ranked_status - 3 if ranked_status >= 4 else -2
+
+
+OSU_DB_HEADER = Schema(
+    Field("version", "I"),
+    Field("folder_count", "I"),
+    Field("account_unlocked", "?"),
+    Field("date_unlocked", "Q", ticks_to_datetime),
+    Field("player_name", STRING),
+    Field("number_of_beatmaps", "I"),
+)
+
+BEATMAP = Schema(
+    Field("file_size", "I", before=20191106),
+    Field("artist", STRING),
+    Field("artist_unicode", STRING),
+    Field("title", STRING),
+    Field("title_unicode", STRING),
+    Field("creator", STRING),
+    Field("version", STRING),  # difficulty name
+    Field("audio_filename", STRING),
+    Field("file_md5", STRING),
+    Field("filename", STRING),
+    Field("approved", "B", _approved),
+    Field("count_normal", "H"),
+    Field("count_slider", "H"),
+    Field("count_spinner", "H"),
+    Field("last_mod_time", "Q", ticks_to_datetime),
+    Field("diff_approach", "B", before=20140609),
+    Field("diff_size", "B", before=20140609),
+    Field("diff_drain", "B", before=20140609),
+    Field("diff_overall", "B", before=20140609),
+    Field("diff_approach", "f", since=20140609),
+    Field("diff_size", "f", since=20140609),
+    Field("diff_drain", "f", since=20140609),
+    Field("diff_overall", "f", since=20140609),
+    Field("slider_velocity", "d"),
+    Field("standard_star_ratings", INT_DOUBLES, since=20140609),
+    Field("taiko_star_ratings", INT_DOUBLES, since=20140609),
+    Field("ctb_star_ratings", INT_DOUBLES, since=20140609),
+    Field("mania_star_ratings", INT_DOUBLES, since=20140609),
+    Field("drain_time", "I"),
+    Field("total_length", "I"),
+    Field("preview_start_time", "I"),
+    Field("timing_points", TIMING_POINTS),
+    Field("beatmap_id", "I"),
+    Field("beatmapset_id", "I"),
+    Field("thread_id", "I"),
+    Field("best_grade_standard", "B"),
+    Field("best_grade_taiko", "B"),
+    Field("best_grade_ctb", "B"),
+    Field("best_grade_mania", "B"),
+    Field("local_offset", "H"),
+    Field("stack_leniency", "f"),
+    Field("mode", "B"),
+    Field("source", STRING),
+    Field("tags", STRING),
+    Field("online_offset", "H"),
+    Field("title_font", STRING),
+    Field("unplayed", "?"),
+    Field("last_played", "Q"),
+    Field("is_osz2", "?"),
+    Field("folder_name", STRING),
+    Field("last_updated", "Q"),
+    Field("ignore_sound", "?"),
+    Field("ignore_skin", "?"),
+    Field("disable_storyboard", "?"),
+    Field("disable_video", "?"),
+    Field("visual_override", "?"),
+    Field(None, "H", before=20140609),  # wiki says this just isn't actually a used value
+    Field("last_mod_time_2", "I"),
+    Field("scroll_speed", "B"),
+)
+"""Schema: layout of a beatmap in osu!.db"""
+
+SCORE = Schema(
+    Field("mode", "B"),
+    Field("version", "I"),
+    Field("map_hash", STRING),
+    Field("username", STRING),
+    Field("replay_hash", STRING),
+    Field("count300", "H"),
+    Field("count100", "H"),
+    Field("count50", "H"),
+    Field("countgeki", "H"),
+    Field("countkatu", "H"),
+    Field("countmiss", "H"),
+    Field("score", "I"),
+    Field("maxcombo", "H"),
+    Field("perfect", "?"),
+    Field("mods", "I"),
+    Field(None, STRING),  # life bar graph
+    Field("timestamp", "Q", ticks_to_datetime),
+    Field(None, "I"),
+    Field("online_id", "Q"),
+)
+"""Schema: layout of a score in scores.db"""
+
+
+def _file_state(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class DbDiff:
+    """What changed in a db between two reads of it.
+
+    Attributes:
+        added: keys (md5 hashes for osu!.db, replay hashes for scores.db) that are new
+        removed: keys that are gone
+        changed: keys that are still there but were modified (osu!.db only)
+    """
+
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+
+    @classmethod
+    def between(cls, old: dict, new: dict):
+        """Compare two dicts of key -> last modification.
+
+        Returns:
+            DbDiff: the differences
+        """
+        return cls(
+            [key for key in new if key not in old],
+            [key for key in old if key not in new],
+            [key for key, modified in new.items() if key in old and old[key] != modified],
+        )
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"added={len(self.added)} removed={len(self.removed)} changed={len(self.changed)}"
+
+
+def diff(old, new):
+    """Compare two reads of the same db.
+
+    Args:
+        old: the earlier OsuDB or ScoresDB
+        new: the later one
+
+    Returns:
+        DbDiff: what was added, removed and changed
+    """
+    return DbDiff.between(old._fingerprints(), new._fingerprints())
+
+
+class _Reloadable:
+    def reload(self):
+        raise NotImplementedError
+
+    def changed_on_disk(self):
+        """bool: whether the file has been written to since it was last read"""
+        return _file_state(self.path) != self._file_state
+
+    def watch(self, interval: float = 1.0):
+        """Poll the file for changes, reloading it in place whenever osu! rewrites it. Checking costs one stat() call,
+        so interval can be short.
+
+        Args:
+            interval: seconds between checks
+
+        Yields:
+            DbDiff: what changed, for every reload that found changes
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                if not self.changed_on_disk():
+                    continue
+                changes = self.reload()
+            except (OSError, struct.error, IndexError):
+                # caught osu! halfway through writing the file, try again next time
+                continue
+            if changes:
+                yield changes
+
+
+class LazyMaps(Mapping):
+    """md5 -> LocalMap mapping of a lazily loaded OsuDB. Each map is decoded from the db the first time it's looked up
+    and then kept, only keeping the max_cached most recently used if that's set (in which case looking an evicted map
+    up again gives a new LocalMap).
+
+    Attributes:
+        max_cached: most LocalMaps kept at once, or None for no limit
+    """
+
+    def __init__(self, osu_db, max_cached: int = None):
+        self._db = osu_db
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, md5_hash):
+        with self._lock:
+            local_map = self._cache.get(md5_hash)
+            if local_map is not None:
+                self._cache.move_to_end(md5_hash)
+                return local_map
+        local_map = LocalMap(self._db._decode(md5_hash), self._db.client)
+        with self._lock:
+            self._cache[md5_hash] = local_map
+            if self.max_cached is not None and len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return local_map
+
+    def __contains__(self, md5_hash):
+        return md5_hash in self._db._data[1]
+
+    def __iter__(self):
+        return iter(self._db._data[1])
+
+    def __len__(self):
+        return len(self._db._data[1])
+
+    def discard(self, md5_hashes):
+        """Forget decoded LocalMaps, so they're decoded again next time they're looked up."""
+        with self._lock:
+            for md5_hash in md5_hashes:
+                self._cache.pop(md5_hash, None)
+
+    @property
+    def cached(self):
+        """int: number of LocalMaps currently decoded and kept"""
+        return len(self._cache)
+
+
+class LazyMapDicts(Mapping):
+    """beatmap_id -> map info dict mapping of a lazily loaded OsuDB. Dicts are decoded each time they're looked up."""
+
+    def __init__(self, osu_db):
+        self._db = osu_db
+
+    def __getitem__(self, beatmap_id):
+        return self._db._decode(self._db.id_to_hash[beatmap_id])
+
+    def __iter__(self):
+        return iter(self._db.id_to_hash)
+
+    def __len__(self):
+        return len(self._db.id_to_hash)
+
+
+class MapIndexes:
+    """Secondary indexes of an OsuDB, each a dict of value to the md5 hashes of the maps with it (in db order). Kept
+    alongside the maps by both eager and lazy loads, so finding every map in a set, by a creator or in a mode is a
+    dict lookup.
+
+    Attributes:
+        by: dict of index name (one of FIELDS) to its dict of value to {md5 hash: None}
+    """
+
+    FIELDS = {
+        "mapset": "beatmapset_id",
+        "creator": "creator",
+        "mode": "mode",
+        "approval": "approved",
+        "folder": "folder_name",
+    }
+    """dict: name of each index, to the map field it indexes"""
+
+    def __init__(self):
+        self.by = {name: {} for name in self.FIELDS}
+        self._keys = {}
+
+    @staticmethod
+    def key(name: str, value):
+        """Normalize a value the way an index stores it: creators ignore case, and folders surrounding whitespace."""
+        if name == "creator":
+            return (value or "").lower()
+        if name == "folder":
+            return (value or "").strip()
+        return value
+
+    def add(self, md5_hash: str, info: dict):
+        """Index a map, replacing it if it's already indexed.
+
+        Args:
+            md5_hash: md5 hash of the map
+            info: the map's decoded fields, at least the ones in FIELDS
+        """
+        if md5_hash in self._keys:
+            self.remove(md5_hash)
+        keys = self._keys[md5_hash] = (
+            info["beatmapset_id"],
+            (info["creator"] or "").lower(),
+            info["mode"],
+            info["approved"],
+            (info["folder_name"] or "").strip(),
+        )
+        for index, key in zip(self.by.values(), keys):
+            hashes = index.get(key)
+            if hashes is None:
+                index[key] = {md5_hash: None}
+            else:
+                hashes[md5_hash] = None
+
+    def remove(self, md5_hash: str):
+        """Stop indexing a map. Does nothing if it isn't indexed.
+
+        Args:
+            md5_hash: md5 hash of the map
+        """
+        keys = self._keys.pop(md5_hash, None)
+        if keys is None:
+            return
+        for index, key in zip(self.by.values(), keys):
+            hashes = index[key]
+            del hashes[md5_hash]
+            if not hashes:
+                del index[key]
+
+    def get(self, name: str, value):
+        """Get the md5 hashes of the maps with a value.
+
+        Args:
+            name: name of the index, one of FIELDS
+            value: the value
+
+        Returns:
+            [str]: md5 hashes, in db order
+        """
+        return list(self.by[name].get(self.key(name, value), ()))
+
+
+class Mapset:
+    """Every difficulty of a beatmapset that's in an OsuDB.
+
+    Attributes:
+        mapset_id: id of the beatmapset
+        md5_hashes: md5 hashes of the difficulties, in db order
+    """
+
+    def __init__(self, osu_db, mapset_id: int, md5_hashes):
+        self._db = osu_db
+        self.mapset_id = mapset_id
+        self.md5_hashes = md5_hashes
+
+    @property
+    def maps(self):
+        """[LocalMap]: the difficulties"""
+        return [self._db.maps[md5_hash] for md5_hash in self.md5_hashes]
+
+    @property
+    def artist(self):
+        return self.maps[0].artist
+
+    @property
+    def song_title(self):
+        return self.maps[0].song_title
+
+    @property
+    def creator_name(self):
+        return self.maps[0].creator_name
+
+    @property
+    def folder_name(self):
+        return self.maps[0].folder_name
+
+    def __len__(self):
+        return len(self.md5_hashes)
+
+    def __repr__(self):
+        return f"{self.artist} - {self.song_title} ({len(self)} difficulties) mapped by {self.creator_name}"
+
+
+class OsuDB(_Reloadable):
+    """osu!.db, the list of every map the player has installed.
+
+    Attributes:
+        path: path of osu!.db
+        maps: dict of md5 hash to LocalMap
+        map_dicts: dict of beatmap id to the map's decoded fields
+        id_to_hash: dict of beatmap id to md5 hash
+        hash_to_id: dict of md5 hash to beatmap id
+        indexes: MapIndexes of the maps by set, creator, mode, approval and folder
+        lazy: whether maps are only decoded when they're looked up
+    """
+
+    HEADER = (
+        "version",
+        "folder_count",
+        "account_unlocked",
+        "date_unlocked",
+        "player_name",
+        "number_of_beatmaps",
+    )
+
+    def __init__(
+        self,
+        client,
+        path,
+        lazy: bool = None,
+        max_cached: int = None,
+        cache_dir=None,
+    ):
+        """Read osu!.db.
+
+        Args:
+            client: OsuClientV1 given to the LocalMaps
+            path: path of osu!.db
+            lazy: only index the file up front (each map's offset, md5 and id) and decode maps the first time they're
+                used. Much faster and smaller for big installs when only some maps are needed. A copy of the file is
+                kept in memory rather than keeping it open. Defaults to lazy when cache_dir is given and eager otherwise
+            max_cached: when lazy, the most decoded LocalMaps to keep at once (least recently used are dropped)
+            cache_dir: directory to keep a snapshot of the index in, which implies lazy. Later loads of the same,
+                unchanged, osu!.db read the snapshot instead of scanning the file. Eager loads can't be snapshotted
+                (unpickling every decoded map takes about as long as decoding it), so lazy=False with a cache_dir is an
+                error. Snapshots are unpickled, so the directory must only be writable by you
+
+        Raises:
+            ValueError: if lazy is False and cache_dir is given
+        """
+        if lazy is None:
+            lazy = cache_dir is not None
+        elif cache_dir and not lazy:
+            raise ValueError("osu!.db can only be snapshotted when it's loaded lazily")
         self.client = client
-        with open(path, "rb") as db:
-            self.version = read_int(db)
-            self.folder_count = read_int(db)
-            self.account_unlocked = read_bool(db)
-            self.date_unlocked = read_datetime(db)
-            self.player_name = read_string(db)
-            self.number_of_beatmaps = read_int(db)
-            self.maps = {}
-            self.map_dicts = {}
-            self.id_to_hash = {}
-            for _ in range(self.number_of_beatmaps):
-                map_info = {}
-                if self.version < 20191106:
-                    map_info["file_size"] = read_int(db)
-                else:
-                    map_info["file_size"] = -1
-                map_info["osu_version"] = self.version
-                map_info["artist"] = read_string(db)
-                map_info["artist_unicode"] = read_string(db)
-                map_info["title"] = read_string(db)
-                map_info["title_unicode"] = read_string(db)
-                map_info["creator"] = read_string(db)
-                map_info["version"] = read_string(db)  # difficulty name
-                map_info["audio_filename"] = read_string(db)
-                map_info["file_md5"] = read_string(db)
-                map_info["filename"] = read_string(db)
-                ranked_status = read_byte(db)  # why is this different to the online api
-                map_info["approved"] = ranked_status - 3 if ranked_status >= 4 else -2
-                map_info["count_normal"] = read_short(db)
-                map_info["count_slider"] = read_short(db)
-                map_info["count_spinner"] = read_short(db)
-                map_info["last_mod_time"] = read_datetime(db)
-                if self.version < 20140609:
-                    map_info["diff_approach"] = int(read_byte(db))
-                    map_info["diff_size"] = int(read_byte(db))
-                    map_info["diff_drain"] = int(read_byte(db))
-                    map_info["diff_overall"] = int(read_byte(db))
-                else:
-                    map_info["diff_approach"] = read_single(db)
-                    map_info["diff_size"] = read_single(db)
-                    map_info["diff_drain"] = read_single(db)
-                    map_info["diff_overall"] = read_single(db)
-                map_info["slider_velocity"] = read_double(db)
-                if self.version >= 20140609:
-                    no_pairs = read_int(db)
-                    map_info["standard_star_ratings"] = [
-                        read_int_double(db) for _ in range(no_pairs)
-                    ]
-                    no_pairs = read_int(db)
-                    map_info["taiko_star_ratings"] = [
-                        read_int_double(db) for _ in range(no_pairs)
-                    ]
-                    no_pairs = read_int(db)
-                    map_info["ctb_star_ratings"] = [
-                        read_int_double(db) for _ in range(no_pairs)
-                    ]
-                    no_pairs = read_int(db)
-                    map_info["mania_star_ratings"] = [
-                        read_int_double(db) for _ in range(no_pairs)
-                    ]
-                map_info["drain_time"] = read_int(db)
-                map_info["total_length"] = read_int(db)
-                map_info["preview_start_time"] = read_int(db)
-                no_timing = read_int(db)
-                map_info["timing_points"] = [read_timing(db) for _ in range(no_timing)]
-                map_info["beatmap_id"] = read_int(db)
-                map_info["beatmapset_id"] = read_int(db)
-                map_info["thread_id"] = read_int(db)
-                map_info["best_grade_standard"] = read_byte(db)
-                map_info["best_grade_taiko"] = read_byte(db)
-                map_info["best_grade_ctb"] = read_byte(db)
-                map_info["best_grade_mania"] = read_byte(db)
-                map_info["local_offset"] = read_short(db)
-                map_info["stack_leniency"] = read_single(db)
-                map_info["mode"] = read_byte(db)
-                map_info["source"] = read_string(db)
-                map_info["tags"] = read_string(db)
-                map_info["online_offset"] = read_short(db)
-                map_info["title_font"] = read_string(db)
-                map_info["unplayed"] = read_bool(db)
-                map_info["last_played"] = read_long(db)
-                map_info["is_osz2"] = read_bool(db)
-                map_info["folder_name"] = read_string(db)
-                map_info["last_updated"] = read_long(db)
-                map_info["ignore_sound"] = read_bool(db)
-                map_info["ignore_skin"] = read_bool(db)
-                map_info["disable_storyboard"] = read_bool(db)
-                map_info["disable_video"] = read_bool(db)
-                map_info["visual_override"] = read_bool(db)
-                if self.version < 20140609:
-                    read_short(db)  # wiki says this just isn't actually a used value
-                map_info["last_mod_time_2"] = read_int(db)
-                map_info["scroll_speed"] = read_byte(db)
-                mp = LocalMap(map_info, client)
-                self.map_dicts[mp.beatmap_id] = map_info
-                self.maps[mp.md5_hash] = mp
-                self.id_to_hash[mp.beatmap_id] = mp.md5_hash
+        self.path = path
+        self.lazy = lazy
+        self._file_state = _file_state(path)
+        self._table = None
+        self._text_index = None
+        if lazy:
+            snapshots = SnapshotCache(cache_dir) if cache_dir else None
+            key = snapshots.key(path) if snapshots else None
+            with open(path, "rb") as f:
+                buf = f.read()
+            if snapshots and len(buf) != key[2]:
+                # osu! rewrote the file while it was being read, the key doesn't describe these bytes
+                snapshots = None
+            state = snapshots.load("osu_db_index", key) if snapshots else None
+            if state is not None:
+                self._data = (buf, state.pop("_offsets"), state["version"])
+                self.__dict__.update(state)
+            else:
+                with gc_paused():
+                    self._read(buf)
+                if snapshots:
+                    snapshots.save("osu_db_index", key, self._index())
+        else:
+            with mapped(path) as buf, gc_paused():
+                self._read(buf)
+        if lazy:
+            self.maps = LazyMaps(self, max_cached)
+            self.map_dicts = LazyMapDicts(self)
+
+    @staticmethod
+    def _scan(buf):
+        """Index a copy of osu!.db without decoding the maps.
+
+        Returns:
+            (dict, dict, dict, dict, dict, MapIndexes): the header, md5 -> offset, md5 -> last modification ticks,
+            id -> md5, md5 -> id and the secondary indexes
+        """
+        # the header is the same in every version
+        header, offset = OSU_DB_HEADER.compile(0).decode(buf, 0)
+        offsets = {}
+        modified = {}
+        id_to_hash = {}
+        hash_to_id = {}
+        indexes = MapIndexes()
+        scanner = BEATMAP.scanner(
+            header["version"],
+            ("file_md5", "beatmap_id", "last_mod_time") + tuple(MapIndexes.FIELDS.values()),
+        )
+        for _ in range(header["number_of_beatmaps"]):
+            found, end = scanner.scan(buf, offset)
+            md5 = found["file_md5"]
+            offsets[md5] = offset
+            modified[md5] = found["last_mod_time"]
+            id_to_hash[found["beatmap_id"]] = md5
+            hash_to_id[md5] = found["beatmap_id"]
+            # the scanner doesn't convert fields
+            found["approved"] = _approved(found["approved"])
+            indexes.add(md5, found)
+            offset = end
+        return header, offsets, modified, id_to_hash, hash_to_id, indexes
+
+    def _read(self, buf):
+        if self.lazy:
+            header, offsets, self._modified, self.id_to_hash, self.hash_to_id, self.indexes = self._scan(buf)
+            # the copy of the file, where each map is in it and its version are swapped as one by reload(), so a
+            # map decoded while another thread reloads comes wholly from one version of the file
+            self._data = (buf, offsets, header["version"])
+            self.__dict__.update(header)
+            return
+        header, offset = OSU_DB_HEADER.compile(0).decode(buf, 0)
+        self.__dict__.update(header)
+        self.id_to_hash = {}
+        self.hash_to_id = {}
+        self.indexes = MapIndexes()
+        self.maps = {}
+        self.map_dicts = {}
+        decoder = BEATMAP.compile(self.version)
+        for _ in range(self.number_of_beatmaps):
+            map_info = {"file_size": -1, "osu_version": self.version}
+            map_info, offset = decoder.decode(buf, offset, map_info)
+            mp = LocalMap(map_info, self.client)
+            self.map_dicts[mp.beatmap_id] = map_info
+            self.maps[mp.md5_hash] = mp
+            self.id_to_hash[mp.beatmap_id] = mp.md5_hash
+            self.hash_to_id[mp.md5_hash] = mp.beatmap_id
+            self.indexes.add(mp.md5_hash, map_info)
+
+    def _index(self):
+        state = {name: getattr(self, name) for name in self.HEADER}
+        state["id_to_hash"] = self.id_to_hash
+        state["hash_to_id"] = self.hash_to_id
+        state["indexes"] = self.indexes
+        state["_offsets"] = self._data[1]
+        state["_modified"] = self._modified
+        return state
+
+    def _fingerprints(self):
+        if self.lazy:
+            return {md5: ticks_to_datetime(ticks) for md5, ticks in self._modified.items()}
+        return {md5: local_map.last_mod_time for md5, local_map in self.maps.items()}
+
+    def reload(self):
+        """Re-read osu!.db after osu! has changed it, updating this object in place. Only maps that are new or were
+        modified are decoded; LocalMaps of unchanged maps are kept as they are. If the file can't be read (e.g. it's
+        halfway through being written) the error is raised and nothing is changed.
+
+        Returns:
+            DbDiff: md5 hashes of the maps that were added, removed and changed
+        """
+        file_state = _file_state(self.path)
+        with open(self.path, "rb") as f:
+            buf = f.read()
+        with gc_paused():
+            header, offsets, modified, id_to_hash, hash_to_id, indexes = self._scan(buf)
+            changes = DbDiff.between(
+                self._fingerprints(),
+                {md5: ticks_to_datetime(ticks) for md5, ticks in modified.items()},
+            )
+            if self.lazy:
+                self._data = (buf, offsets, header["version"])
+                self._modified = modified
+                self.maps.discard(changes.removed + changes.changed)
+            else:
+                self._patch(buf, header["version"], offsets, changes)
+            self.__dict__.update(header)
+            self.id_to_hash = id_to_hash
+            self.hash_to_id = hash_to_id
+            self.indexes = indexes
+            self._file_state = file_state
+            if changes:
+                self._table = None
+                if self._text_index is not None:
+                    self._text_index.update(self, changes)
+                scores_db = getattr(self.client, "scores_db", None)
+                if scores_db is not None and self.client.osu_db is self:
+                    scores_db.maps_changed()
+        return changes
+
+    def _patch(self, buf, version: int, offsets: dict, changes: DbDiff):
+        decoder = BEATMAP.compile(version)
+        old_infos = {info["file_md5"]: info for info in self.map_dicts.values()}
+        stale = set(changes.changed)
+        maps = {}
+        map_dicts = {}
+        for md5, offset in offsets.items():
+            local_map = None if md5 in stale else self.maps.get(md5)
+            info = old_infos.get(md5) if local_map is not None else None
+            if info is None:
+                # new or modified, or hidden from map_dicts by another map with the same id
+                info = decoder.decode(buf, offset, {"file_size": -1, "osu_version": version})[0]
+            if local_map is None:
+                local_map = LocalMap(info, self.client)
+            maps[md5] = local_map
+            map_dicts[local_map.beatmap_id] = info
+        self.maps = maps
+        self.map_dicts = map_dicts
+
+    def _decode(self, md5_hash: str):
+        buf, offsets, version = self._data
+        map_info = {"file_size": -1, "osu_version": version}
+        return BEATMAP.compile(version).decode(buf, offsets[md5_hash], map_info)[0]
 
     def map_list(self):
         return list(self.maps.values())
 
+    def table(self):
+        """Get a columnar view of every map, for vectorized filtering, aggregating and sorting. Built the first time
+        it's asked for and kept until the db is reloaded. Requires numpy.
+
+        Returns:
+            MapTable: one row per map, in the same order as maps
+        """
+        if self._table is None:
+            from .table import MapTable
+
+            self._table = MapTable.from_osu_db(self)
+        return self._table
+
     def search_maps(self, name: str):
         results = []
         name = name.lower()
@@ -117,39 +642,191 @@ class OsuDB:
                 results.append(local_map)
         return results
 
+    def text_index(self):
+        """Get the full text index of the maps' artist, title, creator, difficulty name, source and tags (including
+        the unicode artist and title). Built the first time it's asked for and kept up to date by reload().
+
+        Returns:
+            TextIndex: the index
+        """
+        if self._text_index is None:
+            from .textindex import TextIndex
+
+            self._text_index = TextIndex.from_osu_db(self)
+        return self._text_index
+
+    def find_maps(self, text: str, limit: int = 50, fuzzy: bool = True):
+        """Search the maps by words, using text_index(). Words match whole words, the start of words, or (if fuzzy)
+        similarly spelled words, ignoring case and accents, and every word has to match.
+
+        Args:
+            text: words to search for
+            limit: most maps returned, or None for all of them
+            fuzzy: whether to match misspelled words
+
+        Returns:
+            [LocalMap]: matching maps, best matches first
+        """
+        return [self.maps[md5] for md5, _ in self.text_index().search(text, limit, fuzzy=fuzzy)]
+
+    def search(self, query: str, sort: str = None, descending: bool = False):
+        """Search the maps with osu!'s song select syntax, e.g. ar>9 stars>=5.5 length<120 mode=osu status=ranked
+        creator=xyz "title words" (see Query for everything it supports). Runs over table(), so requires numpy.
+
+        Args:
+            query: the search
+            sort: key (e.g. stars, length) or MapTable column to sort the results by, or None to keep db order
+            descending: highest first rather than lowest
+
+        Returns:
+            MapTable: the matching maps, use .maps() to get their LocalMaps
+        """
+        from .query import parse_query
+
+        return parse_query(query).apply(self.table(), sort, descending)
+
     def get_map_from_hash(self, md5_hash: str):
-        for local_map in self.maps.values():
-            if local_map.md5_hash == md5_hash:
-                return local_map
-        return None
+        return self.maps.get(md5_hash)
+
+    def get_map_from_id(self, beatmap_id: int):
+        """Look a map up by its beatmap id.
+
+        Args:
+            beatmap_id: id of the map
+
+        Returns:
+            LocalMap: the map, or None if it isn't installed
+        """
+        md5_hash = self.id_to_hash.get(beatmap_id)
+        return self.maps[md5_hash] if md5_hash is not None else None
+
+    def _maps_with(self, name: str, value):
+        return [self.maps[md5_hash] for md5_hash in self.indexes.get(name, value)]
+
+    def get_mapset(self, mapset_id: int):
+        """Get the installed difficulties of a beatmapset.
+
+        Args:
+            mapset_id: id of the beatmapset
+
+        Returns:
+            Mapset: the set, or None if none of it is installed
+        """
+        md5_hashes = self.indexes.get("mapset", mapset_id)
+        return Mapset(self, mapset_id, md5_hashes) if md5_hashes else None
+
+    def mapsets(self):
+        """[Mapset]: every installed beatmapset, in db order"""
+        return [
+            Mapset(self, mapset_id, list(md5_hashes))
+            for mapset_id, md5_hashes in self.indexes.by["mapset"].items()
+        ]
+
+    def get_maps_by_creator(self, creator: str):
+        """Get every map by a mapper, ignoring case.
+
+        Args:
+            creator: the mapper's username
+
+        Returns:
+            [LocalMap]: their maps
+        """
+        return self._maps_with("creator", creator)
+
+    def get_maps_by_mode(self, mode: Mode):
+        """Get every map for a gamemode (not including converts).
+
+        Args:
+            mode: the gamemode
+
+        Returns:
+            [LocalMap]: the maps
+        """
+        return self._maps_with("mode", Mode(mode).value)
+
+    def get_maps_by_approval(self, approval: Approval):
+        """Get every map with a ranked status.
+
+        Args:
+            approval: the status
+
+        Returns:
+            [LocalMap]: the maps
+        """
+        return self._maps_with("approval", Approval(approval).value)
+
+    def get_maps_in_folder(self, folder_name: str):
+        """Get every map in a folder of the Songs directory.
+
+        Args:
+            folder_name: name of the folder
+
+        Returns:
+            [LocalMap]: the maps
+        """
+        return self._maps_with("folder", folder_name)
 
     def export(self, path=None):
         if not path:
             path = "osu_db.json"
-        db_dict = self.__dict__.copy()
-        db_dict.pop("client")
-        db_dict.pop("maps")
-        db_dict.pop("id_to_hash")
+        db_dict = {
+            "version": self.version,
+            "folder_count": self.folder_count,
+            "account_unlocked": self.account_unlocked,
+            "date_unlocked": self.date_unlocked,
+            "player_name": self.player_name,
+            "number_of_beatmaps": self.number_of_beatmaps,
+            "map_dicts": dict(self.map_dicts.items()),
+        }
         json_str = json.dumps(db_dict, sort_keys=True, indent=4, default=str)
         with open(path, "w") as f:
             f.write(json_str)
 
 
 class Collections:
-    def __init__(self, client, path):
+    def __init__(self, client, path, cache_dir=None):
+        """Read collection.db.
+
+        Args:
+            client: OsuClientV1 the collections belong to
+            path: path of collection.db
+            cache_dir: directory to keep a snapshot of the decoded collections in, so later loads of the same,
+                unchanged, collection.db read the snapshot instead (0.01s against 0.1s for 100k maps in collections)
+        """
         self.client = client
-        with open(path, "rb") as db:
-            self.version = read_int(db)
+        snapshots = SnapshotCache(cache_dir) if cache_dir else None
+        key = snapshots.key(path) if snapshots else None
+        state = snapshots.load("collection_db", key) if snapshots else None
+        if state is not None:
+            self.__dict__.update(state)
+            return
+        self._read(path)
+        if snapshots and _file_state(path) == key[2:4]:
+            # only saved if osu! didn't rewrite the file while it was being read
+            snapshots.save("collection_db", key, self._snapshot())
+
+    def _read(self, path):
+        with mapped(path) as buf:
+            self.version, self.no_collections = DB_HEADER.unpack_from(buf, 0)
+            offset = DB_HEADER.size
             self.collections = {}
-            self.no_collections = read_int(db)
             for _ in range(self.no_collections):
+                name, offset = decode_string(buf, offset)
+                no_maps = INT.unpack_from(buf, offset)[0]
+                offset += 4
                 collection = []
-                name = read_string(db)
-                no_maps = read_int(db)
                 for _ in range(no_maps):
-                    collection.append(read_string(db))
+                    md5, offset = decode_string(buf, offset)
+                    collection.append(md5)
                 self.collections[name] = collection
 
+    def _snapshot(self):
+        return {
+            "version": self.version,
+            "no_collections": self.no_collections,
+            "collections": self.collections,
+        }
+
     def export(self, path=None):
         if not path:
             path = "collection.json"
@@ -160,76 +837,309 @@ class Collections:
             f.write(json_str)
 
 
-class ScoresDB:
-    def __init__(self, client, path):
+class TimeIndex:
+    """Scores sorted by when they were set, for finding the ones set before a time, or between two, by bisection.
+
+    Attributes:
+        timestamps: sorted list of the scores' timestamps
+        positions: position of each score in scores.db, to put results back in file order
+        scores: the LocalScores, in the same order
+    """
+
+    def __init__(self, entries):
+        """Build an index.
+
+        Args:
+            entries: iterable of (position in scores.db, LocalScore)
+        """
+        entries = sorted(entries, key=lambda entry: (entry[1].timestamp, entry[0]))
+        self.timestamps = [score.timestamp for _, score in entries]
+        self.positions = [position for position, _ in entries]
+        self.scores = [score for _, score in entries]
+
+    def between(self, start=None, end=None):
+        """Get the scores set in a time range.
+
+        Args:
+            start: earliest time (inclusive), or None for no limit
+            end: latest time (exclusive), or None for no limit
+
+        Returns:
+            [(int, LocalScore)]: position in scores.db and score of each, oldest first
+        """
+        low = 0 if start is None else bisect_left(self.timestamps, start)
+        high = len(self.timestamps) if end is None else bisect_left(self.timestamps, end)
+        return list(zip(self.positions[low:high], self.scores[low:high]))
+
+    def __len__(self):
+        return len(self.scores)
+
+
+class ScoresDB(_Reloadable):
+    """scores.db, every score set on this install.
+
+    Besides the scores of each map, reading it builds a TimeIndex of each player's scores (and one of everyone's), and
+    replay hash and online id lookups, so time range queries are bisections rather than scans.
+
+    Attributes:
+        path: path of scores.db
+        maps: dict of map md5 hash to list of LocalScores
+        score_by_map: dict of beatmap id to list of LocalScores, for maps that are in osu!.db
+        by_user: dict of username to TimeIndex of their scores
+        by_time: TimeIndex of every score
+    """
+
+    def __init__(self, client, path, cache_dir=None):
+        """Read scores.db.
+
+        Args:
+            client: OsuClientV1 given to the LocalScores
+            path: path of scores.db
+            cache_dir: directory to keep a snapshot of the decoded scores in, so later loads of the same, unchanged,
+                scores.db read the snapshot instead of decoding the file (1.2s against 3.5s for 100k scores, most of
+                what's left being building the indexes)
+        """
         self.client = client
-        with open(path, "rb") as db:
-            self.version = read_int(db)
-            no_maps = read_int(db)
-            self.maps = {}
-            self.score_by_map = {}
+        self.path = path
+        self.maps = {}
+        snapshots = SnapshotCache(cache_dir) if cache_dir else None
+        key = snapshots.key(path) if snapshots else None
+        state = snapshots.load("scores_db", key) if snapshots else None
+        if state is not None:
+            self._restore(state, key[2:4])
+            return
+        self.reload()
+        if snapshots and self._file_state == key[2:4] == _file_state(path):
+            # only saved if osu! didn't rewrite the file while it was being read
+            snapshots.save("scores_db", key, self._snapshot())
+
+    def _fingerprints(self):
+        return {replay_hash: None for replay_hash in self._replays}
+
+    def reload(self):
+        """Re-read scores.db after osu! has changed it, updating this object in place. Scores are matched up by replay
+        hash and only new ones are decoded; existing LocalScores (and any pp already calculated for them) are kept.
+        If the file can't be read the error is raised and nothing is changed.
+
+        Returns:
+            DbDiff: replay hashes of the scores that were added and removed
+        """
+        old = {
+            score.md5_hash: score for scores in self.maps.values() for score in scores
+        }
+        file_state = _file_state(self.path)
+        with mapped(self.path) as buf, gc_paused():
+            version, no_maps = DB_HEADER.unpack_from(buf, 0)
+            offset = DB_HEADER.size
+            scanner = SCORE.scanner(version, ("replay_hash", "mods"))
+            decoder = SCORE.compile(version)
+            maps = {}
             for _ in range(no_maps):
-                md5 = read_string(db)
+                md5, offset = decode_string(buf, offset)
                 scores = []
-                score_dict = []
-                no_scores = read_int(db)
+                no_scores = INT.unpack_from(buf, offset)[0]
+                offset += 4
                 for _ in range(no_scores):
-
-                    score_info = {
-                        "mode": read_byte(db),
-                        "version": read_int(db),
-                        "map_hash": read_string(db),
-                        "username": read_string(db),
-                        "replay_hash": read_string(db),
-                        "count300": read_short(db),
-                        "count100": read_short(db),
-                        "count50": read_short(db),
-                        "countgeki": read_short(db),
-                        "countkatu": read_short(db),
-                        "countmiss": read_short(db),
-                        "score": read_int(db),
-                        "maxcombo": read_short(db),
-                        "perfect": read_bool(db),
-                        "mods": read_int(db),
-                    }
-                    read_string(db)
-                    score_info["timestamp"] = read_datetime(db)
-                    read_int(db)
-                    score_info["online_id"] = read_long(db)
-                    if Mods.Target & Mods(score_info["mods"]):
-                        score_info["target_practice_acc"] = read_double(db)
-
-                    local_score = LocalScore(
-                        score_info, client, score_info["replay_hash"]
-                    )
+                    found, end = scanner.scan(buf, offset)
+                    if found["mods"] & TARGET_PRACTICE:
+                        end += DOUBLE.size
+                    local_score = old.get(found["replay_hash"])
+                    if local_score is None:
+                        score_info = decoder.decode(buf, offset)[0]
+                        if score_info["mods"] & TARGET_PRACTICE:
+                            score_info["target_practice_acc"] = DOUBLE.unpack_from(buf, end - DOUBLE.size)[0]
+                        local_score = LocalScore(
+                            score_info, self.client, score_info["replay_hash"]
+                        )
                     scores.append(local_score)
-                    score_dict.append(score_info)
-                if score_dict and scores[0].map:
-                    map_id = scores[0].map.beatmap_id
-                    self.score_by_map[map_id] = scores
-                self.maps[md5] = scores
+                    offset = end
+                maps[md5] = scores
+        self._set_maps(version, maps, file_state)
+        return DbDiff.between(old, self._replays)
+
+    def _set_maps(self, version, maps, file_state):
+        self.version = version
+        self.maps = maps
+        self._map_scores()
+        self._replays = {
+            score.md5_hash: score for scores in maps.values() for score in scores
+        }
+        self._index()
+        self._file_state = file_state
+
+    def _snapshot(self):
+        # the scores' attributes without the client, which is put back when they're restored
+        maps = {
+            md5: [{name: value for name, value in vars(score).items() if name != "client"} for score in scores]
+            for md5, scores in self.maps.items()
+        }
+        return {"version": self.version, "maps": maps}
+
+    def _restore(self, state, file_state):
+        with gc_paused():
+            for scores in state["maps"].values():
+                for i, attributes in enumerate(scores):
+                    local_score = LocalScore.__new__(LocalScore)
+                    attributes["client"] = self.client
+                    local_score.__dict__ = attributes
+                    scores[i] = local_score
+            self._set_maps(state["version"], state["maps"], file_state)
 
-    def load_pp(self):
+    def _map_scores(self):
+        # looked up by md5 rather than through each score's map, so a lazy osu!.db doesn't decode every scored map
+        osu_db = self.client.osu_db
+        hash_to_id = osu_db.hash_to_id if osu_db is not None else {}
+        self.score_by_map = {}
         for md5, scores in self.maps.items():
-            for score in scores:
-                score.get_pp()
+            beatmap_id = hash_to_id.get(md5)
+            if scores and beatmap_id is not None:
+                self.score_by_map[beatmap_id] = scores
+
+    def maps_changed(self):
+        """Forget what was worked out from osu!.db (score_by_map and ranked statuses) after it's changed. Called by
+        OsuDB.reload()."""
+        self._map_scores()
+        self._ranked = {}
+
+    def _index(self):
+        entries = list(enumerate(self._replays.values()))
+        per_user = {}
+        for entry in entries:
+            per_user.setdefault(entry[1].username, []).append(entry)
+        self.by_user = {username: TimeIndex(user_entries) for username, user_entries in per_user.items()}
+        self.by_time = TimeIndex(entries)
+        self._online_ids = {score.online_id: score for _, score in entries if score.online_id}
+        self._ranked = {}
+
+    def get_score_by_replay_hash(self, replay_hash: str):
+        """Look a score up by the md5 hash of its replay.
+
+        Args:
+            replay_hash: the hash
+
+        Returns:
+            LocalScore: the score, or None if it isn't in scores.db
+        """
+        return self._replays.get(replay_hash)
+
+    def get_score_by_online_id(self, online_id: int):
+        """Look a submitted score up by its online score id.
+
+        Args:
+            online_id: the id
+
+        Returns:
+            LocalScore: the score, or None if it isn't in scores.db
+        """
+        return self._online_ids.get(online_id)
+
+    def is_ranked(self, md5_hash: str):
+        """Whether a map is ranked, according to osu!.db. Cached per map until the next reload.
+
+        Args:
+            md5_hash: md5 hash of the map
+
+        Returns:
+            bool: whether it's ranked, False if it isn't in osu!.db
+        """
+        ranked = self._ranked.get(md5_hash)
+        if ranked is None:
+            beatmap = self.client.get_local_map(md5_hash)
+            ranked = self._ranked[md5_hash] = beatmap is not None and beatmap.approval == Approval.RANKED
+        return ranked
+
+    def get_scores_between(self, start=None, end=None, names=None, ranked_only=False):
+        """Get the scores set in a time range, grouped by map.
+
+        Args:
+            start: earliest time (inclusive), or None for no limit
+            end: latest time (exclusive), or None for no limit
+            names: usernames whose scores to include, or None for everyone's
+            ranked_only: only include scores on ranked maps
+
+        Returns:
+            dict: map md5 hash to list of LocalScores, both in scores.db order
+        """
+        if names is None:
+            found = self.by_time.between(start, end)
+        else:
+            found = []
+            for name in set(names):
+                index = self.by_user.get(name)
+                if index is not None:
+                    found += index.between(start, end)
+        found.sort(key=lambda entry: entry[0])
+        by_map = {}
+        for _, score in found:
+            if ranked_only and not self.is_ranked(score.map_hash):
+                continue
+            by_map.setdefault(score.map_hash, []).append(score)
+        return by_map
 
     def get_scores_before(self, timestamp, names=None, ranked_only=False):
-        before_timestamp = {}
+        """Get the scores set before a time, grouped by map.
+
+        Args:
+            timestamp: the time (exclusive)
+            names: usernames whose scores to include, or None for everyone's
+            ranked_only: only include scores on ranked maps
+
+        Returns:
+            dict: map md5 hash to list of LocalScores, both in scores.db order
+        """
+        return self.get_scores_between(None, timestamp, names or None, ranked_only)
+
+    def load_pp(self, workers: int = 1):
+        """Calculate the pp of every score. Scores are grouped by map, so each map's oppai handle is reused for all of
+        its scores before moving on. Scores on maps that aren't installed are left without pp.
+
+        If the client has a PPStore (see OsuClientV1.set_pp_store()), pp already stored is used instead of being
+        calculated again, and what is calculated is added to it.
+
+        Args:
+            workers: number of threads to calculate on (see Oppai.calculate_many()), or None for one per core
+        """
+        store = getattr(self.client, "pp_store", None)
+        known = store.get_many(self.maps) if store is not None else {}
+        pending = []
+        requests = []
         for md5, scores in self.maps.items():
-            if ranked_only:
-                if ranked_only:
-                    beatmap = self.client.get_local_map(md5)
-                    if beatmap.approval != Approval.RANKED:
-                        continue
-            scores_before = list(filter(lambda x: x.timestamp < timestamp, scores))
-            if names:
-                scores_before = list(
-                    filter(lambda x: x.username in names, scores_before)
-                )
-            if scores_before:
-                before_timestamp[md5] = scores_before
-        return before_timestamp
+            local_map = self.client.get_local_map(md5)
+            if local_map is None:
+                continue
+            for score in scores:
+                request = local_map.pp_request(score)
+                key = PPStore.key(md5, request[1])
+                if key in known:
+                    score.pp = known[key]
+                else:
+                    pending.append((score, key))
+                    requests.append(request)
+
+        def fill(position, pp):
+            pending[position][0].pp = pp
+
+        results = Oppai.calculate_many(requests, workers, on_result=fill)
+        if store is not None:
+            store.put_many((key, pp) for (_, key), pp in zip(pending, results) if pp is not None)
+
+    def pp_history(self, names=None, ranked_only: bool = True, limit: int = 100):
+        """Work out how a player's profile pp changed over time, by replaying their scores in the order they were set.
+        Scores without pp yet have it calculated.
+
+        Args:
+            names: usernames of the player, or None for the osu!.db owner's name
+            ranked_only: only count scores on ranked maps
+            limit: number of top plays that count
+
+        Returns:
+            PPHistory: the history, with the total after each score that changed it in .series
+        """
+        from .pphistory import PPHistory
+
+        if not names:
+            names = [self.client.osu_db.player_name]
+        return PPHistory.from_scores_db(self, names, ranked_only, limit)
 
     def get_best_scores_before(self, timestamp, names=None, ranked_only=False):
         if not names:
@@ -240,10 +1150,7 @@ class ScoresDB:
         best_scores = []
         for md5, scores in all_scores.items():
             try:
-                scores.sort(key=lambda x: x.score, reverse=True)
-                if not scores:
-                    continue
-                best = scores[0]
+                best = max(scores, key=lambda x: x.score)
                 if not best.pp:
                     best.get_pp()
                 if best.pp:
@@ -258,9 +1165,7 @@ class ScoresDB:
     def export(self, path=None):
         if not path:
             path = "scores.json"
-        db_dict = self.__dict__.copy()
-        db_dict.pop("client")
-        db_dict.pop("maps")
+        db_dict = {"version": self.version, "score_by_map": self.score_by_map}
         json_str = json.dumps(db_dict, sort_keys=True, indent=4, default=str)
         with open(path, "w") as f:
             f.write(json_str)
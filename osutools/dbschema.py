@@ -0,0 +1,317 @@
+import gc
+import mmap
+import struct
+import threading
+from contextlib import contextmanager
+
+STRING = "string"
+"""str: field kind of an osu! string (0x00 for None, or 0x0b then a uleb128 length and the utf-8 bytes)"""
+INT_DOUBLES = "int_doubles"
+"""str: field kind of an int count followed by that many (int, double) pairs, e.g. star ratings per mod combination"""
+TIMING_POINTS = "timing_points"
+"""str: field kind of an int count followed by that many (bpm, offset, inherited) timing points"""
+
+INT = struct.Struct("<I")
+DOUBLE = struct.Struct("<d")
+INT_DOUBLE = struct.Struct("<xIxd")
+TIMING_POINT = struct.Struct("<dd?")
+
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def mapped(path):
+    """Map a file into memory read only for as long as the with block runs.
+
+    Args:
+        path: path of the file
+
+    Yields:
+        mmap: the file's contents (or empty bytes for an empty file, which can't be mapped)
+    """
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b""
+            return
+    try:
+        yield buf
+    finally:
+        buf.close()
+
+
+@contextmanager
+def gc_paused():
+    """Turn the cyclic garbage collector off for the with block. Decoding a db creates millions of tuples, lists and
+    dicts that all survive, and the collector would otherwise keep stopping to scan them for cycles that don't exist.
+
+    The collector is process wide, so nested and concurrent pauses (e.g. dbs loading on several threads) are counted:
+    it's only put back, to whatever state it was in before the first pause, once the last one ends.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+
+def decode_string(buf, offset: int):
+    """Decode an osu! string.
+
+    Args:
+        buf: the db's contents
+        offset: where the string starts
+
+    Returns:
+        (str, int): the string (or None) and the offset just after it
+    """
+    if buf[offset] == 0:
+        return None, offset + 1
+    offset += 1
+    size = buf[offset]
+    offset += 1
+    if size & 0x80:
+        size &= 0x7F
+        shift = 7
+        while True:
+            byte = buf[offset]
+            offset += 1
+            size |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+            shift += 7
+    end = offset + size
+    raw = buf[offset:end]
+    try:
+        return raw.decode("utf-8"), end
+    except ValueError:
+        return raw.decode("ISO-8859-1"), end
+
+
+def decode_int_doubles(buf, offset: int):
+    count = INT.unpack_from(buf, offset)[0]
+    offset += 4
+    end = offset + count * INT_DOUBLE.size
+    return list(INT_DOUBLE.iter_unpack(buf[offset:end])), end
+
+
+def decode_timing_points(buf, offset: int):
+    count = INT.unpack_from(buf, offset)[0]
+    offset += 4
+    end = offset + count * TIMING_POINT.size
+    return list(TIMING_POINT.iter_unpack(buf[offset:end])), end
+
+
+def skip_string(buf, offset: int):
+    if buf[offset] == 0:
+        return offset + 1
+    offset += 1
+    size = 0
+    shift = 0
+    while True:
+        byte = buf[offset]
+        offset += 1
+        size |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return offset + size
+        shift += 7
+
+
+_VARIABLE = {
+    STRING: decode_string,
+    INT_DOUBLES: decode_int_doubles,
+    TIMING_POINTS: decode_timing_points,
+}
+
+
+class Field:
+    """One field of a db record.
+
+    Attributes:
+        name: key the value is stored under, or None to skip over it
+        kind: a struct format character for fixed width fields (e.g. "I"), or STRING, INT_DOUBLES or TIMING_POINTS
+        convert: function applied to the decoded value, or None
+        since: first db version the field is in, or None if it always has been
+        before: first db version the field isn't in anymore, or None if it still is
+    """
+
+    def __init__(self, name, kind: str, convert=None, since: int = None, before: int = None):
+        self.name = name
+        self.kind = kind
+        self.convert = convert
+        self.since = since
+        self.before = before
+
+    def in_version(self, version: int):
+        return (self.since is None or version >= self.since) and (
+            self.before is None or version < self.before
+        )
+
+
+class Schema:
+    """Layout of a db record, declared once for every db version and compiled per version into a RecordDecoder.
+
+    Attributes:
+        fields: the Fields of the record, in order
+    """
+
+    def __init__(self, *fields: Field):
+        self.fields = fields
+        self._compiled = {}
+
+    def scanner(self, version: int, names):
+        """Get a scanner for records written by a db version that only decodes some fields.
+
+        Args:
+            version: the version number from the db's header
+            names: names of the fields to decode
+
+        Returns:
+            RecordScanner: scanner for that version's records
+        """
+        key = (version, tuple(names))
+        scanner = self._compiled.get(key)
+        if scanner is None:
+            scanner = self._compiled[key] = RecordScanner(
+                [field for field in self.fields if field.in_version(version)], key[1]
+            )
+        return scanner
+
+    def compile(self, version: int):
+        """Get the decoder for records written by a db version. Compiled decoders are kept, so this is cheap to call.
+
+        Args:
+            version: the version number from the db's header
+
+        Returns:
+            RecordDecoder: decoder for that version's records
+        """
+        decoder = self._compiled.get(version)
+        if decoder is None:
+            decoder = self._compiled[version] = RecordDecoder(
+                [field for field in self.fields if field.in_version(version)]
+            )
+        return decoder
+
+
+class RecordDecoder:
+    """Decodes one version's records. Consecutive fixed width fields are merged into a single precompiled struct, so a
+    record is decoded with one unpack_from per run of them plus one call per variable length field.
+
+    Attributes:
+        steps: list of (struct.Struct, names) for a run of fixed width fields, or (decode function, name) for a
+            variable length one
+        converters: list of (name, function) applied once the record is decoded
+    """
+
+    def __init__(self, fields):
+        self.steps = []
+        self.converters = []
+        fmt = ""
+        names = []
+        for field in fields:
+            if field.kind in _VARIABLE:
+                if fmt:
+                    self.steps.append((struct.Struct("<" + fmt), tuple(names)))
+                    fmt, names = "", []
+                self.steps.append((_VARIABLE[field.kind], field.name))
+            elif field.name is None:
+                fmt += f"{struct.calcsize('<' + field.kind)}x"
+            else:
+                fmt += field.kind
+                names.append(field.name)
+            if field.name is not None and field.convert is not None:
+                self.converters.append((field.name, field.convert))
+        if fmt:
+            self.steps.append((struct.Struct("<" + fmt), tuple(names)))
+
+    def decode(self, buf, offset: int, info: dict = None):
+        """Decode a record.
+
+        Args:
+            buf: the db's contents
+            offset: where the record starts
+            info: dict to store the fields in, a new one if None
+
+        Returns:
+            (dict, int): the record's fields and the offset just after it
+        """
+        if info is None:
+            info = {}
+        for step, names in self.steps:
+            if type(step) is struct.Struct:
+                info.update(zip(names, step.unpack_from(buf, offset)))
+                offset += step.size
+            else:
+                value, offset = step(buf, offset)
+                if names is not None:
+                    info[names] = value
+        for name, convert in self.converters:
+            info[name] = convert(info[name])
+        return info, offset
+
+
+class RecordScanner:
+    """Finds where each record ends while only decoding the named fields, skipping over everything else without
+    unpacking it. Used to index a db before deciding which records are worth decoding in full.
+
+    Attributes:
+        steps: list of (kind, bytes to skip first, struct.Struct or None, name)
+        tail: fixed width bytes at the end of the record
+    """
+
+    def __init__(self, fields, names):
+        self.steps = []
+        skip = 0
+        for field in fields:
+            if field.kind == STRING:
+                self.steps.append((STRING, skip, None, field.name if field.name in names else None))
+                skip = 0
+            elif field.kind in _VARIABLE:
+                size = INT_DOUBLE.size if field.kind == INT_DOUBLES else TIMING_POINT.size
+                self.steps.append((field.kind, skip, size, field.name if field.name in names else None))
+                skip = 0
+            elif field.name in names:
+                self.steps.append((None, skip, struct.Struct("<" + field.kind), field.name))
+                skip = 0
+            else:
+                skip += struct.calcsize("<" + field.kind)
+        self.tail = skip
+
+    def scan(self, buf, offset: int):
+        """Scan a record.
+
+        Args:
+            buf: the db's contents
+            offset: where the record starts
+
+        Returns:
+            (dict, int): the named fields and the offset just after the record
+        """
+        found = {}
+        for kind, skip, item, name in self.steps:
+            offset += skip
+            if kind is None:
+                found[name] = item.unpack_from(buf, offset)[0]
+                offset += item.size
+            elif kind == STRING:
+                if name is None:
+                    offset = skip_string(buf, offset)
+                else:
+                    found[name], offset = decode_string(buf, offset)
+            elif name is None:
+                offset += 4 + INT.unpack_from(buf, offset)[0] * item
+            else:
+                found[name], offset = _VARIABLE[kind](buf, offset)
+        return found, offset + self.tail
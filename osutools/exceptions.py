@@ -1,2 +1,6 @@
 class RequestException(BaseException):
-    """Raise with error making a request"""
\ No newline at end of file
+    """Raise with error making a request"""
+
+
+class RateLimitException(RequestException):
+    """Raise when a request couldn't get through the client's rate limiter in time"""
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+
+
+class OsuFileCache:
+    """Directory of downloaded .osu files, so pp for online maps only downloads each map once.
+
+    Files are named after the beatmap id and the md5 hash of their contents, so a map that's been updated since it was
+    downloaded (and so has a different md5 hash in the api) is downloaded again, replacing the old version. The least
+    recently used files are deleted once the cache is bigger than max_bytes. Recency is kept in the files' modification
+    times, so it carries over between runs.
+
+    Attributes:
+        cache_dir: directory the files are kept in
+        max_bytes: most bytes of files kept
+    """
+
+    def __init__(self, cache_dir, max_bytes: int = 256 * 2 ** 20):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._files = OrderedDict()
+        self._bytes = 0
+        found = []
+        for path in self.cache_dir.glob("*-*.osu"):
+            beatmap_id, _, md5_hash = path.stem.partition("-")
+            if beatmap_id.isdigit():
+                stat = path.stat()
+                found.append((stat.st_mtime_ns, (int(beatmap_id), md5_hash), stat.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._bytes += size
+
+    def path(self, beatmap_id: int, md5_hash: str):
+        """Get where a map's file is (or would be) kept.
+
+        Args:
+            beatmap_id: id of the map
+            md5_hash: md5 hash of the file
+
+        Returns:
+            Path: path of the file
+        """
+        return self.cache_dir / f"{beatmap_id}-{md5_hash}.osu"
+
+    def get(self, beatmap_id: int, md5_hash: str):
+        """Look up a map's file, marking it as recently used.
+
+        Args:
+            beatmap_id: id of the map
+            md5_hash: md5 hash of the version of the map wanted
+
+        Returns:
+            Path: path of the file, or None if it isn't cached
+        """
+        key = (beatmap_id, md5_hash)
+        with self._lock:
+            if key not in self._files:
+                return None
+            self._files.move_to_end(key)
+            path = self.path(beatmap_id, md5_hash)
+            try:
+                os.utime(path)
+            except OSError:
+                # deleted from outside the cache
+                self._bytes -= self._files.pop(key)
+                return None
+        return path
+
+    def put(self, beatmap_id: int, data: bytes):
+        """Add a map's file, replacing any other version of the map and evicting files if the cache is full.
+
+        Args:
+            beatmap_id: id of the map
+            data: contents of the .osu file
+
+        Returns:
+            Path: path of the file
+        """
+        md5_hash = hashlib.md5(data).hexdigest()
+        path = self.path(beatmap_id, md5_hash)
+        temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
+        with self._lock:
+            for key in [key for key in self._files if key[0] == beatmap_id and key[1] != md5_hash]:
+                self._remove(key)
+            self._bytes += len(data) - self._files.pop((beatmap_id, md5_hash), 0)
+            self._files[(beatmap_id, md5_hash)] = len(data)
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                self._remove(next(iter(self._files)))
+        return path
+
+    def _remove(self, key):
+        self._bytes -= self._files.pop(key)
+        try:
+            os.remove(self.path(*key))
+        except OSError:
+            pass
+
+    def fetch(self, beatmap_id: int, md5_hash: str = None, url: str = None):
+        """Get a map's file, downloading it if it isn't cached.
+
+        Args:
+            beatmap_id: id of the map
+            md5_hash: md5 hash of the version of the map wanted, or None to download it every time
+            url: where to download the file from, defaults to osu!'s .osu download
+
+        Returns:
+            Path: path of the file
+        """
+        if md5_hash is not None:
+            path = self.get(beatmap_id, md5_hash)
+            if path is not None:
+                return path
+        data = urllib.request.urlopen(url or f"https://osu.ppy.sh/osu/{beatmap_id}").read()
+        return self.put(beatmap_id, data)
+
+    def clear(self):
+        """Delete every cached file."""
+        with self._lock:
+            for key in list(self._files):
+                self._remove(key)
+
+    @property
+    def size(self):
+        """int: bytes of files currently kept"""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._files)
+
+    def __contains__(self, key):
+        return key in self._files
@@ -3,35 +3,38 @@ import urllib.request
 import os
 from .utils import *
 from .oppai import Oppai
-
-
-class BaseMap:
-    def __init__(self, map_info, client):
+from .model import Model
+
+
+class BaseMap(Model):
+    _fields = {
+        "song_title": lambda m, i: i["title"],
+        "artist": lambda m, i: i["artist"],
+        "length": lambda m, i: (
+            float(i["total_length"]) if float(i["total_length"]) != 4294967295 else 0
+        ),
+        "difficulty_name": lambda m, i: i["version"],
+        "mode": lambda m, i: Mode(int(i["mode"])),
+        "beatmap_id": lambda m, i: int(i["beatmap_id"]),
+        "mapset_id": lambda m, i: int(i["beatmapset_id"]),
+        "creator_name": lambda m, i: i["creator"],
+        "tags": lambda m, i: i["tags"].split(" "),
+        "approval": lambda m, i: Approval(int(i["approved"])),
+        "circle_size": lambda m, i: float(i["diff_size"]),
+        "overall_difficulty": lambda m, i: float(i["diff_overall"]),
+        "approach_rate": lambda m, i: float(i["diff_approach"]),
+        "hp_drain": lambda m, i: float(i["diff_drain"]),
+        "source": lambda m, i: i["source"],
+        "circle_count": lambda m, i: int(i["count_normal"]),
+        "slider_count": lambda m, i: int(i["count_slider"]),
+        "spinner_count": lambda m, i: int(i["count_spinner"]),
+        "total_objects": lambda m, i: m.circle_count + m.slider_count + m.spinner_count,
+        "md5_hash": lambda m, i: i["file_md5"],
+    }
+
+    def __init__(self, map_info, client, lazy: bool = False):
         self.client = client
-        self.song_title = map_info["title"]
-        self.artist = map_info["artist"]
-        self.length = (
-            float(map_info["total_length"])
-            if float(map_info["total_length"]) != 4294967295
-            else 0
-        )
-        self.difficulty_name = map_info["version"]
-        self.mode = Mode(int(map_info["mode"]))
-        self.beatmap_id = int(map_info["beatmap_id"])
-        self.mapset_id = int(map_info["beatmapset_id"])
-        self.creator_name = map_info["creator"]
-        self.tags = map_info["tags"].split(" ")
-        self.approval = Approval(int(map_info["approved"]))
-        self.circle_size = float(map_info["diff_size"])
-        self.overall_difficulty = float(map_info["diff_overall"])
-        self.approach_rate = float(map_info["diff_approach"])
-        self.hp_drain = float(map_info["diff_drain"])
-        self.source = map_info["source"]
-        self.circle_count = int(map_info["count_normal"])
-        self.slider_count = int(map_info["count_slider"])
-        self.spinner_count = int(map_info["count_spinner"])
-        self.total_objects = self.circle_count + self.slider_count + self.spinner_count
-        self.md5_hash = map_info["file_md5"]
+        self._load(map_info, lazy)
 
     def __repr__(self):
         return (
@@ -92,19 +95,38 @@ class LocalMap(BaseMap):
         Returns:
             float: Maximum PP for the map.
         """
+        filename, inputs = self.pp_request(score)
+        store = getattr(self.client, "pp_store", None)
+        if store is not None:
+            pp = store.get(self.md5_hash, inputs)
+            if pp is not None:
+                return pp
+        pp = Oppai.calculate_pp(filename, **inputs)
+        if store is not None:
+            store.put(self.md5_hash, inputs, pp)
+        return pp
+
+    def pp_request(self, score):
+        """
+        Get what oppai needs to calculate the PP for a score on the map, e.g. to pass to Oppai.calculate_many()
+        Args:
+            score: Score to calculate PP for
+
+        Returns:
+            (Path, dict): the map's .osu file and the calculate_pp() arguments for the score
+        """
         filename = (
             self.client.osu_folder / "Songs" / self.folder_name.strip() / self.filename
         )
         # filename = f"{self.client.osu_folder}\\Songs\\{self.folder_name.strip()}\\{self.filename}"
 
-        return Oppai.calculate_pp(
-            filename,
-            mods=score.mods.value,
-            max_combo=score.max_combo,
-            misses=score.misses,
-            num_100=score.num_100,
-            num_50=score.num_50,
-        )
+        return filename, {
+            "mods": score.mods.value,
+            "max_combo": score.max_combo,
+            "misses": score.misses,
+            "num_100": score.num_100,
+            "num_50": score.num_50,
+        }
 
     def get_local_scores(self):
         if self.md5_hash in self.client.scores_db.maps.keys():
@@ -116,41 +138,34 @@ class LocalMap(BaseMap):
 
 
 class Map(BaseMap):
-    def __init__(self, map_info, client):
-        super().__init__(map_info, client)
-        self.bpm = float(map_info["bpm"])
-        self.genre = Genre(int(map_info["genre_id"]))
-        self.language = Language(int(map_info["language_id"]))
-        self.creator_id = int(map_info["creator_id"])
-        self.favourites = int(map_info["favourite_count"])
-        self.rating = float(map_info["rating"])
-        self.playcount = int(map_info["playcount"])
-        self.passcount = int(map_info["passcount"])
-        self.date_submitted = datetime.strptime(
-            map_info["submit_date"], "%Y-%m-%d %H:%M:%S"
-        )
-        self.date_approved = (
-            datetime.strptime(map_info["approved_date"], "%Y-%m-%d %H:%M:%S")
-            if map_info["approved_date"]
-            else None
-        )
-        self.last_update = datetime.strptime(
-            map_info["last_update"], "%Y-%m-%d %H:%M:%S"
-        )
-        self.star_rating = float(map_info["difficultyrating"])
-        self.aim_difficulty = float(map_info["diff_aim"])
-        self.speed_difficulty = float(map_info["diff_speed"])
-        self.no_break_length = float(map_info["hit_length"])
-        self.max_combo = int(map_info["max_combo"])
-        self.storyboard = map_info["storyboard"] == "1"
-        self.video = map_info["video"] == "1"
-        self.download_unavailable = map_info["download_unavailable"] == "1"
-        self.audio_unavailable = map_info["audio_unavailable"] == "1"
-        self.download_url = f"https://osu.ppy.sh/osu/{self.beatmap_id}"
-        self.cover_image_url = (
-            f"https://assets.ppy.sh/beatmaps/{self.mapset_id}/covers/cover.jpg"
-        )
-        self.thumbnail = f"https://b.ppy.sh/thumb/{self.mapset_id}l.jpg"
+    _fields = {
+        **BaseMap._fields,
+        "bpm": lambda m, i: float(i["bpm"]),
+        "genre": lambda m, i: Genre(int(i["genre_id"])),
+        "language": lambda m, i: Language(int(i["language_id"])),
+        "creator_id": lambda m, i: int(i["creator_id"]),
+        "favourites": lambda m, i: int(i["favourite_count"]),
+        "rating": lambda m, i: float(i["rating"]),
+        "playcount": lambda m, i: int(i["playcount"]),
+        "passcount": lambda m, i: int(i["passcount"]),
+        "date_submitted": lambda m, i: parse_timestamp(i["submit_date"]),
+        "date_approved": lambda m, i: parse_timestamp(i["approved_date"]),
+        "last_update": lambda m, i: parse_timestamp(i["last_update"]),
+        "star_rating": lambda m, i: float(i["difficultyrating"]),
+        "aim_difficulty": lambda m, i: float(i["diff_aim"]),
+        "speed_difficulty": lambda m, i: float(i["diff_speed"]),
+        "no_break_length": lambda m, i: float(i["hit_length"]),
+        "max_combo": lambda m, i: int(i["max_combo"]),
+        "storyboard": lambda m, i: i["storyboard"] == "1",
+        "video": lambda m, i: i["video"] == "1",
+        "download_unavailable": lambda m, i: i["download_unavailable"] == "1",
+        "audio_unavailable": lambda m, i: i["audio_unavailable"] == "1",
+        "download_url": lambda m, i: f"https://osu.ppy.sh/osu/{m.beatmap_id}",
+        "cover_image_url": lambda m, i: (
+            f"https://assets.ppy.sh/beatmaps/{m.mapset_id}/covers/cover.jpg"
+        ),
+        "thumbnail": lambda m, i: f"https://b.ppy.sh/thumb/{m.mapset_id}l.jpg",
+    }
 
     def fetch_creator(self):
         """Makes an api call to get more information about the map creator
@@ -208,12 +223,19 @@ class Map(BaseMap):
             float: Maximum PP for the map.
         """
         if not self.download_unavailable:
-            pp_out = Oppai.calculate_pp_from_url(
-                self.download_url,
-                mods=score.mods.value,
-                max_combo=score.max_combo,
-                misses=score.misses,
-                num_100=score.num_100,
-                num_50=score.num_50,
-            )
+            if score is None:
+                inputs = {"mods": mods.value}
+            else:
+                inputs = {
+                    "mods": score.mods.value,
+                    "max_combo": score.max_combo,
+                    "misses": score.misses,
+                    "num_100": score.num_100,
+                    "num_50": score.num_50,
+                }
+            file_cache = getattr(self.client, "osu_file_cache", None)
+            if file_cache is not None:
+                filename = file_cache.fetch(self.beatmap_id, self.md5_hash, self.download_url)
+                return Oppai.calculate_pp(filename, **inputs)
+            pp_out = Oppai.calculate_pp_from_url(self.download_url, **inputs)
             return pp_out
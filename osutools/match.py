@@ -1,9 +1,13 @@
-from datetime import datetime
+import asyncio
+import time
+from enum import Enum
+
 from .utils import *
 from .score import MultiScore
+from .model import Model
 
 
-class Match:
+class Match(Model):
     """A past/ongoing multiplayer lobby
 
     Attributes:
@@ -16,31 +20,27 @@ class Match:
         url: the url for the match to view in a browser
     """
 
-    def __init__(self, match_info, client):
-        match_attr = match_info["match"]
-        games_list = match_info["games"]
+    _fields = {
+        "match_id": lambda m, i: int(i["match"]["match_id"]),
+        "name": lambda m, i: i["match"]["name"],
+        "start_time": lambda m, i: parse_timestamp(i["match"]["start_time"]),
+        "end_time": lambda m, i: parse_timestamp(i["match"]["end_time"]),
+        "games": lambda m, i: [
+            Game(game_info, m.client, m.match_id, m._lazy) for game_info in i["games"]
+        ],
+        "url": lambda m, i: f"https://osu.ppy.sh/community/matches/{m.match_id}",
+    }
+
+    def __init__(self, match_info, client, lazy: bool = False):
         self.client = client
-        self.match_id = int(match_attr["match_id"])
-        self.name = match_attr["name"]
-        self.start_time = datetime.strptime(
-            match_attr["start_time"], "%Y-%m-%d %H:%M:%S"
-        )
-        self.end_time = (
-            datetime.strptime(match_attr["end_time"], "%Y-%m-%d %H:%M:%S")
-            if match_attr["end_time"]
-            else None
-        )
-        self.games = [
-            Game(game_info, client, self.match_id) for game_info in games_list
-        ]
-        self.url = f"https://osu.ppy.sh/community/matches/{self.match_id}"
+        self._load(match_info, lazy)
 
     def __repr__(self):
         games = "\n".join([str(x) for x in self.games])
         return f"{self.match_id}: {self.name}\n{games}"
 
 
-class Game:
+class Game(Model):
     """A specific round of a multiplayer lobby
 
     Attributes:
@@ -58,26 +58,28 @@ class Game:
         scores: a list of multiplayer-specific score objects representing the results of the round for each player
     """
 
-    def __init__(self, game_info, client, match_id: int):
-        self.game_id = int(game_info["game_id"])
-        self.match_id = match_id
-        self.client = client
-        self.start_time = datetime.strptime(
-            game_info["start_time"], "%Y-%m-%d %H:%M:%S"
-        )
-        self.end_time = datetime.strptime(game_info["end_time"], "%Y-%m-%d %H:%M:%S")
-        self.play_mode = Mode(int(game_info["play_mode"]))
-        self.map_id = int(game_info["beatmap_id"])
-        self.match_type = int(game_info["match_type"])
-        self.score_type = WinCon(int(game_info["scoring_type"]))
-        self.team_type = TeamType(int(game_info["team_type"]))
-        self.mods = Mods(int(game_info["mods"]))
-        self.scores = [
+    _fields = {
+        "game_id": lambda g, i: int(i["game_id"]),
+        "start_time": lambda g, i: parse_timestamp(i["start_time"]),
+        "end_time": lambda g, i: parse_timestamp(i["end_time"]),
+        "play_mode": lambda g, i: Mode(int(i["play_mode"])),
+        "map_id": lambda g, i: int(i["beatmap_id"]),
+        "match_type": lambda g, i: int(i["match_type"]),
+        "score_type": lambda g, i: WinCon(int(i["scoring_type"])),
+        "team_type": lambda g, i: TeamType(int(i["team_type"])),
+        "mods": lambda g, i: Mods(int(i["mods"])),
+        "scores": lambda g, i: [
             MultiScore(
-                score_info, client, self.map_id, match_id, self.game_id, self.mods
+                score_info, g.client, g.map_id, g.match_id, g.game_id, g.mods, g._lazy
             )
-            for score_info in game_info["scores"]
-        ]
+            for score_info in i["scores"]
+        ],
+    }
+
+    def __init__(self, game_info, client, match_id: int, lazy: bool = False):
+        self.match_id = match_id
+        self.client = client
+        self._load(game_info, lazy)
 
     def get_players(self):
         """The users who took part in this game. Not an api call.
@@ -89,3 +91,133 @@ class Game:
 
     def __repr__(self):
         return f"{self.game_id}: {self.score_type.name} {self.team_type.name} game with {self.mods} on map {self.map_id}"
+
+
+class MatchEventType(Enum):
+    """What happened in a match between two polls"""
+
+    GAME_STARTED = 0
+    GAME_FINISHED = 1
+    GAME_UPDATED = 2
+    MATCH_ENDED = 3
+
+
+class MatchEvent:
+    """Something that happened in a tracked match.
+
+    Attributes:
+        type: MatchEventType of the event
+        match: the Match after the poll that saw the event
+        game: the Game the event is about (None for MATCH_ENDED)
+    """
+
+    def __init__(self, event_type: MatchEventType, match: Match, game: Game = None):
+        self.type = event_type
+        self.match = match
+        self.game = game
+
+    def __repr__(self):
+        return f"{self.type.name}: {self.game if self.game is not None else self.match.match_id}"
+
+
+class MatchTracker:
+    """Follows an ongoing match by polling it, only parsing the games that are new or changed since the last poll.
+
+    Games whose game_id and end_time are the same as last poll are reused as they are, so a poll of a match with
+    hundreds of games costs about the same as one with a few.
+
+    Iterate over the tracker (or async iterate, with an AsyncOsuClientV1) to get MatchEvents as they happen, until the
+    match ends. Or call update() yourself.
+
+    Attributes:
+        client: OsuClientV1 or AsyncOsuClientV1 used to make requests
+        match_id: id of the match being tracked
+        interval: seconds between polls
+        match: the Match as of the last poll, or None before the first
+    """
+
+    def __init__(self, client, match_id: int, interval: float = 10.0):
+        """Start tracking a match. No request is made until the first update.
+
+        Args:
+            client: client used to make requests
+            match_id: id of the match
+            interval: seconds between polls when iterating
+        """
+        self.client = client
+        self.match_id = match_id
+        self.interval = interval
+        self.match = None
+        self._games = {}
+
+    @property
+    def ended(self):
+        return self.match is not None and self.match.end_time is not None
+
+    def _apply(self, match_json):
+        """Build the new Match from a response, reusing unchanged games, and work out what happened."""
+        lazy = self.client.lazy_models
+        # a lazy Match only converts the fields that are read, and games is filled in here instead of being parsed
+        match = Match(match_json, self.client, lazy=True)
+        events = []
+        games = []
+        seen = {}
+        for game_info in match_json["games"]:
+            game_id = game_info["game_id"]
+            end_time = game_info["end_time"]
+            previous = self._games.get(game_id)
+            if previous is not None and previous[0] == end_time:
+                game = previous[1]
+            else:
+                game = Game(game_info, self.client, match.match_id, lazy)
+                if previous is None:
+                    events.append(MatchEvent(MatchEventType.GAME_STARTED, match, game))
+                    if end_time:
+                        events.append(MatchEvent(MatchEventType.GAME_FINISHED, match, game))
+                elif previous[0] is None:
+                    events.append(MatchEvent(MatchEventType.GAME_FINISHED, match, game))
+                else:
+                    events.append(MatchEvent(MatchEventType.GAME_UPDATED, match, game))
+            seen[game_id] = (end_time, game)
+            games.append(game)
+        match.games = games
+        was_ended = self.ended
+        self._games = seen
+        self.match = match
+        if self.ended and not was_ended:
+            events.append(MatchEvent(MatchEventType.MATCH_ENDED, match))
+        return events
+
+    def update(self):
+        """Poll the match once.
+
+        Returns:
+            [MatchEvent]: what changed since the last poll, in order
+        """
+        return self._apply(self.client._request_api("get_match", {"mp": self.match_id}))
+
+    async def update_async(self):
+        """Same as update(), for an AsyncOsuClientV1.
+
+        Returns:
+            [MatchEvent]: what changed since the last poll, in order
+        """
+        return self._apply(await self.client._request_api("get_match", {"mp": self.match_id}))
+
+    def __iter__(self):
+        while True:
+            yield from self.update()
+            if self.ended:
+                return
+            time.sleep(self.interval)
+
+    async def _track_async(self):
+        while True:
+            for event in await self.update_async():
+                yield event
+            if self.ended:
+                return
+            await asyncio.sleep(self.interval)
+
+    def __aiter__(self):
+        return self._track_async()
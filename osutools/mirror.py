@@ -0,0 +1,224 @@
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+from .map import Map
+from .ratelimit import Priority, lane
+from .transport import json_loads
+from .utils import format_timestamp, parse_timestamp
+
+
+class BeatmapMirror:
+    """Local copy of osu!'s ranked/approved/loved/qualified beatmap pool, stored in an sqlite database.
+
+    sync() walks the pool in approved_date order using get_beatmaps' since parameter, 500 maps a request, writing each
+    page to disk as it arrives and saving a checkpoint after every page. An interrupted sync resumes from the last
+    checkpoint, and later syncs only fetch maps approved since the previous one. Lookups are then answered from disk
+    instead of the api.
+
+    Attributes:
+        client: OsuClientV1 used to make requests and given to the Map objects returned
+        path: path of the sqlite database
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self, client, path):
+        """Open (or create) a mirror.
+
+        Args:
+            client: OsuClientV1 used to make requests
+            path: path of the sqlite database to store maps in
+        """
+        self.client = client
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS maps (
+                beatmap_id INTEGER PRIMARY KEY,
+                beatmapset_id INTEGER NOT NULL,
+                file_md5 TEXT,
+                approved INTEGER NOT NULL,
+                approved_date TEXT,
+                mode INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS maps_md5 ON maps (file_md5);
+            CREATE INDEX IF NOT EXISTS maps_set ON maps (beatmapset_id);
+            CREATE INDEX IF NOT EXISTS maps_approved_date ON maps (approved_date);
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self._db.commit()
+
+    @property
+    def cursor(self):
+        """datetime: approved_date of the newest map stored so far, or None if nothing has been synced yet."""
+        row = self._db.execute("SELECT value FROM state WHERE key = 'cursor'").fetchone()
+        return parse_timestamp(row[0]) if row else None
+
+    def _store_page(self, maps_json, cursor: str):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO maps VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    int(map_info["beatmap_id"]),
+                    int(map_info["beatmapset_id"]),
+                    map_info["file_md5"],
+                    int(map_info["approved"]),
+                    map_info["approved_date"],
+                    int(map_info["mode"]),
+                    json.dumps(map_info),
+                )
+                for map_info in maps_json
+            ],
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO state VALUES ('cursor', ?)", (cursor,)
+        )
+        self._db.commit()
+
+    def _page_params(self, cursor):
+        params = {"limit": self.PAGE_SIZE}
+        if cursor:
+            # since is exclusive and difficulties of a set share an approved_date, so step back a second to pick
+            # up the rest of a set that was split across pages. they're just overwritten if already stored
+            params["since"] = format_timestamp(cursor - timedelta(seconds=1))
+        return params
+
+    def _take_page(self, maps_json, cursor):
+        """Store a page of a sync.
+
+        Returns:
+            (datetime, int, bool): the new cursor, number of maps written and whether the sync is finished
+        """
+        if not maps_json:
+            return cursor, 0, True
+        newest = parse_timestamp(max(map_info["approved_date"] for map_info in maps_json))
+        if cursor and newest <= cursor:
+            if len(maps_json) < self.PAGE_SIZE:
+                return cursor, 0, True
+            # a whole page shares one approved_date, skip past it rather than asking for it forever
+            newest = cursor + timedelta(seconds=1)
+        self._store_page(maps_json, format_timestamp(newest))
+        return newest, len(maps_json), len(maps_json) < self.PAGE_SIZE
+
+    def sync(self, max_pages: int = None):
+        """Fetch every map approved since the last sync (or the whole pool the first time). Requests are made in the
+        client's bulk rate limiter lane. They skip the client's response cache: pages are keyed on the cursor, so a
+        cached page would keep hiding maps approved since it was cached.
+
+        Args:
+            max_pages: stop after this many requests, to spread a first sync out over several runs
+
+        Returns:
+            int: number of maps written
+        """
+        if asyncio.iscoroutinefunction(self.client._request_api):
+            raise TypeError("use sync_async() with an AsyncOsuClientV1")
+        cursor = self.cursor
+        written = 0
+        pages = 0
+        done = False
+        while not done and (max_pages is None or pages < max_pages):
+            with lane(Priority.BULK, owner="mirror"):
+                maps_json = self.client._request_api("get_beatmaps", self._page_params(cursor), cache=False) or []
+            pages += 1
+            cursor, stored, done = self._take_page(maps_json, cursor)
+            written += stored
+        return written
+
+    async def sync_async(self, max_pages: int = None):
+        """Same as sync(), for an AsyncOsuClientV1."""
+        cursor = self.cursor
+        written = 0
+        pages = 0
+        done = False
+        while not done and (max_pages is None or pages < max_pages):
+            with lane(Priority.BULK, owner="mirror"):
+                maps_json = (
+                    await self.client._request_api("get_beatmaps", self._page_params(cursor), cache=False) or []
+                )
+            pages += 1
+            cursor, stored, done = self._take_page(maps_json, cursor)
+            written += stored
+        return written
+
+    def _to_maps(self, rows):
+        return [Map(json_loads(row[0]), self.client, self.client.lazy_models) for row in rows]
+
+    def get_map(self, map_id: int):
+        """Look a map up by id.
+
+        Args:
+            map_id: the id of the map
+
+        Returns:
+            Map: the map, or None if it isn't in the mirror
+        """
+        maps = self._to_maps(
+            self._db.execute("SELECT data FROM maps WHERE beatmap_id = ?", (map_id,))
+        )
+        return maps[0] if maps else None
+
+    def get_map_by_hash(self, md5_hash: str):
+        """Look a map up by the md5 hash of its .osu file.
+
+        Args:
+            md5_hash: md5 hash of the map
+
+        Returns:
+            Map: the map, or None if it isn't in the mirror
+        """
+        maps = self._to_maps(
+            self._db.execute("SELECT data FROM maps WHERE file_md5 = ?", (md5_hash,))
+        )
+        return maps[0] if maps else None
+
+    def get_mapset(self, set_id: int):
+        """Get every difficulty of a beatmapset.
+
+        Args:
+            set_id: the id of the beatmapset
+
+        Returns:
+            [Map]: the maps in the set
+        """
+        return self._to_maps(
+            self._db.execute(
+                "SELECT data FROM maps WHERE beatmapset_id = ? ORDER BY beatmap_id",
+                (set_id,),
+            )
+        )
+
+    def iter_maps(self, since: datetime = None):
+        """Iterate over the stored maps in approved_date order without loading them all into memory.
+
+        Args:
+            since: only include maps approved after this date
+
+        Yields:
+            Map: each stored map
+        """
+        query = "SELECT data FROM maps"
+        args = ()
+        if since:
+            query += " WHERE approved_date > ?"
+            args = (format_timestamp(since),)
+        rows = self._db.execute(query + " ORDER BY approved_date, beatmap_id", args)
+        for row in rows:
+            yield Map(json_loads(row[0]), self.client, self.client.lazy_models)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM maps").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,36 @@
+class Model:
+    """Base class for objects built from an api response dict.
+
+    Subclasses declare their attributes once in _fields, a dict of attribute name to a function taking (self, info)
+    and returning the converted value. Eager models convert every field in __init__, in the order they're declared (so
+    a field can use ones declared before it). Lazy models just keep the response dict and convert each field the first
+    time it's read, caching the result on the instance, which is much cheaper when only a few attributes are used.
+    """
+
+    _fields = {}
+
+    def _load(self, info: dict, lazy: bool = False):
+        """Convert (or, if lazy, store) the response dict.
+
+        Args:
+            info: the response dict for this object
+            lazy: whether to convert fields when they are first read rather than now
+        """
+        self._lazy = lazy
+        if lazy:
+            self._info = info
+        else:
+            for name, convert in self._fields.items():
+                setattr(self, name, convert(self, info))
+
+    def __getattr__(self, name):
+        # only reached when the attribute isn't set yet, i.e. a lazy field being read for the first time
+        info = self.__dict__.get("_info")
+        convert = type(self)._fields.get(name)
+        if info is None or convert is None:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        value = convert(self, info)
+        setattr(self, name, value)
+        return value
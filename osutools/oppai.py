@@ -1,9 +1,11 @@
 import sys
 import pkg_resources
-import tempfile
+import threading
 import urllib.request
 import os
 import platform
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import *
 
 
@@ -21,14 +23,30 @@ class Oppai:
         filename = "liboppaii686.so"
     dll = CDLL(pkg_resources.resource_filename("osutools", f"oppai_files/{filename}"))
     dll.ezpp_new.restype = c_void_p
+    dll.ezpp_free.argtypes = (c_void_p,)
+    dll.ezpp_set_autocalc.argtypes = (c_void_p, c_int)
     dll.ezpp_set_mods.argtypes = (c_void_p, c_int)
     dll.ezpp_set_combo.argtypes = (c_void_p, c_int)
     dll.ezpp_set_nmiss.argtypes = (c_void_p, c_int)
     dll.ezpp_set_accuracy.argtypes = (c_void_p, c_int, c_int)
     dll.ezpp_set_accuracy_percent.argtypes = (c_void_p, c_float)
     dll.ezpp.argtypes = (c_void_p, c_char_p)
+    dll.ezpp_dup.argtypes = (c_void_p, c_char_p)
+    dll.ezpp_data_dup.argtypes = (c_void_p, c_char_p, c_int)
     dll.ezpp_pp.argtypes = (c_void_p,)
     dll.ezpp_pp.restype = c_float
+    dll.errstr.argtypes = (c_int,)
+    dll.errstr.restype = c_char_p
+    dll.oppai_version_str.restype = c_char_p
+
+    @classmethod
+    def version(cls):
+        """Get the version of oppai being used.
+
+        Returns:
+            str: the version, e.g. "4.1.0"
+        """
+        return cls.dll.oppai_version_str().decode()
 
     @classmethod
     def calculate_pp_from_url(
@@ -41,11 +59,8 @@ class Oppai:
         num_50=None,
         accuracy=None,
     ):
-        temp_map = tempfile.NamedTemporaryFile(delete=False)
-        temp_map.write(urllib.request.urlopen(url).read())
-        temp_map.close()
-        pp = cls.calculate_pp(
-            temp_map.name,
+        return cls.calculate_pp_from_data(
+            urllib.request.urlopen(url).read(),
             mods=mods,
             max_combo=max_combo,
             misses=misses,
@@ -53,8 +68,41 @@ class Oppai:
             num_50=num_50,
             accuracy=accuracy,
         )
-        os.remove(temp_map.name)
-        return pp
+
+    @classmethod
+    def calculate_pp_from_data(
+        cls,
+        data: bytes,
+        mods=0,
+        max_combo=None,
+        misses=None,
+        num_100=None,
+        num_50=None,
+        accuracy=None,
+    ):
+        """Calculate the pp of a play on a map that's in memory rather than in a file.
+
+        Args:
+            data: contents of the .osu file
+            mods: mods value
+            max_combo: max combo, or None for a full combo
+            misses: number of misses
+            num_100: number of 100s (used with num_50 if accuracy isn't given)
+            num_50: number of 50s
+            accuracy: accuracy percentage
+
+        Returns:
+            float: the pp
+        """
+        with OppaiHandle(data=data) as handle:
+            return handle.calculate(
+                mods=mods,
+                max_combo=max_combo,
+                misses=misses,
+                num_100=num_100,
+                num_50=num_50,
+                accuracy=accuracy,
+            )
 
     @classmethod
     def calculate_pp(
@@ -67,16 +115,314 @@ class Oppai:
         num_50=None,
         accuracy=None,
     ):
-        ez = Oppai.dll.ezpp_new()
-        cls.dll.ezpp_set_mods(ez, mods)
-        if max_combo is not None:
-            cls.dll.ezpp_set_combo(ez, max_combo)
-        if misses is not None:
-            cls.dll.ezpp_set_nmiss(ez, misses)
-        if accuracy is not None:
-            cls.dll.ezpp_set_accuracy_percent(ez, accuracy)
-        elif num_100 is not None and num_50 is not None:
-            cls.dll.ezpp_set_accuracy(ez, num_100, num_50)
-        cls.dll.ezpp(ez, str(filename).encode())
-        pp_out = cls.dll.ezpp_pp(ez)
-        return pp_out
+        """Calculate the pp of a play on a map, using a pooled handle for the map file (see HandlePool).
+
+        Args:
+            filename: path to the .osu file
+            mods: mods value
+            max_combo: max combo, or None for a full combo
+            misses: number of misses
+            num_100: number of 100s (used with num_50 if accuracy isn't given)
+            num_50: number of 50s
+            accuracy: accuracy percentage
+
+        Returns:
+            float: the pp
+        """
+        while True:
+            handle = cls.handles.get(filename)
+            try:
+                return handle.calculate(
+                    mods=mods,
+                    max_combo=max_combo,
+                    misses=misses,
+                    num_100=num_100,
+                    num_50=num_50,
+                    accuracy=accuracy,
+                )
+            except ValueError:
+                # evicted by another thread between getting it and using it, so get a new one
+                if not handle.closed:
+                    raise
+
+    @classmethod
+    def calculate_many(cls, requests, workers: int = None, on_result=None):
+        """Calculate the pp of lots of plays on a thread pool. oppai runs without holding the GIL, so this scales with
+        the number of cores.
+
+        Requests are grouped by map file and each group (split up if it's a big share of the work) is calculated on one
+        thread with its own handle, so threads never share a handle. Each group is ordered so plays that need the map
+        parsed again (see OppaiHandle) come together.
+
+        Args:
+            requests: (filename, inputs) pairs, where inputs is a dict of calculate_pp() keyword arguments
+            workers: number of threads, or None for one per core
+            on_result: function called with the position of each request and its pp as soon as it's calculated,
+                from the thread that calculated it
+
+        Returns:
+            [float]: pp of each request in the same order, or None where the map couldn't be read
+        """
+        requests = list(requests)
+        workers = workers or os.cpu_count() or 1
+        groups = OrderedDict()
+        for position, (filename, _) in enumerate(requests):
+            groups.setdefault(os.path.abspath(filename), []).append(position)
+
+        def reparse_key(position):
+            inputs = requests[position][1]
+            return _reparse_key(inputs.get("mods", 0), inputs.get("misses"))
+
+        for positions in groups.values():
+            # a handle parses its map again whenever the misses or REPARSE_MODS change, so keep those together
+            positions.sort(key=reparse_key)
+        chunk_size = max(16, -(-len(requests) // workers))
+        chunks = [
+            (filename, positions[i : i + chunk_size])
+            for filename, positions in groups.items()
+            for i in range(0, len(positions), chunk_size)
+        ]
+        results = [None] * len(requests)
+
+        def run(chunk):
+            filename, positions = chunk
+            with OppaiHandle(filename) as handle:
+                for position in positions:
+                    try:
+                        pp = handle.calculate(**requests[position][1])
+                    except ValueError:
+                        continue
+                    results[position] = pp
+                    if on_result is not None:
+                        on_result(position, pp)
+
+        if workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                run(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                list(executor.map(run, chunks))
+        return results
+
+    @classmethod
+    def handle(cls, filename):
+        """Get a handle for calculating lots of plays on one map. Free it with close() or by using it with `with`.
+
+        Args:
+            filename: path to the .osu file
+
+        Returns:
+            OppaiHandle: a new handle for the map
+        """
+        return OppaiHandle(filename)
+
+
+REPARSE_MODS = 2 | 4 | 16 | 64 | 256
+"""int: mods that need a map parsed again when they change: EZ, HR, DT and HT change the map itself, and TD how its
+difficulty is calculated (NC is always sent with DT)"""
+
+
+def _reparse_key(mods, misses):
+    return mods & REPARSE_MODS, misses or 0
+
+
+class OppaiHandle:
+    """An oppai ezpp handle for one .osu file (or the contents of one), freed when closed (or garbage collected).
+
+    The map is parsed on the first calculation, and the handle is then switched to oppai's autocalc mode, where setting
+    an input recalculates the pp from the parsed map. So plays that only differ in combo, accuracy or mods that don't
+    change the map (e.g. HD) are calculated without parsing it again. A change to the misses or to the mods in
+    REPARSE_MODS needs a new parse, which is done once with every input set; calculate_many() orders each map's plays
+    so those changes are rare. Every input is set again for each play, so nothing from the last play carries over to
+    the next. Results are remembered per set of inputs until the file changes on disk (which gets a new handle).
+
+    Attributes:
+        filename: path to the .osu file, or None if the handle was given its contents
+        max_results: most results remembered before the oldest are forgotten
+    """
+
+    def __init__(self, filename=None, max_results: int = 1024, data: bytes = None):
+        """Allocate a handle.
+
+        Args:
+            filename: path to the .osu file
+            max_results: most results to remember
+            data: contents of the .osu file, to parse from memory instead of a file
+        """
+        if (filename is None) == (data is None):
+            raise ValueError("a handle needs either a filename or data")
+        self.filename = None if filename is None else str(filename)
+        self.max_results = max_results
+        self._data = data
+        self._path = None if filename is None else self.filename.encode()
+        self._ez = Oppai.dll.ezpp_new()
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._file_state = None
+        self._parsed = None
+        self._mods = None
+
+    @property
+    def closed(self):
+        """bool: whether the handle has been freed"""
+        return self._ez is None
+
+    def calculate(self, mods=0, max_combo=None, misses=None, num_100=None, num_50=None, accuracy=None):
+        """Calculate the pp of a play on the map.
+
+        Args:
+            mods: mods value
+            max_combo: max combo, or None for a full combo
+            misses: number of misses
+            num_100: number of 100s (used with num_50 if accuracy isn't given)
+            num_50: number of 50s
+            accuracy: accuracy percentage
+
+        Returns:
+            float: the pp
+        """
+        if accuracy is None and (num_100 is None or num_50 is None):
+            num_100 = num_50 = None
+        key = (mods, max_combo, misses, accuracy, num_100, num_50)
+        if self._data is not None:
+            file_state = len(self._data)
+        else:
+            try:
+                stat = os.stat(self.filename)
+            except OSError as e:
+                raise ValueError(f"oppai couldn't calculate pp for {self}: {e.strerror}") from e
+            file_state = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if self._ez is None:
+                raise ValueError(f"{self} is closed")
+            if file_state != self._file_state:
+                # ezpp keeps the difficulty settings it parsed the first time, so start over with a new handle
+                if self._parsed is not None:
+                    self._reset()
+                self._results.clear()
+                self._file_state = file_state
+            pp = self._results.get(key)
+            if pp is not None:
+                self._results.move_to_end(key)
+                return pp
+            dll = Oppai.dll
+            reparse_key = _reparse_key(mods, misses)
+            if reparse_key != self._parsed:
+                # a new parse either way (setting misses in autocalc mode parses the map again even when they haven't
+                # changed), so set everything up front and parse once rather than once per setter
+                dll.ezpp_set_autocalc(self._ez, 0)
+                dll.ezpp_set_mods(self._ez, mods)
+                dll.ezpp_set_combo(self._ez, -1 if max_combo is None else max_combo)
+                dll.ezpp_set_nmiss(self._ez, misses or 0)
+                if accuracy is not None:
+                    dll.ezpp_set_accuracy_percent(self._ez, accuracy)
+                else:
+                    dll.ezpp_set_accuracy(self._ez, num_100 or 0, num_50 or 0)
+                if self._data is not None:
+                    error = dll.ezpp_data_dup(self._ez, self._data, len(self._data))
+                else:
+                    error = dll.ezpp_dup(self._ez, self._path)
+                if error < 0:
+                    # don't leave anything from the failed parse behind for the next try
+                    self._reset()
+                    raise ValueError(f"oppai couldn't calculate pp for {self}: {dll.errstr(error).decode()}")
+                dll.ezpp_set_autocalc(self._ez, 1)
+                self._parsed = reparse_key
+            else:
+                # recalculated from the parsed map as each one is set
+                if mods != self._mods:
+                    dll.ezpp_set_mods(self._ez, mods)
+                # a full combo (-1) is worked out from the misses when it's set
+                dll.ezpp_set_combo(self._ez, -1 if max_combo is None else max_combo)
+                # and accuracy goes last, as every recalculation after an accuracy percentage reuses it
+                if accuracy is not None:
+                    dll.ezpp_set_accuracy_percent(self._ez, accuracy)
+                else:
+                    dll.ezpp_set_accuracy(self._ez, num_100 or 0, num_50 or 0)
+            self._mods = mods
+            pp = dll.ezpp_pp(self._ez)
+            self._results[key] = pp
+            if len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+            return pp
+
+    def _reset(self):
+        Oppai.dll.ezpp_free(self._ez)
+        self._ez = Oppai.dll.ezpp_new()
+        self._parsed = None
+
+    def close(self):
+        """Free the native handle. Does nothing if it's already been freed."""
+        with self._lock:
+            if self._ez is not None:
+                Oppai.dll.ezpp_free(self._ez)
+                self._ez = None
+                self._results.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "_ez", None) is not None:
+            self.close()
+
+    def __repr__(self):
+        source = self.filename if self._data is None else f"{len(self._data)} bytes of beatmap data"
+        return f"OppaiHandle for {source}{' (closed)' if self.closed else ''}"
+
+
+class HandlePool:
+    """Handles for the most recently used map files, so plays on the same map share one handle. The least recently
+    used handle is freed once there are more than max_handles.
+
+    Attributes:
+        max_handles: most handles kept open
+    """
+
+    def __init__(self, max_handles: int = 32):
+        self.max_handles = max_handles
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        """Get the handle for a map file, opening one if there isn't one yet.
+
+        Args:
+            filename: path to the .osu file
+
+        Returns:
+            OppaiHandle: the map's handle
+        """
+        key = os.path.abspath(filename)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                self._handles.move_to_end(key)
+                return handle
+            handle = self._handles[key] = OppaiHandle(key)
+            evicted = []
+            while len(self._handles) > self.max_handles:
+                evicted.append(self._handles.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return handle
+
+    def clear(self):
+        """Free every handle in the pool."""
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for handle in handles:
+            handle.close()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, filename):
+        return os.path.abspath(filename) in self._handles
+
+
+Oppai.handles = HandlePool()
@@ -1,4 +1,4 @@
-import requests
+import threading
 from pathlib import Path
 from .user import User
 from .map import Map
@@ -6,7 +6,13 @@ from .score import Score, RecentScore
 from .utils import *
 from .match import Match
 from .db import OsuDB, Collections, ScoresDB
+from .ppstore import PPStore
+from .filecache import OsuFileCache
 from .exceptions import *
+from .transport import Transport, HTTPTransport, json_loads
+from .ratelimit import RequestScheduler, Priority, lane
+from .cache import ResponseCache, CacheState, request_key
+from .bulk import SingleFlight, run_many
 
 
 class OsuClientV1:
@@ -14,20 +20,48 @@ class OsuClientV1:
 
     Attributes:
         api_key (str): the api key for your osu! application
+        transport (Transport): the http layer requests are sent through
+        scheduler (RequestScheduler): rate limiter requests wait in before being sent, or None for no limit
+        cache (ResponseCache): cache responses are looked up in before requesting, or None for no caching
+        lazy_models (bool): whether returned objects convert their fields when first read rather than when created
 
     """
 
-    def __init__(self, key: str):
+    def __init__(
+        self,
+        key: str,
+        transport: Transport = None,
+        rate_limit: float = None,
+        scheduler: RequestScheduler = None,
+        cache: ResponseCache = None,
+        lazy_models: bool = False,
+    ):
         """Initialise the client with an api key.
 
         Args:
             key: The api key for your osu! application.
+            transport: the http layer to send requests through. Defaults to a pooled, keep-alive HTTPTransport; pass
+                your own HTTPTransport to change pool size/timeouts, or a LocalTransport to run without the real api.
+            rate_limit: maximum requests per minute to send, creates a RequestScheduler with default settings
+            scheduler: a RequestScheduler to wait in before each request, to share one key's budget between clients
+            cache: a ResponseCache to answer repeated requests from
+            lazy_models: make returned User/Map/Score/Match objects keep the response and only convert the fields that
+                are actually read, which is much cheaper when you only use a few attributes of each
         """
         self.api_key = key
+        self.transport = transport if transport is not None else HTTPTransport()
+        if scheduler is None and rate_limit is not None:
+            scheduler = RequestScheduler(requests_per_minute=rate_limit)
+        self.scheduler = scheduler
+        self.cache = cache
+        self.lazy_models = lazy_models
+        self._in_flight = SingleFlight()
         self.osu_db = None
         self.collections_db = None
         self.scores_db = None
         self.osu_folder = None
+        self.pp_store = None
+        self.osu_file_cache = None
 
     @staticmethod
     def _id_or_name(params: dict, username: str, user_id: int):
@@ -48,9 +82,34 @@ class OsuClientV1:
             params["u"] = user_id
             params["type"] = "id"
 
-    def _request_api(self, url: str, params: dict):
+    def _request_api(self, url: str, params: dict, cache: bool = True):
         """Private method to generalise api requests.
 
+        Args:
+            url: the api endpoint to request to (e.g. "get_user")
+            params: dict of prepared parameters for the endpoint you are attempting to request
+            cache: whether the response cache may be used, if the client has one. Identical requests in flight are
+                merged either way
+
+        Returns:
+            dict: results of the api request (or None if unsuccessful)
+        """
+        # identical requests made while one is already in flight wait for and share its response
+        key = request_key(url, params)
+        if not cache or self.cache is None or not self.cache.cacheable(url):
+            return self._in_flight.do(key, self._send, url, params)
+        state, response = self.cache.lookup(key)
+        if state == CacheState.STALE and self.cache.begin_refresh(key):
+            threading.Thread(
+                target=self._refresh, args=(url, params, key), daemon=True
+            ).start()
+        if state != CacheState.MISS:
+            return response
+        return self._in_flight.do(key, self._send_and_store, url, params, key)
+
+    def _send(self, url: str, params: dict):
+        """Send a request to the api, bypassing the cache.
+
         Args:
             url: the api endpoint to request to (e.g. "get_user")
             params: dict of prepared parameters for the endpoint you are attempting to request
@@ -58,9 +117,38 @@ class OsuClientV1:
         Returns:
             dict: results of the api request (or None if unsuccessful)
         """
-        params["k"] = self.api_key
-        r = requests.get(f"https://osu.ppy.sh/api/{url}", params=params)
-        response_json = r.json()
+        params = dict(params, k=self.api_key)
+        if self.scheduler is not None:
+            self.scheduler.acquire()
+        return self._read_response(self.transport.get(url, params))
+
+    def _send_and_store(self, url: str, params: dict, key):
+        response = self._send(url, params)
+        self.cache.put(key, response)
+        return response
+
+    def _refresh(self, url: str, params: dict, key):
+        """Re-request a stale cached response in the background."""
+        try:
+            with lane(Priority.BULK):
+                self.cache.put(key, self._send(url, params))
+        except (Exception, RequestException):
+            # the stale response keeps being served until it expires or a refresh succeeds
+            pass
+        finally:
+            self.cache.end_refresh(key)
+
+    @staticmethod
+    def _read_response(body: bytes):
+        """Decode a raw api response body (with orjson or ujson if installed), raising if the api returned an error.
+
+        Args:
+            body: the raw response body
+
+        Returns:
+            dict: results of the api request (or None if unsuccessful)
+        """
+        response_json = json_loads(body)
         if response_json:
             if isinstance(response_json, dict) and "error" in response_json.keys():
                 raise RequestException(f"{response_json['error']}")
@@ -69,6 +157,17 @@ class OsuClientV1:
         else:
             return None
 
+    def _user_query(self, user_id: int, username: str, mode: Mode):
+        if not (username or user_id):
+            return None
+        params = {"m": mode.value}
+        self._id_or_name(params, username, user_id)
+        return params
+
+    def _parse_user(self, user_json):
+        if user_json:
+            return User(user_json[0], self, lazy=self.lazy_models)
+
     def fetch_user(
         self, user_id: int = None, username: str = None, mode: Mode = Mode.STANDARD
     ):
@@ -82,13 +181,34 @@ class OsuClientV1:
         Returns:
             osupy.User: User object representing the requested user
         """
-        if not (username or user_id):
+        params = self._user_query(user_id, username, mode)
+        if params is None:
             return
-        params = {"m": mode.value}
+        return self._parse_user(self._request_api("get_user", params))
+
+    def _scores_query(
+        self,
+        map_id: int,
+        username: str,
+        user_id: int,
+        mode: Mode,
+        mods: Mods,
+        limit: int,
+    ):
+        params = {"b": map_id, "m": mode.value}
         self._id_or_name(params, username, user_id)
-        user_json = self._request_api("get_user", params)
-        if user_json:
-            return User(user_json[0], self)
+        if mods:
+            params["mods"] = mods.value
+        if 1 <= limit <= 100:
+            params["limit"] = limit
+        return params
+
+    def _parse_scores(self, scores_json, map_id: int):
+        if scores_json:
+            return [
+                Score(score_info, self, map_id, self.lazy_models)
+                for score_info in scores_json
+            ]
 
     def fetch_scores(
         self,
@@ -112,16 +232,8 @@ class OsuClientV1:
         Returns:
             [Score]: List of Score objects containing information about a given score
         """
-        params = {"b": map_id, "m": mode.value}
-        self._id_or_name(params, username, user_id)
-        if mods:
-            params["mods"] = mods.value
-        if 1 <= limit <= 100:
-            params["limit"] = limit
-
-        scores_json = self._request_api("get_scores", params)
-        if scores_json:
-            return [Score(score_info, self, params["b"]) for score_info in scores_json]
+        params = self._scores_query(map_id, username, user_id, mode, mods, limit)
+        return self._parse_scores(self._request_api("get_scores", params), map_id)
 
     def fetch_map(self, map_id: int):
         """Wrapper for the api call of selecting a map from an id and taking the first one, as it would only return one map anyway.
@@ -134,6 +246,39 @@ class OsuClientV1:
         """
         return self.fetch_maps(map_id=map_id)[0]
 
+    def _maps_query(
+        self,
+        set_id: int,
+        map_id: int,
+        username: str,
+        user_id: int,
+        map_hash: str,
+        mode: Mode,
+        converts: bool,
+        limit: int,
+        mods: Mods,
+        since: datetime,
+    ):
+        params = {"m": mode.value, "mods": mods.value}
+        self._id_or_name(params, username, user_id)
+        if set_id:
+            params["s"] = set_id
+        if map_id:
+            params["b"] = map_id
+        if map_hash:
+            params["h"] = map_hash
+        if converts:
+            params["a"] = 1
+        if 0 <= limit <= 500:
+            params["limit"] = limit
+        if since:
+            params["since"] = format_timestamp(since)
+        return params
+
+    def _parse_maps(self, maps_json):
+        if maps_json:
+            return [Map(map_info, self, self.lazy_models) for map_info in maps_json]
+
     # todo: add error handling if invalid mods given
     def fetch_maps(
         self,
@@ -165,24 +310,26 @@ class OsuClientV1:
         Returns:
             [Map]: List of Map objects containing information about the maps requested
         """
-        params = {"m": mode.value, "mods": mods.value}
-        self._id_or_name(params, username, user_id)
-        if set_id:
-            params["s"] = set_id
-        if map_id:
-            params["b"] = map_id
-        if map_hash:
-            params["h"] = map_hash
-        if converts:
-            params["a"] = 1
-        if 0 <= limit <= 500:
+        params = self._maps_query(
+            set_id, map_id, username, user_id, map_hash, mode, converts, limit, mods, since
+        )
+        return self._parse_maps(self._request_api("get_beatmaps", params))
+
+    def _user_best_query(self, username: str, user_id: int, mode: Mode, limit: int):
+        if not (username or user_id):
+            return None
+        params = {"m": mode.value}
+        if 1 <= limit <= 100:
             params["limit"] = limit
-        if since:
-            params["since"] = since.strftime("%Y-%m-%d %H:%M:%S")
+        self._id_or_name(params, username, user_id)
+        return params
 
-        maps_json = self._request_api("get_beatmaps", params)
-        if maps_json:
-            return [Map(map_info, self) for map_info in maps_json]
+    def _parse_user_best(self, best_json):
+        if best_json:
+            return [
+                Score(score_info, self, score_info["beatmap_id"], self.lazy_models)
+                for score_info in best_json
+            ]
 
     def fetch_user_best(
         self,
@@ -202,19 +349,28 @@ class OsuClientV1:
         Returns:
             [Score]: List of Score objects representing the user's best plays
         """
-        if not (username or user_id):
+        params = self._user_best_query(username, user_id, mode, limit)
+        if params is None:
             return
+        return self._parse_user_best(self._request_api("get_user_best", params))
+
+    def _user_recent_query(self, username: str, user_id: int, mode: Mode, limit: int):
+        if not (username or user_id):
+            raise RequestException("No user provided")
         params = {"m": mode.value}
+        self._id_or_name(params, username, user_id)
         if 1 <= limit <= 100:
             params["limit"] = limit
-        self._id_or_name(params, username, user_id)
+        return params
 
-        best_json = self._request_api("get_user_best", params)
-        if best_json:
+    def _parse_user_recent(self, recent_json):
+        if recent_json:
             return [
-                Score(score_info, self, score_info["beatmap_id"])
-                for score_info in best_json
+                RecentScore(score_info, self, score_info["beatmap_id"], self.lazy_models)
+                for score_info in recent_json
             ]
+        else:
+            return []
 
     def fetch_user_recent(
         self,
@@ -234,20 +390,8 @@ class OsuClientV1:
         Returns:
             [Score]: List of Score objects representing a user's recent plays
         """
-        if not (username or user_id):
-            raise RequestException("No user provided")
-        params = {"m": mode.value}
-        self._id_or_name(params, username, user_id)
-        if 1 <= limit <= 100:
-            params["limit"] = limit
-        recent_json = self._request_api("get_user_recent", params)
-        if recent_json:
-            return [
-                RecentScore(score_info, self, score_info["beatmap_id"])
-                for score_info in recent_json
-            ]
-        else:
-            return []
+        params = self._user_recent_query(username, user_id, mode, limit)
+        return self._parse_user_recent(self._request_api("get_user_recent", params))
 
     """
     Requesting via beatmap and user was broken when I was testing but I'll leave the function here in case it's just
@@ -268,6 +412,10 @@ class OsuClientV1:
     
     """
 
+    @staticmethod
+    def _parse_replay(replay_json):
+        return replay_json["content"] if "content" in replay_json else None
+
     def fetch_replay(self, score_id: int):
         """Api request to fetch a replay for a given score
 
@@ -277,8 +425,10 @@ class OsuClientV1:
         Returns:
             str: base64 representation of LZMA stream, not .osr file. See https://osu.ppy.sh/help/wiki/osu!_File_Formats/Osr_(file_format) for details
         """
-        replay_json = self._request_api("get_replay", {"s": score_id})
-        return replay_json["content"] if "content" in replay_json else None
+        return self._parse_replay(self._request_api("get_replay", {"s": score_id}))
+
+    def _parse_match(self, match_json):
+        return Match(match_json, self, self.lazy_models)
 
     def fetch_match(self, match_id: int):
         """Api request to fetch details about a given multiplayer lobby, past or ongoing
@@ -289,30 +439,174 @@ class OsuClientV1:
         Returns:
             Match: Match object representing all the information available about the match requested.
         """
-        match_json = self._request_api("get_match", {"mp": match_id})
-        return Match(match_json, self)
+        return self._parse_match(self._request_api("get_match", {"mp": match_id}))
+
+    def fetch_maps_many(
+        self,
+        map_ids,
+        mode: Mode = Mode.STANDARD,
+        workers: int = 8,
+        priority: Priority = Priority.BULK,
+    ):
+        """Fetch many maps at once. Duplicate ids are only requested once, and identical requests already in flight
+        from elsewhere are shared rather than repeated.
+
+        Args:
+            map_ids: ids of the maps to fetch
+            mode: enum representing the osu! gamemode to get the maps for
+            workers: maximum number of requests running at once
+            priority: rate limiter lane the requests run in
+
+        Returns:
+            [BulkResult]: a result for each id in map_ids, in the same order, whose value is the Map (or None if no
+            map has that id). An id that fails has error set instead of failing the whole batch.
+        """
+
+        def fetch(map_id):
+            maps = self.fetch_maps(map_id=map_id, mode=mode)
+            return maps[0] if maps else None
+
+        return run_many(fetch, map_ids, workers, priority)
+
+    def fetch_users_many(
+        self,
+        users,
+        mode: Mode = Mode.STANDARD,
+        workers: int = 8,
+        priority: Priority = Priority.BULK,
+    ):
+        """Fetch many users at once. Duplicates are only requested once.
+
+        Args:
+            users: user ids (ints) and/or usernames (strs) to fetch
+            mode: enum representing the osu! gamemode you want the information for
+            workers: maximum number of requests running at once
+            priority: rate limiter lane the requests run in
+
+        Returns:
+            [BulkResult]: a result for each item of users, in the same order, whose value is the User (or None if
+            they don't exist)
+        """
+
+        def fetch(user):
+            if isinstance(user, str):
+                return self.fetch_user(username=user, mode=mode)
+            return self.fetch_user(user_id=user, mode=mode)
+
+        return run_many(fetch, users, workers, priority)
+
+    def fetch_user_best_many(
+        self,
+        user_ids,
+        mode: Mode = Mode.STANDARD,
+        limit: int = 100,
+        workers: int = 8,
+        priority: Priority = Priority.BULK,
+    ):
+        """Fetch the best scores of many users at once. Duplicates are only requested once.
+
+        Args:
+            user_ids: ids of the users
+            mode: enum representing mode to get the top plays from
+            limit: number of best scores to retrieve per user (max 100)
+            workers: maximum number of requests running at once
+            priority: rate limiter lane the requests run in
+
+        Returns:
+            [BulkResult]: a result for each id in user_ids, in the same order, whose value is the list of Scores
+        """
+        return run_many(
+            lambda user_id: self.fetch_user_best(user_id=user_id, mode=mode, limit=limit),
+            user_ids,
+            workers,
+            priority,
+        )
+
+    @staticmethod
+    def lane(priority: Priority, owner=None):
+        """Context manager that schedules every request made inside it in the given rate limiter lane. Requests
+        default to the interactive lane, wrap crawls and batch jobs in lane(Priority.BULK) so they only use spare
+        capacity.
+
+        Args:
+            priority: the lane to use
+            owner: anything hashable identifying who the requests are for, owners in the same lane take turns
+        """
+        return lane(priority, owner)
+
+    def close(self):
+        """Close the connections held by the client's transport."""
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def get_local_map(self, md5_hash):
         if not self.osu_db:
             return None
-        if md5_hash in self.osu_db.maps.keys():
-            return self.osu_db.maps[md5_hash]
-        return None
+        return self.osu_db.get_map_from_hash(md5_hash)
 
-    def set_osu_db(self, path):
-        self.osu_db = OsuDB(self, path)
+    def set_osu_db(
+        self, path, lazy: bool = None, max_cached: int = None, cache_dir=None
+    ):
+        self.osu_db = OsuDB(self, path, lazy, max_cached, cache_dir)
         return self.osu_db
 
-    def set_collections_db(self, path):
-        self.collections_db = Collections(path, self)
+    def set_collections_db(self, path, cache_dir=None):
+        self.collections_db = Collections(self, path, cache_dir)
         return self.collections_db
 
-    def set_scores_db(self, path):
-        self.scores_db = ScoresDB(path, self)
+    def set_scores_db(self, path, cache_dir=None):
+        self.scores_db = ScoresDB(self, path, cache_dir)
         return self.scores_db
 
-    def set_osu_folder(self, path):
+    def set_pp_store(self, path):
+        """Keep calculated pp for local plays in an sqlite database, so later runs only calculate new plays.
+
+        Args:
+            path: path of the sqlite database
+
+        Returns:
+            PPStore: the store
+        """
+        self.pp_store = PPStore(path)
+        return self.pp_store
+
+    def set_osu_file_cache(self, cache_dir, max_bytes: int = 256 * 2 ** 20):
+        """Keep the .osu files downloaded to calculate pp for online maps, so each map is only downloaded once.
+
+        Args:
+            cache_dir: directory to keep the files in
+            max_bytes: most bytes of files to keep, the least recently used are deleted past this
+
+        Returns:
+            OsuFileCache: the cache
+        """
+        self.osu_file_cache = OsuFileCache(cache_dir, max_bytes)
+        return self.osu_file_cache
+
+    def set_osu_folder(
+        self, path, lazy: bool = None, max_cached: int = None, cache_dir=None
+    ):
+        """Read the databases in an osu! install.
+
+        Args:
+            path: the osu! folder
+            lazy: only index osu!.db up front, decoding maps when they're first used. Defaults to lazy when cache_dir
+                is given and eager otherwise
+            max_cached: when lazy, the most decoded maps to keep at once
+            cache_dir: directory to keep snapshots of the databases in, so later loads of unchanged ones skip decoding
+                them. Implies lazy, as only osu!.db's lazy index can be snapshotted (lazy=False with a cache_dir is a
+                ValueError). Snapshots are unpickled on load, so the directory must only be writable by you
+        """
         self.osu_folder = Path(path)
-        self.osu_db = OsuDB(self, self.osu_folder / "osu!.db")
-        self.scores_db = ScoresDB(self, self.osu_folder / "scores.db")
-        self.collections_db = Collections(self, self.osu_folder / "collection.db")
+        self.osu_db = OsuDB(
+            self, self.osu_folder / "osu!.db", lazy, max_cached, cache_dir
+        )
+        self.scores_db = ScoresDB(self, self.osu_folder / "scores.db", cache_dir)
+        self.collections_db = Collections(
+            self, self.osu_folder / "collection.db", cache_dir
+        )
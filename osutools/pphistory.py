@@ -0,0 +1,169 @@
+import heapq
+import itertools
+from bisect import bisect_left, bisect_right
+
+WEIGHT = 0.95
+"""float: how much each play in a profile's top plays is worth relative to the one above it"""
+
+
+def score_pp(score):
+    """Get a LocalScore's pp, calculating it if it hasn't been yet.
+
+    Args:
+        score: the LocalScore
+
+    Returns:
+        float: the pp, or None if it can't be calculated (e.g. the map isn't installed)
+    """
+    if score.pp is None:
+        try:
+            score.get_pp()
+        except (NotImplementedError, ValueError):
+            return None
+    return score.pp
+
+
+class PPHistory:
+    """A player's profile pp, built up by adding their local scores in the order they were set.
+
+    Like on the website, only the best play on each map counts, and the top limit plays are weighted by 0.95^i (bonus
+    pp for the number of ranked plays isn't included). Adding a score updates the top plays and the total in place
+    rather than recalculating them, so replaying every score in scores.db gives the whole history in one pass (see
+    from_scores_db()).
+
+    Attributes:
+        limit: number of top plays that count
+        series: list of (timestamp, total pp) for every score that changed the total, in the order they were added
+    """
+
+    def __init__(self, limit: int = 100):
+        self.limit = limit
+        self.series = []
+        self._best = {}
+        self._top = []
+        self._keys = []
+        self._times = []
+        self._order = itertools.count()
+        self._weights = [WEIGHT ** i for i in range(limit)]
+        self._prefix = [0.0]
+
+    @classmethod
+    def from_scores_db(cls, scores_db, names=None, ranked_only: bool = True, limit: int = 100):
+        """Replay the scores in a ScoresDB in the order they were set.
+
+        Args:
+            scores_db: the ScoresDB
+            names: usernames whose scores count (e.g. every name the player has had), or None for everyone's
+            ranked_only: only count scores on ranked maps
+            limit: number of top plays that count
+
+        Returns:
+            PPHistory: the history, up to the newest score
+        """
+        history = cls(limit)
+        if names is None:
+            scores = scores_db.by_time.scores
+        else:
+            indexes = [scores_db.by_user[name] for name in set(names) if name in scores_db.by_user]
+            scores = heapq.merge(*(index.scores for index in indexes), key=lambda score: score.timestamp)
+        for score in scores:
+            if ranked_only and not scores_db.is_ranked(score.map_hash):
+                continue
+            history.add(score)
+        return history
+
+    @property
+    def total(self):
+        """float: current weighted pp of the top plays"""
+        return self._prefix[-1]
+
+    @property
+    def top(self):
+        """[LocalScore]: the plays that count, best first"""
+        return [score for _, _, _, score in self._top]
+
+    def _update_prefix(self):
+        self._keys = [entry[0] for entry in self._top]
+        self._prefix = [0.0]
+        for negative_pp, weight in zip(self._keys, self._weights):
+            self._prefix.append(self._prefix[-1] - negative_pp * weight)
+
+    def add(self, score, pp: float = None):
+        """Add a score, updating the top plays and total if it's the best on its map.
+
+        Args:
+            score: the LocalScore
+            pp: its pp, or None to use (or calculate) score.pp
+
+        Returns:
+            bool: whether the total changed
+        """
+        if pp is None:
+            pp = score_pp(score)
+            if pp is None:
+                return False
+        md5_hash = score.map_hash
+        previous = self._best.get(md5_hash)
+        if previous is not None and pp <= previous:
+            return False
+        self._best[md5_hash] = pp
+        if previous is not None:
+            for position, entry in enumerate(self._top):
+                if entry[2] == md5_hash:
+                    del self._top[position]
+                    break
+        entry = (-pp, next(self._order), md5_hash, score)
+        position = bisect_left(self._top, entry)
+        if position >= self.limit:
+            return False
+        self._top.insert(position, entry)
+        del self._top[self.limit :]
+        total = self.total
+        self._update_prefix()
+        if self.total == total:
+            return False
+        self.series.append((score.timestamp, self.total))
+        self._times.append(score.timestamp)
+        return True
+
+    def what_if(self, pp: float, md5_hash: str = None):
+        """Work out what the total would be with another play, without adding it. Takes a bisection and a few sums,
+        unless the play replaces one of the top plays on the same map.
+
+        Args:
+            pp: pp of the play
+            md5_hash: md5 hash of its map, so it only counts if it beats the best play there
+
+        Returns:
+            float: the total with it
+        """
+        previous = self._best.get(md5_hash)
+        if previous is not None:
+            if pp <= previous:
+                return self.total
+            if any(entry[2] == md5_hash for entry in self._top):
+                # it replaces a play that counts, so the ones in between move up rather than down
+                values = sorted([-entry[0] for entry in self._top if entry[2] != md5_hash] + [pp], reverse=True)
+                return sum(value * weight for value, weight in zip(values, self._weights))
+        # everything below the new play moves down one place, so is worth 0.95 as much
+        rank = bisect_right(self._keys, -pp)
+        if rank >= self.limit:
+            return self.total
+        shifted = min(len(self._top), self.limit - 1)
+        prefix = self._prefix
+        return prefix[rank] + pp * self._weights[rank] + WEIGHT * (prefix[shifted] - prefix[rank])
+
+    def total_at(self, timestamp):
+        """Get what the total was at a time.
+
+        Args:
+            timestamp: the time
+
+        Returns:
+            float: the total once every score set up to then was added (assuming they were added in time order)
+        """
+        position = bisect_right(self._times, timestamp)
+        return self.series[position - 1][1] if position else 0.0
+
+    def __repr__(self):
+        return f"{self.total:.2f}pp from {len(self._top)} plays"
@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+
+from .oppai import Oppai
+
+
+class PPStore:
+    """pp results kept in an sqlite database, so plays that were already calculated on a previous run aren't
+    calculated again.
+
+    Each result is keyed on what it was calculated from: the map's md5 hash (which changes whenever the .osu file
+    does), the play's mods, combo, misses, 100s, 50s and accuracy, and the version of oppai that calculated it.
+    Results from other oppai versions are never returned, so upgrading oppai recalculates everything.
+
+    Attributes:
+        path: path of the sqlite database
+        version: oppai version results are looked up and stored for
+    """
+
+    def __init__(self, path, version: str = None):
+        """Open (or create) a store.
+
+        Args:
+            path: path of the sqlite database to store results in
+            version: oppai version to key results on, or None for the loaded oppai's version
+        """
+        self.path = str(path)
+        self.version = version or Oppai.version()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pp (
+                md5 TEXT NOT NULL,
+                mods INTEGER NOT NULL,
+                combo INTEGER NOT NULL,
+                misses INTEGER NOT NULL,
+                num_100 INTEGER NOT NULL,
+                num_50 INTEGER NOT NULL,
+                accuracy REAL NOT NULL,
+                version TEXT NOT NULL,
+                pp REAL NOT NULL,
+                PRIMARY KEY (md5, mods, combo, misses, num_100, num_50, accuracy, version)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(md5_hash: str, inputs: dict):
+        """Build the key of a play's result. Missing inputs are stored as -1, since sqlite keys can't match on NULL.
+
+        Args:
+            md5_hash: md5 hash of the map
+            inputs: the calculate_pp() arguments for the play
+
+        Returns:
+            tuple: the key, without the oppai version
+        """
+
+        def value(name):
+            found = inputs.get(name)
+            return -1 if found is None else found
+
+        return (
+            md5_hash,
+            inputs.get("mods", 0),
+            value("max_combo"),
+            value("misses"),
+            value("num_100"),
+            value("num_50"),
+            float(value("accuracy")),
+        )
+
+    def get(self, md5_hash: str, inputs: dict):
+        """Look up a play's pp.
+
+        Args:
+            md5_hash: md5 hash of the map
+            inputs: the calculate_pp() arguments for the play
+
+        Returns:
+            float: the stored pp, or None if it hasn't been calculated yet
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pp FROM pp WHERE md5 = ? AND mods = ? AND combo = ? AND misses = ? AND num_100 = ? "
+                "AND num_50 = ? AND accuracy = ? AND version = ?",
+                self.key(md5_hash, inputs) + (self.version,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, md5_hashes):
+        """Load every stored result for some maps, in one query per few hundred maps.
+
+        Args:
+            md5_hashes: md5 hashes of the maps
+
+        Returns:
+            dict: key (see key()) to pp
+        """
+        md5_hashes = list(dict.fromkeys(md5_hashes))
+        results = {}
+        with self._lock:
+            for i in range(0, len(md5_hashes), 500):
+                chunk = md5_hashes[i : i + 500]
+                rows = self._db.execute(
+                    "SELECT md5, mods, combo, misses, num_100, num_50, accuracy, pp FROM pp "
+                    f"WHERE version = ? AND md5 IN ({', '.join('?' * len(chunk))})",
+                    [self.version] + chunk,
+                )
+                for row in rows:
+                    results[row[:7]] = row[7]
+        return results
+
+    def put(self, md5_hash: str, inputs: dict, pp: float):
+        """Store a play's pp.
+
+        Args:
+            md5_hash: md5 hash of the map
+            inputs: the calculate_pp() arguments for the play
+            pp: its pp
+        """
+        self.put_many([(self.key(md5_hash, inputs), pp)])
+
+    def put_many(self, results):
+        """Store lots of results in one transaction.
+
+        Args:
+            results: (key, pp) pairs, with keys from key()
+        """
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pp VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [key + (self.version, pp) for key, pp in results],
+            )
+            self._db.commit()
+
+    def prune(self):
+        """Delete results calculated by other versions of oppai.
+
+        Returns:
+            int: number of results deleted
+        """
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM pp WHERE version != ?", (self.version,)).rowcount
+            self._db.commit()
+        return deleted
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pp WHERE version = ?", (self.version,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
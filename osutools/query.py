@@ -0,0 +1,243 @@
+import re
+from functools import lru_cache
+
+from .table import np
+from .utils import Approval, Mode
+
+TERM = re.compile(r'"([^"]*)"?|(\w+)(<=|>=|!=|==|=|:|<|>)("[^"]*"?|\S*)|(\S+)')
+"""re.Pattern: one term of a search, a "quoted phrase", a key/operator/value filter, or a word"""
+
+NUMERIC = {
+    "ar": ("approach_rate", 1, 0.05),
+    "cs": ("circle_size", 1, 0.05),
+    "od": ("overall_difficulty", 1, 0.05),
+    "hp": ("hp_drain", 1, 0.05),
+    "keys": ("circle_size", 1, 0.05),
+    "stars": ("star_rating", 1, 0.005),
+    "star": ("star_rating", 1, 0.005),
+    "sr": ("star_rating", 1, 0.005),
+    "length": ("length", 1000, 0.5),
+    "drain": ("drain_time", 1, 0.5),
+    "objects": ("total_objects", 1, 0),
+    "circles": ("circle_count", 1, 0),
+    "sliders": ("slider_count", 1, 0),
+    "spinners": ("spinner_count", 1, 0),
+    "id": ("beatmap_id", 1, 0),
+    "set": ("mapset_id", 1, 0),
+}
+"""dict: numeric filter keys, to (column, multiplier from the unit typed to the column's, tolerance of =). Lengths are
+typed in seconds, and = on a decimal setting matches anything that rounds to it"""
+
+TEXT = {
+    "creator": "creator_name",
+    "mapper": "creator_name",
+    "author": "creator_name",
+    "artist": "artist",
+    "title": "song_title",
+    "diff": "difficulty_name",
+    "source": "source",
+}
+"""dict: text filter keys, to the column they match exactly (ignoring case)"""
+
+MODES = {
+    "osu": Mode.STANDARD,
+    "std": Mode.STANDARD,
+    "standard": Mode.STANDARD,
+    "taiko": Mode.TAIKO,
+    "ctb": Mode.CTB,
+    "catch": Mode.CTB,
+    "fruits": Mode.CTB,
+    "mania": Mode.MANIA,
+}
+
+STATUSES = {
+    "ranked": Approval.RANKED,
+    "approved": Approval.APPROVED,
+    "qualified": Approval.QUALIFIED,
+    "loved": Approval.LOVED,
+    "pending": Approval.PENDING,
+    "wip": Approval.WIP,
+    "graveyard": Approval.GRAVEYARD,
+    "unranked": Approval.GRAVEYARD,
+}
+
+SORTS = {**{key: column for key, (column, _, _) in NUMERIC.items()}, **TEXT, "played": "last_played"}
+"""dict: names results can be sorted by, besides column names"""
+
+_DAY = None if np is None else np.timedelta64(1, "D")
+
+
+class Filter:
+    """One key/operator/value filter of a query, e.g. ar>9.
+
+    Attributes:
+        column: name of the MapTable column it tests
+        op: one of = != < <= > >=
+        value: value in the column's units
+        tolerance: how far from value still counts as equal
+    """
+
+    def __init__(self, column: str, op: str, value, tolerance: float = 0):
+        self.column = column
+        self.op = op
+        self.value = value
+        self.tolerance = tolerance
+
+    @property
+    def indexed(self):
+        """bool: whether the filter can be answered from the column's index instead of scanning it"""
+        return self.op == "=" and not self.tolerance and self.column != "last_played"
+
+    def mask(self, table):
+        """Test every row of a table.
+
+        Args:
+            table: the MapTable
+
+        Returns:
+            numpy.ndarray: bool per row
+        """
+        values = table[self.column]
+        if self.column == "last_played":
+            # played>30 is days since last played. never played counts as forever ago
+            days = (np.datetime64("now") - values) / _DAY
+            values = np.where(np.isnat(values), np.inf, days)
+        elif values.dtype == object:
+            values = np.array([(value or "").lower() for value in values])
+        if self.op == "=":
+            return abs(values - self.value) <= self.tolerance if self.tolerance else values == self.value
+        if self.op == "!=":
+            return abs(values - self.value) > self.tolerance if self.tolerance else values != self.value
+        if self.op == "<":
+            return values < self.value
+        if self.op == "<=":
+            return values <= self.value
+        if self.op == ">":
+            return values > self.value
+        return values >= self.value
+
+    def __repr__(self):
+        return f"{self.column}{self.op}{self.value}"
+
+
+def _filter(key: str, op: str, value: str):
+    """Build the Filter for a key/operator/value term, or None if it isn't one (osu! then searches for it as text)."""
+    op = "=" if op in ("==", ":") else op
+    value = value.strip('"').lower()
+    if key in NUMERIC:
+        column, multiplier, tolerance = NUMERIC[key]
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return Filter(column, op, number * multiplier, tolerance * multiplier)
+    if key == "played":
+        try:
+            return Filter("last_played", op, float(value))
+        except ValueError:
+            return None
+    if key == "mode" and value in MODES:
+        return Filter("mode", op, MODES[value].value)
+    if key == "status" and value in STATUSES:
+        return Filter("approval", op, STATUSES[value].value)
+    if key in TEXT and op in ("=", "!="):
+        return Filter(TEXT[key], op, value)
+    return None
+
+
+class Query:
+    """A search in the syntax of osu!'s song select, e.g. ar>9 stars>=5.5 length<120 mode=osu status=ranked
+    creator=xyz "title words".
+
+    Filters are key/operator/value terms: ar, cs, od, hp, keys, stars, length and drain (in seconds), objects,
+    circles, sliders, spinners, id, set and played (days since last played) compare numbers with = != < <= > >=; mode
+    and status compare with names (e.g. mode=taiko, status>=ranked); creator, artist, title, diff and source match text
+    exactly. Everything else, words and "quoted phrases", has to appear somewhere in the map's artist, title, creator,
+    difficulty name, source or tags. Matching ignores case.
+
+    Attributes:
+        text: the query as typed
+        filters: list of Filter
+        words: list of lowercase words and phrases
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.filters = []
+        self.words = []
+        for phrase, key, op, value, word in TERM.findall(text):
+            if key:
+                query_filter = _filter(key.lower(), op, value)
+                if query_filter is not None:
+                    self.filters.append(query_filter)
+                    continue
+                word = key + op + value
+            word = (phrase or word).strip().lower()
+            if word:
+                self.words.append(word)
+
+    def rows(self, table):
+        """Find the rows of a table that match. Exact value filters are looked up in the table's indexes first, so
+        everything else only has to be tested on the rows they leave.
+
+        Args:
+            table: the MapTable to search
+
+        Returns:
+            numpy.ndarray: matching row numbers, in table order
+        """
+        rows = None
+        scanned = []
+        for query_filter in self.filters:
+            if not query_filter.indexed:
+                scanned.append(query_filter)
+                continue
+            found = table.index(query_filter.column).get(query_filter.value)
+            if found is None:
+                return np.arange(0)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(table))
+            candidates = table
+        else:
+            candidates = table.take(rows)
+        mask = np.ones(len(rows), dtype=bool)
+        for query_filter in scanned:
+            mask &= query_filter.mask(candidates)
+        if self.words:
+            text = table.search_text()[rows]
+            for word in self.words:
+                mask &= np.char.find(text, word) >= 0
+        return rows[mask]
+
+    def apply(self, table, sort: str = None, descending: bool = False):
+        """Search a table.
+
+        Args:
+            table: the MapTable to search
+            sort: key (e.g. stars, length) or column to sort the results by, or None to keep table order
+            descending: highest first rather than lowest
+
+        Returns:
+            MapTable: the matching rows
+        """
+        results = table.take(self.rows(table))
+        if sort is not None:
+            results = results.sort(SORTS.get(sort, sort), descending)
+        return results
+
+    def __repr__(self):
+        return f"Query({self.text!r})"
+
+
+@lru_cache(maxsize=256)
+def parse_query(text: str):
+    """Parse a search, reusing the Query if the same text was parsed recently.
+
+    Args:
+        text: the search
+
+    Returns:
+        Query: the parsed query
+    """
+    return Query(text)
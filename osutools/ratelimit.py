@@ -0,0 +1,325 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from enum import Enum
+
+from .exceptions import RateLimitException
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # python 3.6
+    ContextVar = None
+
+
+class Priority(Enum):
+    """Lanes a request can be scheduled in. Lower values are always served first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class _ThreadLocalVar(threading.local):
+    """Stand-in for ContextVar on python versions that don't have it."""
+
+    def __init__(self, name, default=None):
+        self.value = default
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+_current_lane = (
+    ContextVar("osutools_lane", default=None)
+    if ContextVar
+    else _ThreadLocalVar("osutools_lane")
+)
+
+
+def current_lane():
+    """Get the lane requests made from the current thread/task are scheduled in.
+
+    Returns:
+        (Priority, object): the priority and owner set by lane(), or (Priority.INTERACTIVE, None) by default
+    """
+    return _current_lane.get() or (Priority.INTERACTIVE, None)
+
+
+@contextmanager
+def lane(priority: Priority, owner=None):
+    """Schedule every request made inside the with block in the given lane.
+
+    Args:
+        priority: the lane to use
+        owner: anything hashable identifying who the requests are for (e.g. a job name or discord guild), requests
+            from different owners in the same lane take turns rather than being served first come first served
+    """
+    previous = _current_lane.get()
+    _current_lane.set((priority, owner))
+    try:
+        yield
+    finally:
+        _current_lane.set(previous)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate. Not thread safe on its own, RequestScheduler locks it.
+
+    Attributes:
+        rate: tokens added per second
+        capacity: maximum number of tokens that can be saved up (the largest burst allowed)
+        tokens: tokens available as of the last refill
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """Create a full bucket.
+
+        Args:
+            rate: tokens added per second
+            capacity: maximum number of tokens that can be saved up, defaults to one second's worth
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def take(self, reserve: float = 0.0, now: float = None):
+        """Take a token if one is available without dipping below reserve.
+
+        Args:
+            reserve: number of tokens that must be left in the bucket after taking one
+            now: current time.monotonic() value
+
+        Returns:
+            float: 0 if a token was taken, otherwise the number of seconds until one will be available
+        """
+        self._refill(now if now is not None else time.monotonic())
+        needed = 1.0 + min(reserve, self.capacity - 1.0)
+        if self.tokens >= needed:
+            self.tokens -= 1.0
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+class LaneStats:
+    """Metrics for one scheduler lane.
+
+    Attributes:
+        queue_depth: number of requests currently waiting
+        granted: number of requests let through so far
+        total_wait: seconds all granted requests spent waiting
+        max_wait: longest wait of any granted request
+        recent_waits: waits of the most recently granted requests, used for percentiles
+    """
+
+    def __init__(self, window: int = 1000):
+        self.queue_depth = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record(self, wait: float):
+        self.granted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.granted if self.granted else 0.0
+
+    def percentile_wait(self, percentile: float):
+        """Wait time below which the given percentage of recent requests fell.
+
+        Args:
+            percentile: percentage between 0 and 100 (e.g. 99 for p99)
+
+        Returns:
+            float: wait in seconds
+        """
+        if not self.recent_waits:
+            return 0.0
+        waits = sorted(self.recent_waits)
+        index = min(len(waits) - 1, int(len(waits) * percentile / 100))
+        return waits[index]
+
+    def __repr__(self):
+        return (
+            f"depth={self.queue_depth} granted={self.granted} mean_wait={self.mean_wait:.3f}s "
+            f"p99_wait={self.percentile_wait(99):.3f}s"
+        )
+
+
+class _Ticket:
+    __slots__ = ("priority", "owner", "enqueued", "loop", "ready")
+
+    def __init__(self, priority: Priority, owner, loop=None):
+        self.priority = priority
+        self.owner = owner
+        self.enqueued = time.monotonic()
+        # async tickets are woken through an event on their loop instead of the condition variable
+        self.loop = loop
+        self.ready = asyncio.Event() if loop is not None else None
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            # the loop has been closed, so there's nothing waiting any more
+            pass
+
+
+class RequestScheduler:
+    """Shares an api key's request budget between callers. Requests wait in a lane for their priority and are let
+    through one token at a time: interactive requests always go before bulk ones, bulk requests are held back while the
+    bucket is below bulk_reserve so there's always headroom for an interactive burst, and within a lane each owner takes
+    turns so one big job can't starve the others.
+
+    One scheduler can be shared by several clients using the same api key.
+
+    Attributes:
+        bucket: the token bucket being drawn from
+        bulk_reserve: tokens that bulk requests leave in the bucket for interactive ones
+        stats: dict of Priority to LaneStats
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 1200,
+        burst: float = None,
+        bulk_reserve: float = None,
+    ):
+        """Create the scheduler.
+
+        Args:
+            requests_per_minute: sustained request rate allowed (osu!'s default for api v1 is 1200)
+            burst: maximum number of requests that can be sent at once after being idle, defaults to a second's worth
+            bulk_reserve: tokens bulk requests leave for interactive ones, defaults to a quarter of the burst
+        """
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.bulk_reserve = (
+            bulk_reserve if bulk_reserve is not None else self.bucket.capacity / 4
+        )
+        self.stats = {priority: LaneStats() for priority in Priority}
+        self._lanes = {priority: OrderedDict() for priority in Priority}
+        self._cond = threading.Condition()
+
+    def _enqueue(self, ticket: _Ticket):
+        self._lanes[ticket.priority].setdefault(ticket.owner, deque()).append(ticket)
+        self.stats[ticket.priority].queue_depth += 1
+        self._notify()
+
+    def _remove(self, ticket: _Ticket, served: bool = True):
+        owners = self._lanes[ticket.priority]
+        queue = owners[ticket.owner]
+        queue.remove(ticket)
+        if not queue:
+            del owners[ticket.owner]
+        elif served:
+            # the owner that was just served moves to the back so the next owner gets a turn
+            owners.move_to_end(ticket.owner)
+        self.stats[ticket.priority].queue_depth -= 1
+        self._notify()
+
+    def _notify(self):
+        """Wake whoever is waiting for the head of the queue to change. Must hold the lock."""
+        self._cond.notify_all()
+        head = self._head()
+        if head is not None and head.loop is not None:
+            head.wake()
+
+    def _head(self):
+        for priority in Priority:
+            owners = self._lanes[priority]
+            if owners:
+                return owners[next(iter(owners))][0]
+        return None
+
+    def _poll(self, ticket: _Ticket):
+        """Try to let a ticket through. Must hold the lock.
+
+        Returns:
+            float: 0 if granted, seconds to wait if the ticket is next in line, or None if other tickets are ahead
+        """
+        if self._head() is not ticket:
+            return None
+        reserve = self.bulk_reserve if ticket.priority == Priority.BULK else 0.0
+        wait = self.bucket.take(reserve)
+        if wait == 0:
+            self._remove(ticket)
+            self.stats[ticket.priority].record(time.monotonic() - ticket.enqueued)
+        return wait
+
+    def acquire(self, priority: Priority = None, owner=None, timeout: float = None):
+        """Block until a request may be sent.
+
+        Args:
+            priority: lane to wait in, defaults to the one set with lane()
+            owner: who the request is for, defaults to the one set with lane()
+            timeout: maximum seconds to wait before raising RateLimitException
+
+        Returns:
+            float: seconds spent waiting
+        """
+        if priority is None:
+            priority, owner = current_lane()
+        ticket = _Ticket(priority, owner)
+        deadline = ticket.enqueued + timeout if timeout is not None else None
+        with self._cond:
+            self._enqueue(ticket)
+            while True:
+                wait = self._poll(ticket)
+                if wait == 0:
+                    return time.monotonic() - ticket.enqueued
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._remove(ticket, served=False)
+                        raise RateLimitException("Timed out waiting for the rate limiter")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def acquire_async(self, priority: Priority = None, owner=None):
+        """Wait until a request may be sent without blocking the event loop. Cancel the awaiting task (or wrap it in
+        asyncio.wait_for) to give up.
+
+        Args:
+            priority: lane to wait in, defaults to the one set with lane()
+            owner: who the request is for, defaults to the one set with lane()
+
+        Returns:
+            float: seconds spent waiting
+        """
+        if priority is None:
+            priority, owner = current_lane()
+        ticket = _Ticket(priority, owner, asyncio.get_event_loop())
+        with self._cond:
+            self._enqueue(ticket)
+        try:
+            while True:
+                with self._cond:
+                    # cleared under the lock, so a change of head after this poll always sets it again
+                    ticket.ready.clear()
+                    wait = self._poll(ticket)
+                if wait == 0:
+                    return time.monotonic() - ticket.enqueued
+                if wait is None:
+                    # other tickets are ahead, sleep until this one reaches the head
+                    await ticket.ready.wait()
+                else:
+                    await asyncio.sleep(wait)
+        except BaseException:
+            with self._cond:
+                owners = self._lanes[ticket.priority]
+                if ticket.owner in owners and ticket in owners[ticket.owner]:
+                    self._remove(ticket, served=False)
+            raise
@@ -1,7 +1,17 @@
 from .utils import *
+from .model import Model
 
 
-class BaseScore:
+def _accuracy(s, i):
+    temp_accuracy = (
+        (s.num_50 * 50 + s.num_100 * 100 + s.num_300 * 300) / (s.map_total_hits * 300)
+        if s.map_total_hits != 0
+        else 0
+    )
+    return min(1.0, max(0.0, temp_accuracy))
+
+
+class BaseScore(Model):
     """Base class for a score, all types of score share these attributes.
 
     Attributes:
@@ -23,30 +33,26 @@ class BaseScore:
         accuracy_dec: the player's accuracy as a decimal
     """
 
-    def __init__(self, score_info, client):
+    _fields = {
+        "num_300": lambda s, i: int(i["count300"]),
+        "num_100": lambda s, i: int(i["count100"]),
+        "num_50": lambda s, i: int(i["count50"]),
+        "misses": lambda s, i: int(i["countmiss"]),
+        "max_combo": lambda s, i: int(i["maxcombo"]),
+        "num_katu": lambda s, i: int(i["countkatu"]),
+        "num_geki": lambda s, i: int(i["countgeki"]),
+        "perfect": lambda s, i: (i["perfect"] == "1") or i["perfect"],
+        "user_id": lambda s, i: int(i["user_id"]) if "user_id" in i else None,
+        "score": lambda s, i: int(i["score"]),
+        "username": lambda s, i: i["username"] if "username" in i else s.user_id,
+        "successful_hits": lambda s, i: s.num_50 + s.num_100 + s.num_300,
+        "map_total_hits": lambda s, i: s.successful_hits + s.misses,
+        "accuracy_dec": _accuracy,
+    }
+
+    def __init__(self, score_info, client, lazy: bool = False):
         self.client = client
-        self.num_300 = int(score_info["count300"])
-        self.num_100 = int(score_info["count100"])
-        self.num_50 = int(score_info["count50"])
-        self.misses = int(score_info["countmiss"])
-        self.max_combo = int(score_info["maxcombo"])
-        self.num_katu = int(score_info["countkatu"])
-        self.num_geki = int(score_info["countgeki"])
-        self.perfect = (score_info["perfect"] == "1") or score_info["perfect"]
-        self.user_id = int(score_info["user_id"]) if "user_id" in score_info else None
-        self.score = int(score_info["score"])
-        self.username = (
-            score_info["username"] if "username" in score_info else self.user_id
-        )
-        self.successful_hits = self.num_50 + self.num_100 + self.num_300
-        self.map_total_hits = self.successful_hits + self.misses
-        temp_accuracy = (
-            (self.num_50 * 50 + self.num_100 * 100 + self.num_300 * 300)
-            / (self.map_total_hits * 300)
-            if self.map_total_hits != 0
-            else 0
-        )
-        self.accuracy_dec = min(1.0, max(0.0, temp_accuracy))
+        self._load(score_info, lazy)
 
     def fetch_user(self):
         """Make an api call to get more information about user.
@@ -70,15 +76,19 @@ class Score(BaseScore):
 
     """
 
-    def __init__(self, score_info, client, map_id):
+    _fields = {
+        **BaseScore._fields,
+        "score_id": lambda s, i: int(i["score_id"]),
+        "timestamp": lambda s, i: parse_timestamp(i["date"]),
+        "mods": lambda s, i: Mods(int(i["enabled_mods"])),
+        "rank": lambda s, i: i["rank"],
+        "pp": lambda s, i: float(i["pp"]) if i["pp"] else 0,
+        "replay_available": lambda s, i: i["replay_available"] == "1",
+    }
+
+    def __init__(self, score_info, client, map_id, lazy: bool = False):
         self.map_id = map_id
-        self.score_id = int(score_info["score_id"])
-        self.timestamp = datetime.strptime(score_info["date"], "%Y-%m-%d %H:%M:%S")
-        self.mods = Mods(int(score_info["enabled_mods"]))
-        self.rank = score_info["rank"]
-        self.pp = float(score_info["pp"]) if score_info["pp"] else 0
-        self.replay_available = score_info["replay_available"] == "1"
-        super().__init__(score_info, client)
+        super().__init__(score_info, client, lazy)
 
     def fetch_map(self):
         return self.client.fetch_map(map_id=self.map_id)
@@ -96,12 +106,16 @@ class RecentScore(BaseScore):
         rank: letter representing how good the score is
     """
 
-    def __init__(self, score_info, client, map_id):
+    _fields = {
+        **BaseScore._fields,
+        "timestamp": lambda s, i: parse_timestamp(i["date"]),
+        "mods": lambda s, i: Mods(int(i["enabled_mods"])),
+        "rank": lambda s, i: i["rank"],
+    }
+
+    def __init__(self, score_info, client, map_id, lazy: bool = False):
         self.map_id = map_id
-        self.timestamp = datetime.strptime(score_info["date"], "%Y-%m-%d %H:%M:%S")
-        self.mods = Mods(int(score_info["enabled_mods"]))
-        self.rank = score_info["rank"]
-        super().__init__(score_info, client)
+        super().__init__(score_info, client, lazy)
 
     def __repr__(self):
         return f"{self.mods} score on beatmap {self.map_id} by {self.username}"
@@ -121,6 +135,20 @@ class MultiScore(BaseScore):
 
     """
 
+    _fields = {
+        **BaseScore._fields,
+        "slot": lambda s, i: int(i["slot"]),
+        "team": lambda s, i: Teams(int(i["team"])),
+        # says not used on the wiki but lists it anyway so ill catch it just in case
+        "rank": lambda s, i: int(i["rank"]),
+        "passed": lambda s, i: i["pass"] == "1",
+        "mods": lambda s, i: (
+            s._game_mods
+            if not i["enabled_mods"]
+            else Mods(s._game_mods.value + int(i["enabled_mods"]))
+        ),
+    }
+
     def __init__(
         self,
         score_info: dict,
@@ -129,22 +157,13 @@ class MultiScore(BaseScore):
         match_id: int,
         game_id: int,
         mods: Mods,
+        lazy: bool = False,
     ):
         self.map_id = map_id
         self.game_id = game_id
         self.match_id = match_id
-        self.slot = int(score_info["slot"])
-        self.team = Teams(int(score_info["team"]))
-        self.rank = int(
-            score_info["rank"]
-        )  # says not used on the wiki but lists it anyway so ill catch it just in case
-        self.passed = score_info["pass"] == "1"
-        self.mods = (
-            mods
-            if not score_info["enabled_mods"]
-            else Mods(mods.value + int(score_info["enabled_mods"]))
-        )
-        super().__init__(score_info, client)
+        self._game_mods = mods
+        super().__init__(score_info, client, lazy)
 
     def __repr__(self):
         return f"{self.mods} score on beatmap {self.map_id} by {self.user_id} in match {self.match_id}"
@@ -154,15 +173,20 @@ class LocalScore(BaseScore):
     def __init__(self, score_info, client, replay_hash):
         super().__init__(score_info, client)
         self.map_hash = score_info["map_hash"]
-        self.map = self.client.get_local_map(self.map_hash)
         self.md5_hash = replay_hash
         self.mods = Mods(score_info["mods"])
         self.timestamp = score_info["timestamp"]
         self.online_id = score_info["online_id"]
         self.pp = None
 
+    @property
+    def map(self):
+        """LocalMap: the map the score was set on, or None if it isn't in osu!.db. Looked up each time, so it's always
+        the current version and a lazy osu!.db only decodes it when it's used"""
+        return self.client.get_local_map(self.map_hash)
+
     def get_pp(self):
-        pp_map = self.client.get_local_map(self.map_hash)
+        pp_map = self.map
         if pp_map:
             self.pp = pp_map.get_pp(self)
         return self.pp
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from .dbschema import INT, gc_paused
+
+SNAPSHOT_FORMAT = 4
+"""int: bumped whenever what the db classes decode changes, so snapshots written by older versions are ignored"""
+
+
+class SnapshotCache:
+    """Directory of pickled snapshots of decoded databases, so loading an unchanged db again skips decoding it.
+
+    Each snapshot is stored with a key made of the db's resolved path, size, modification time and version, and is
+    only used if the db still has the same key. Otherwise (or if the snapshot can't be read) the db is parsed as
+    normal and the snapshot rewritten.
+
+    Snapshots are pickles, and unpickling runs whatever code a pickle asks for, so only use a directory that nobody
+    else can write to.
+
+    Attributes:
+        cache_dir: directory the snapshots are kept in
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir).expanduser()
+
+    @staticmethod
+    def key(path):
+        """Build the key identifying the current contents of a db file.
+
+        Args:
+            path: path of the db
+
+        Returns:
+            tuple: the key
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        with open(path, "rb") as f:
+            header = f.read(INT.size)
+        version = INT.unpack(header)[0] if len(header) == INT.size else None
+        return SNAPSHOT_FORMAT, str(path), stat.st_size, stat.st_mtime_ns, version
+
+    def _file(self, kind: str, key):
+        digest = hashlib.sha1(key[1].encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{kind}-{digest}.snapshot"
+
+    def load(self, kind: str, key):
+        """Read a snapshot.
+
+        Args:
+            kind: what sort of db it is a snapshot of (e.g. "osu_db")
+            key: key of the db as it is now
+
+        Returns:
+            object: the snapshot, or None if there isn't an up to date one
+        """
+        try:
+            with open(self._file(kind, key), "rb") as f, gc_paused():
+                if pickle.load(f) != key:
+                    return None
+                return pickle.load(f)
+        except Exception:
+            # a snapshot that's missing, truncated or from an incompatible version is just treated as out of date
+            return None
+
+    def save(self, kind: str, key, state):
+        """Write a snapshot, replacing any older one of the same db.
+
+        Args:
+            kind: what sort of db it is a snapshot of
+            key: key of the db the snapshot was decoded from
+            state: picklable object to store
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        target = self._file(kind, key)
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        with open(temp, "wb") as f:
+            pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, target)
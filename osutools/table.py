@@ -0,0 +1,301 @@
+import math
+
+from .db import BEATMAP, _approved
+from .dbschema import gc_paused
+from .utils import TICKS_EPOCH, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+UNIX_EPOCH_TICKS = 621355968000000000
+""".NET ticks of 1970-01-01, where datetime64 counts from"""
+
+COLUMNS = {
+    "beatmap_id": "int64",
+    "mapset_id": "int64",
+    "mode": "int8",
+    "approval": "int8",
+    "approach_rate": "float32",
+    "circle_size": "float32",
+    "overall_difficulty": "float32",
+    "hp_drain": "float32",
+    "star_rating": "float64",
+    "length": "float64",
+    "drain_time": "int64",
+    "circle_count": "int32",
+    "slider_count": "int32",
+    "spinner_count": "int32",
+    "total_objects": "int32",
+    "last_played": "datetime64[us]",
+    "last_mod_time": "datetime64[us]",
+    "song_title": "object",
+    "artist": "object",
+    "creator_name": "object",
+    "difficulty_name": "object",
+    "source": "object",
+    "tags": "object",
+}
+"""dict: name and dtype of each column of a MapTable. mode and approval hold the Mode/Approval values, star_rating is
+the no mod star rating for the map's own mode (NaN in dbs too old to store it), dates are NaT if never set, and text
+columns are str (tags as one space separated string)"""
+
+SEARCHED = ("artist", "song_title", "creator_name", "difficulty_name", "source", "tags")
+"""tuple: text columns that free text in a search matches against"""
+
+_SCANNED = (
+    "file_md5",
+    "beatmap_id",
+    "beatmapset_id",
+    "mode",
+    "approved",
+    "diff_approach",
+    "diff_size",
+    "diff_overall",
+    "diff_drain",
+    "standard_star_ratings",
+    "taiko_star_ratings",
+    "ctb_star_ratings",
+    "mania_star_ratings",
+    "total_length",
+    "drain_time",
+    "count_normal",
+    "count_slider",
+    "count_spinner",
+    "last_played",
+    "last_mod_time",
+    "title",
+    "artist",
+    "creator",
+    "version",
+    "source",
+    "tags",
+)
+_STAR_RATINGS = _SCANNED[9:13]
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _nomod_stars(ratings):
+    if ratings:
+        for mods, stars in ratings:
+            if mods == 0:
+                return stars
+    return math.nan
+
+
+def _ticks_to_datetime64(ticks):
+    ticks = np.asarray(ticks, dtype="int64")
+    dates = ((ticks - UNIX_EPOCH_TICKS) // 10).astype("datetime64[us]")
+    dates[ticks == 0] = np.datetime64("NaT")
+    return dates
+
+
+def _scanned_rows(osu_db):
+    buf, offsets, version = osu_db._data
+    scanner = BEATMAP.scanner(version, _SCANNED)
+    for offset in offsets.values():
+        found = scanner.scan(buf, offset)[0]
+        mode = found["mode"]
+        stars = found.get(_STAR_RATINGS[mode]) if mode < 4 else None
+        total_length = found["total_length"]
+        yield (
+            found["file_md5"],
+            found["beatmap_id"],
+            found["beatmapset_id"],
+            mode,
+            _approved(found["approved"]),
+            found["diff_approach"],
+            found["diff_size"],
+            found["diff_overall"],
+            found["diff_drain"],
+            _nomod_stars(stars),
+            total_length if total_length != 4294967295 else 0,
+            found["drain_time"],
+            found["count_normal"],
+            found["count_slider"],
+            found["count_spinner"],
+            found["count_normal"] + found["count_slider"] + found["count_spinner"],
+            found["last_played"],
+            found["last_mod_time"],
+            found["title"],
+            found["artist"],
+            found["creator"],
+            found["version"],
+            found["source"],
+            found["tags"],
+        )
+
+
+def _decoded_rows(osu_db):
+    attributes = ("standard_sr_ratings", "taiko_sr_ratings", "ctb_sr_ratings", "mania_sr_ratings")
+    for md5, local_map in osu_db.maps.items():
+        mode = local_map.mode.value
+        yield (
+            md5,
+            local_map.beatmap_id,
+            local_map.mapset_id,
+            mode,
+            local_map.approval.value,
+            local_map.approach_rate,
+            local_map.circle_size,
+            local_map.overall_difficulty,
+            local_map.hp_drain,
+            _nomod_stars(getattr(local_map, attributes[mode], None)),
+            local_map.length,
+            local_map.drain_time,
+            local_map.circle_count,
+            local_map.slider_count,
+            local_map.spinner_count,
+            local_map.total_objects,
+            local_map.last_played,
+            (local_map.last_mod_time - TICKS_EPOCH) // _MICROSECOND * 10,
+            local_map.song_title,
+            local_map.artist,
+            local_map.creator_name,
+            local_map.difficulty_name,
+            local_map.source,
+            " ".join(local_map.tags),
+        )
+
+
+class MapTable:
+    """Columnar view of the maps in an OsuDB, one NumPy array per field (see COLUMNS), so filters, aggregates and
+    sorts over the whole library are vectorized instead of looping over LocalMaps. Requires numpy.
+
+    Index a table with a column name to get that column, or with a boolean mask, array of row numbers or slice to get
+    a new table of just those rows. Rows map back to LocalMaps with map() and maps().
+
+        >> table = osu.osu_db.table()
+        >> hard = table[(table["star_rating"] > 6) & (table["mode"] == Mode.STANDARD.value)]
+        >> hard.sort("length", descending=True).maps()[:10]
+
+    Attributes:
+        osu_db: the OsuDB the rows come from
+        columns: dict of column name to array
+        md5: array of the md5 hash of each row's map
+    """
+
+    def __init__(self, osu_db, columns: dict, md5):
+        if np is None:
+            raise ImportError("MapTable requires numpy to be installed")
+        self.osu_db = osu_db
+        self.columns = columns
+        self.md5 = md5
+        self._indexes = {}
+        self._search_text = None
+
+    @classmethod
+    def from_osu_db(cls, osu_db):
+        """Build a table of every map in an OsuDB. Lazy dbs are scanned directly, without decoding each LocalMap.
+
+        Args:
+            osu_db: the OsuDB to build it from
+
+        Returns:
+            MapTable: the table
+        """
+        if np is None:
+            raise ImportError("MapTable requires numpy to be installed")
+        with gc_paused():
+            rows = list(_scanned_rows(osu_db) if osu_db.lazy else _decoded_rows(osu_db))
+            values = list(zip(*rows)) if rows else [()] * (len(COLUMNS) + 1)
+        columns = {}
+        for (name, dtype), column in zip(COLUMNS.items(), values[1:]):
+            if dtype == "datetime64[us]":
+                columns[name] = _ticks_to_datetime64(column)
+            else:
+                columns[name] = np.array(column, dtype=dtype)
+        return cls(osu_db, columns, np.array(values[0], dtype=object))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.take(key)
+
+    def take(self, rows):
+        """Get a table of some of the rows.
+
+        Args:
+            rows: boolean mask, array of row numbers or slice
+
+        Returns:
+            MapTable: table of those rows, in that order
+        """
+        return MapTable(
+            self.osu_db,
+            {name: column[rows] for name, column in self.columns.items()},
+            self.md5[rows],
+        )
+
+    def sort(self, column: str, descending: bool = False):
+        """Sort the rows by a column. Ties keep their order, so sorts can be chained.
+
+        Args:
+            column: name of the column
+            descending: highest first rather than lowest. Missing values (NaN/NaT) go last either way
+
+        Returns:
+            MapTable: the sorted table
+        """
+        values = self.columns[column]
+        if not descending:
+            return self.take(np.argsort(values, kind="stable"))
+        # sort the reversed column and reverse the result, so ties keep their order, and keep NaN/NaT at the end
+        missing = values != values
+        present = np.flatnonzero(~missing)
+        flipped = np.argsort(values[present][::-1], kind="stable")[::-1]
+        order = np.concatenate([present[len(present) - 1 - flipped], np.flatnonzero(missing)])
+        return self.take(order)
+
+    def index(self, column: str):
+        """Get an index of a column's values, for looking up rows with an exact value without scanning the column.
+        Built the first time it's asked for. Text is indexed lowercase.
+
+        Args:
+            column: name of the column
+
+        Returns:
+            dict: value to sorted array of row numbers
+        """
+        index = self._indexes.get(column)
+        if index is None:
+            values = self.columns[column]
+            if values.dtype == object:
+                values = np.array([(value or "").lower() for value in values])
+            keys, inverse = np.unique(values, return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(keys)))[:-1]
+            index = self._indexes[column] = dict(zip(keys.tolist(), np.split(order, bounds)))
+        return index
+
+    def search_text(self):
+        """numpy.ndarray: lowercase text of each row's SEARCHED columns, joined by newlines, for substring matching"""
+        if self._search_text is None:
+            texts = zip(*(self.columns[column] for column in SEARCHED))
+            self._search_text = np.array(
+                ["\n".join(text or "" for text in row).lower() for row in texts], dtype=str
+            )
+        return self._search_text
+
+    def map(self, row: int):
+        """Get the LocalMap of a row.
+
+        Args:
+            row: row number
+
+        Returns:
+            LocalMap: the map
+        """
+        return self.osu_db.maps[self.md5[row]]
+
+    def maps(self):
+        """[LocalMap]: LocalMaps of every row, in order"""
+        maps = self.osu_db.maps
+        return [maps[md5] for md5 in self.md5]
+
+    def __len__(self):
+        return len(self.md5)
+
+    def __repr__(self):
+        return f"MapTable of {len(self)} maps"
@@ -0,0 +1,285 @@
+import heapq
+import re
+import sys
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+
+from .db import BEATMAP
+from .dbschema import gc_paused
+
+TOKEN = re.compile(r"\w+")
+
+INDEXED = ("artist", "artist_unicode", "title", "title_unicode", "creator", "version", "source", "tags")
+"""tuple: osu!.db fields of each map that are indexed"""
+
+PREFIX_SCORE = 0.8
+"""float: score of a query word that's the start of a word in a map, rather than a whole word (which scores 1)"""
+
+FUZZY_SCORE = 0.6
+"""float: score of a fuzzy match with a trigram similarity of 1, scaled down by the actual similarity"""
+
+
+def normalize(text: str):
+    """Fold text for matching: compatibility forms unified (e.g. full width letters), accents removed and case folded.
+
+    Args:
+        text: the text
+
+    Returns:
+        str: the folded text
+    """
+    if not text or max(text) < "\x80":
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+@lru_cache(maxsize=4096)
+def tokenize(text: str):
+    """Split text into normalized words. Artists, creators and tags repeat a lot, so recent results are cached.
+
+    Args:
+        text: the text
+
+    Returns:
+        (str): the words, in order
+    """
+    return tuple(TOKEN.findall(normalize(text))) if text else ()
+
+
+def trigrams(token: str):
+    """Get the trigrams of a word, padded so the start and end of the word count too.
+
+    Args:
+        token: a normalized word
+
+    Returns:
+        set: its trigrams
+    """
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _local_map_texts(local_map):
+    return (
+        local_map.artist,
+        local_map.artist_unicode,
+        local_map.song_title,
+        local_map.title_unicode,
+        local_map.creator_name,
+        local_map.difficulty_name,
+        local_map.source,
+        " ".join(local_map.tags),
+    )
+
+
+class TextIndex:
+    """Inverted index over the text of every map in an OsuDB (artist, title, their unicode versions, creator,
+    difficulty name, source and tags), for searching maps by words instead of scanning them all.
+
+    Each normalized word maps to the set of maps containing it, and each word's trigrams map to the words containing
+    them, so a search only looks at the maps that match: a query word finds maps with that word, with a word starting
+    with it, or (when fuzzy) with a word that shares enough trigrams with it to be a likely typo. Results are ranked by
+    how well every query word matched. The index can be kept up to date with add() and remove() instead of rebuilding.
+
+    Attributes:
+        min_similarity: lowest trigram similarity (shared over total trigrams) that counts as a fuzzy match
+    """
+
+    def __init__(self, min_similarity: float = 0.3):
+        self.min_similarity = min_similarity
+        self._docs = []
+        self._ids = {}
+        self._doc_tokens = []
+        self._postings = {}
+        self._vocabulary = []
+        self._trigrams = {}
+        self._free = []
+
+    @classmethod
+    def from_osu_db(cls, osu_db, min_similarity: float = 0.3):
+        """Index every map in an OsuDB. Lazy dbs are scanned directly, without decoding each LocalMap.
+
+        Args:
+            osu_db: the OsuDB to index
+            min_similarity: lowest trigram similarity that counts as a fuzzy match
+
+        Returns:
+            TextIndex: the index
+        """
+        index = cls(min_similarity)
+        with gc_paused():
+            if osu_db.lazy:
+                buf, offsets, version = osu_db._data
+                scanner = BEATMAP.scanner(version, ("file_md5",) + INDEXED)
+                for offset in offsets.values():
+                    found = scanner.scan(buf, offset)[0]
+                    index._add(found["file_md5"], [found[field] for field in INDEXED], keep_sorted=False)
+            else:
+                for md5, local_map in osu_db.maps.items():
+                    index._add(md5, _local_map_texts(local_map), keep_sorted=False)
+            # sorted once at the end rather than inserting each new word in place, which is quadratic over a whole db
+            index._vocabulary.sort()
+        return index
+
+    def add(self, md5_hash: str, texts):
+        """Index a map, replacing it if it's already indexed.
+
+        Args:
+            md5_hash: md5 hash of the map
+            texts: the map's text fields
+        """
+        self._add(md5_hash, texts, keep_sorted=True)
+
+    def _add(self, md5_hash, texts, keep_sorted):
+        if md5_hash in self._ids:
+            self.remove(md5_hash)
+        tokens = set()
+        for text in texts:
+            tokens.update(tokenize(text))
+        if self._free:
+            doc = self._free.pop()
+            self._docs[doc] = md5_hash
+            self._doc_tokens[doc] = tuple(tokens)
+        else:
+            doc = len(self._docs)
+            self._docs.append(md5_hash)
+            self._doc_tokens.append(tuple(tokens))
+        self._ids[md5_hash] = doc
+        for token in tokens:
+            docs = self._postings.get(token)
+            if docs is None:
+                docs = self._postings[token] = set()
+                if keep_sorted:
+                    insort(self._vocabulary, token)
+                else:
+                    self._vocabulary.append(token)
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+            docs.add(doc)
+
+    def remove(self, md5_hash: str):
+        """Stop indexing a map. Does nothing if it isn't indexed.
+
+        Args:
+            md5_hash: md5 hash of the map
+        """
+        doc = self._ids.pop(md5_hash, None)
+        if doc is None:
+            return
+        for token in self._doc_tokens[doc]:
+            docs = self._postings[token]
+            docs.discard(doc)
+            if not docs:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+                for trigram in trigrams(token):
+                    words = self._trigrams[trigram]
+                    words.discard(token)
+                    if not words:
+                        del self._trigrams[trigram]
+        self._docs[doc] = None
+        self._doc_tokens[doc] = ()
+        self._free.append(doc)
+
+    def update(self, osu_db, changes):
+        """Bring the index up to date after OsuDB.reload().
+
+        Args:
+            osu_db: the reloaded OsuDB
+            changes: the DbDiff reload() returned
+        """
+        for md5_hash in changes.removed:
+            self.remove(md5_hash)
+        for md5_hash in changes.added + changes.changed:
+            self.add(md5_hash, _local_map_texts(osu_db.maps[md5_hash]))
+
+    def _matches(self, word: str, prefix: bool, fuzzy: bool):
+        """Score every map matching one query word.
+
+        Returns:
+            dict: doc id to the best score of any of its words
+        """
+        scores = dict.fromkeys(self._postings.get(word, ()), 1.0)
+        if prefix:
+            for token in islice(self._vocabulary, bisect_left(self._vocabulary, word), None):
+                if not token.startswith(word):
+                    break
+                if token != word:
+                    for doc in self._postings[token]:
+                        if doc not in scores:
+                            scores[doc] = PREFIX_SCORE
+        if fuzzy:
+            query_trigrams = trigrams(word)
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self._trigrams.get(trigram, ()))
+            for token, count in shared.items():
+                similarity = count / (len(query_trigrams) + len(trigrams(token)) - count)
+                if similarity < self.min_similarity or token == word:
+                    continue
+                score = FUZZY_SCORE * similarity
+                for doc in self._postings[token]:
+                    if scores.get(doc, 0) < score:
+                        scores[doc] = score
+        return scores
+
+    def search(self, query: str, limit: int = 50, prefix: bool = True, fuzzy: bool = True):
+        """Find the maps matching every word of a query, best matches first.
+
+        Args:
+            query: words to search for
+            limit: most results returned, or None for all of them
+            prefix: whether a query word matches words that start with it
+            fuzzy: whether a query word matches similarly spelled words
+
+        Returns:
+            [(str, float)]: md5 hash and score of each matching map
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        matches = sorted(
+            (self._matches(word, prefix, fuzzy) for word in dict.fromkeys(words)), key=len
+        )
+        totals = matches[0]
+        for scores in matches[1:]:
+            totals = {doc: total + scores[doc] for doc, total in totals.items() if doc in scores}
+        key = lambda item: (-item[1], item[0])
+        if limit is None:
+            ranked = sorted(totals.items(), key=key)
+        else:
+            ranked = heapq.nsmallest(limit, totals.items(), key=key)
+        return [(self._docs[doc], score) for doc, score in ranked]
+
+    def memory_usage(self):
+        """Estimate how much memory the index takes up, not counting the md5 hashes it shares with the OsuDB.
+
+        Returns:
+            dict: bytes used by each part of the index, and the total
+        """
+        usage = {
+            "postings": sys.getsizeof(self._postings)
+            + sum(sys.getsizeof(token) + sys.getsizeof(docs) for token, docs in self._postings.items()),
+            "trigrams": sys.getsizeof(self._trigrams)
+            + sum(sys.getsizeof(trigram) + sys.getsizeof(words) for trigram, words in self._trigrams.items()),
+            "documents": sys.getsizeof(self._docs)
+            + sys.getsizeof(self._ids)
+            + sys.getsizeof(self._doc_tokens)
+            + sum(sys.getsizeof(tokens) for tokens in self._doc_tokens)
+            + sys.getsizeof(self._vocabulary),
+        }
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return (
+            f"TextIndex of {len(self)} maps, {len(self._postings)} words, "
+            f"{self.memory_usage()['total'] / 2 ** 20:.1f}MiB"
+        )
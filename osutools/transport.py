@@ -0,0 +1,252 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
+
+API_URL = "https://osu.ppy.sh/api/"
+"""str: Base url that api v1 endpoint names are appended to."""
+
+
+class Transport:
+    """Base class for the http layer used by the api clients.
+
+    A transport only has to turn an endpoint name and a dict of parameters into the raw response body, so anything
+    that can do that (a pooled session, a proxy, a local stand-in for benchmarks) can be given to OsuClientV1.
+    """
+
+    def get(self, endpoint: str, params: dict):
+        """Request an api endpoint.
+
+        Args:
+            endpoint: name of the endpoint (e.g. "get_user")
+            params: dict of parameters to send, including the api key
+
+        Returns:
+            bytes: the raw response body
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources (connections, sockets) held by the transport."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class HTTPTransport(Transport):
+    """Transport backed by a single requests.Session, so connections to the api are pooled and kept alive between
+    calls instead of paying for a new TCP + TLS handshake every request.
+
+    Attributes:
+        base_url: url the endpoint names are appended to
+        timeout: seconds to wait for the server to connect/respond, or a (connect, read) tuple
+        session: the underlying requests.Session
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_URL,
+        pool_size: int = 10,
+        timeout=10.0,
+        keep_alive: bool = True,
+        gzip: bool = True,
+        max_retries: int = 0,
+    ):
+        """Create the session and mount a pooled adapter on it.
+
+        Args:
+            base_url: url the endpoint names are appended to
+            pool_size: maximum number of connections kept open to the api (set this to at least the number of threads
+                making requests at once)
+            timeout: seconds to wait for the server to connect/respond, or a (connect, read) tuple
+            keep_alive: whether to reuse connections between requests
+            gzip: whether to ask the api for compressed responses
+            max_retries: number of times to retry a request that failed to connect
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if gzip else "identity"
+        self.session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+    def get(self, endpoint: str, params: dict):
+        r = self.session.get(
+            f"{self.base_url}{endpoint}", params=params, timeout=self.timeout
+        )
+        return r.content
+
+    def close(self):
+        self.session.close()
+
+
+class LocalTransport(Transport):
+    """Stand-in transport that answers requests from a python function instead of the network. Useful for tests and
+    for benchmarking the client without touching the real api.
+
+    Attributes:
+        handler: function taking (endpoint, params) and returning the response as json-serialisable data or bytes
+        latency: seconds to sleep before answering each request, to simulate a round trip
+        calls: number of requests answered so far
+    """
+
+    def __init__(self, handler, latency: float = 0.0):
+        """Initialise the transport with a function to answer requests.
+
+        Args:
+            handler: function taking (endpoint, params) and returning the response as json-serialisable data or bytes
+            latency: seconds to sleep before answering each request, to simulate a round trip
+        """
+        self.handler = handler
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, params: dict):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = self.handler(endpoint, dict(params))
+        if isinstance(response, bytes):
+            return response
+        return json.dumps(response).encode()
+
+
+class AsyncTransport:
+    """Base class for the http layer used by AsyncOsuClientV1. The same as Transport, but get() is a coroutine."""
+
+    async def get(self, endpoint: str, params: dict):
+        """Request an api endpoint without blocking the event loop.
+
+        Args:
+            endpoint: name of the endpoint (e.g. "get_user")
+            params: dict of parameters to send, including the api key
+
+        Returns:
+            bytes: the raw response body
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Release any resources (connections, sockets) held by the transport."""
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AiohttpTransport(AsyncTransport):
+    """Native asyncio transport backed by a pooled aiohttp.ClientSession. Requires aiohttp to be installed.
+
+    Attributes:
+        base_url: url the endpoint names are appended to
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_URL,
+        pool_size: int = 100,
+        timeout: float = 10.0,
+        keep_alive: bool = True,
+        gzip: bool = True,
+    ):
+        """Store the session settings. The session itself is created on first use, inside the running event loop.
+
+        Args:
+            base_url: url the endpoint names are appended to
+            pool_size: maximum number of connections kept open to the api
+            timeout: total seconds to wait for a response
+            keep_alive: whether to reuse connections between requests
+            gzip: whether to ask the api for compressed responses
+        """
+        if aiohttp is None:
+            raise ImportError("AiohttpTransport requires aiohttp to be installed")
+        self.base_url = base_url
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._keep_alive = keep_alive
+        self._gzip = gzip
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_size, force_close=not self._keep_alive
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+                headers={"Accept-Encoding": "gzip, deflate" if self._gzip else "identity"},
+            )
+        return self._session
+
+    async def get(self, endpoint: str, params: dict):
+        params = {key: str(value) for key, value in params.items()}
+        async with self._get_session().get(
+            f"{self.base_url}{endpoint}", params=params
+        ) as r:
+            return await r.read()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class ThreadedTransport(AsyncTransport):
+    """Runs a blocking Transport on a thread pool so it can be awaited without stalling the event loop. Used by
+    AsyncOsuClientV1 when aiohttp isn't installed, and to use a LocalTransport with the async client.
+
+    Attributes:
+        transport: the blocking transport requests are sent through
+    """
+
+    def __init__(self, transport: Transport = None, max_workers: int = 32):
+        """Wrap a blocking transport.
+
+        Args:
+            transport: the blocking transport to run (defaults to an HTTPTransport with a pool of max_workers)
+            max_workers: number of threads requests can be running on at once
+        """
+        self.transport = (
+            transport if transport is not None else HTTPTransport(pool_size=max_workers)
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def get(self, endpoint: str, params: dict):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, self.transport.get, endpoint, params
+        )
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+        self.transport.close()
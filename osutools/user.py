@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
-from .utils import Mode, Playtime
+from .utils import Mode, Playtime, parse_timestamp
+from .model import Model
 
 
-class User:
+class User(Model):
     """Object representing JSON response from the osu! api plus some helper methods.
 
     Attributes:
@@ -33,33 +34,38 @@ class User:
 
     """
 
-    def __init__(self, user_info, osu_client, mode: Mode = Mode.STANDARD):
+    _fields = {
+        "id": lambda u, i: int(i["user_id"]),
+        "username": lambda u, i: i["username"],
+        "join_date": lambda u, i: parse_timestamp(i["join_date"]),
+        "num_300": lambda u, i: int(i["count300"]),
+        "num_100": lambda u, i: int(i["count100"]),
+        "num_50": lambda u, i: int(i["count50"]),
+        "play_count": lambda u, i: int(i["playcount"]),
+        "ranked_score": lambda u, i: int(i["ranked_score"]),
+        "total_score": lambda u, i: int(i["total_score"]),
+        "rank": lambda u, i: int(i["pp_rank"]),
+        "level": lambda u, i: float(i["level"]),
+        "pp": lambda u, i: float(i["pp_raw"]),
+        "accuracy": lambda u, i: float(i["accuracy"]),
+        "ss_count": lambda u, i: int(i["count_rank_ss"]),
+        "ssh_count": lambda u, i: int(i["count_rank_ssh"]),
+        "s_count": lambda u, i: int(i["count_rank_s"]),
+        "sh_count": lambda u, i: int(i["count_rank_sh"]),
+        "a_count": lambda u, i: int(i["count_rank_a"]),
+        "country": lambda u, i: i["country"],
+        "country_rank": lambda u, i: int(i["pp_country_rank"]),
+        "playtime": lambda u, i: Playtime(int(i["total_seconds_played"])),
+        "avatar_url": lambda u, i: f"http://s.ppy.sh/a/{u.id}",
+    }
+
+    def __init__(
+        self, user_info, osu_client, mode: Mode = Mode.STANDARD, lazy: bool = False
+    ):
         self.client = osu_client
         self.mode = mode
-        self.id = int(user_info["user_id"])
-        self.username = user_info["username"]
-        self.join_date = datetime.strptime(user_info["join_date"], "%Y-%m-%d %H:%M:%S")
-        self.num_300 = int(user_info["count300"])
-        self.num_100 = int(user_info["count100"])
-        self.num_50 = int(user_info["count50"])
-        self.play_count = int(user_info["playcount"])
-        self.ranked_score = int(user_info["ranked_score"])
-        self.total_score = int(user_info["total_score"])
-        self.rank = int(user_info["pp_rank"])
-        self.level = float(user_info["level"])
-        self.pp = float(user_info["pp_raw"])
-        self.accuracy = float(user_info["accuracy"])
-        self.ss_count = int(user_info["count_rank_ss"])
-        self.ssh_count = int(user_info["count_rank_ssh"])
-        self.s_count = int(user_info["count_rank_s"])
-        self.sh_count = int(user_info["count_rank_sh"])
-        self.a_count = int(user_info["count_rank_a"])
-        self.country = user_info["country"]
-        self.country_rank = int(user_info["pp_country_rank"])
-        seconds = int(user_info["total_seconds_played"])
-        self.playtime = Playtime(seconds)
         self.recents = {Mode.STANDARD: [], Mode.TAIKO: [], Mode.CTB: [], Mode.MANIA: []}
-        self.avatar_url = f"http://s.ppy.sh/a/{self.id}"
+        self._load(user_info, lazy)
 
     def fetch_best(self, mode: Mode = Mode.STANDARD, limit: int = 10):
         """Helper for collecting a user's best scores.
@@ -97,7 +103,8 @@ class User:
         Returns:
             [RecentScore]: List of the player's scores since the most recent
         """
-        now = datetime.now()
+        # api timestamps are naive UTC, so compare against UTC rather than local time
+        now = datetime.utcnow()
         self.recents[mode] = [
             score
             for score in self.recents[mode]
@@ -107,7 +114,7 @@ class User:
             user_id=self.id, mode=mode, limit=100
         )
         if new_scores:
-            dates = [score.timestamp for score in self.recents[mode]]
+            dates = {score.timestamp for score in self.recents[mode]}
             new = [score for score in new_scores if score.timestamp not in dates]
             self.recents[mode] += new
             return new
@@ -5,6 +5,7 @@ from enum import (
     _decompose,
 )  # yes this method is meant to be package private but Flag did everything I wanted it to apart from this
 from datetime import timedelta, datetime, timezone
+from functools import lru_cache
 import struct
 from json import JSONEncoder
 
@@ -231,6 +232,48 @@ class Playtime:
         return f"{self.combined}"
 
 
+API_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+"""str: format of the timestamps returned by the api (always UTC)"""
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(timestamp: str):
+    """Parse a timestamp from the api ("YYYY-MM-DD HH:MM:SS", UTC). Much faster than strptime since the format is
+    fixed, and cached as the same timestamps turn up many times (e.g. every score in a multiplayer game).
+
+    Args:
+        timestamp: the timestamp string
+
+    Returns:
+        datetime: naive datetime in UTC, the same as strptime would give, or None if timestamp is empty/None
+    """
+    if not timestamp:
+        return None
+    return datetime(
+        int(timestamp[0:4]),
+        int(timestamp[5:7]),
+        int(timestamp[8:10]),
+        int(timestamp[11:13]),
+        int(timestamp[14:16]),
+        int(timestamp[17:19]),
+    )
+
+
+def format_timestamp(dt: datetime):
+    """Format a datetime the way the api expects. Timezone aware datetimes are converted to UTC first, naive ones are
+    assumed to already be UTC.
+
+    Args:
+        dt: the datetime to format
+
+    Returns:
+        str: the formatted timestamp
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime(API_DATE_FORMAT)
+
+
 def read_byte(db):
     return int.from_bytes(db.read(1), "little")
 
@@ -301,7 +344,16 @@ def read_timing(db):
     return bpm, offset, inherited
 
 
+TICKS_EPOCH = datetime(year=1, month=1, day=1, tzinfo=timezone.utc)
+"""datetime: what a .NET DateTime of 0 ticks (100ns units) represents"""
+
+
+@lru_cache(maxsize=1024)
+def ticks_to_datetime(ticks: int):
+    """Convert .NET ticks to a UTC datetime. Integer division keeps it exact, unlike multiplying by 0.1, and repeated
+    values (e.g. the 0 stored for maps that were never modified) are cached."""
+    return TICKS_EPOCH + timedelta(microseconds=ticks // 10)
+
+
 def read_datetime(db):
-    ticks = read_long(db)
-    start = datetime(year=1, month=1, day=1, tzinfo=timezone.utc)
-    return start + timedelta(microseconds=ticks * 0.1)
+    return ticks_to_datetime(read_long(db))
@@ -0,0 +1,247 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import time
+
+from .exceptions import RequestException
+from .ratelimit import Priority, lane
+from .utils import Mode
+
+
+def score_key(score):
+    """Key identifying a recent score. A player can't set two scores on the same map in the same second."""
+    return score.map_id, score.timestamp, score.score
+
+
+class WatchTarget:
+    """Polling state of one watched player/mode.
+
+    Attributes:
+        user_id: id of the player
+        mode: gamemode being watched
+        interval: seconds until the next poll after the current one
+        due: clock time of the next poll
+        seen: keys of the scores in the last response
+        last_error: exception raised by the last poll, or None if it succeeded
+    """
+
+    def __init__(self, user_id: int, mode: Mode, interval: float, due: float):
+        self.user_id = user_id
+        self.mode = mode
+        self.interval = interval
+        self.due = due
+        self.seen = None
+        self.last_error = None
+        self.removed = False
+
+    def __repr__(self):
+        return f"{self.user_id} ({self.mode.name}) every {self.interval:.0f}s"
+
+
+class RecentScoreWatcher:
+    """Watches many players' recent scores with one client, yielding each new score once.
+
+    Players are polled on their own schedule: a poll that finds new scores resets the player to min_interval, and each
+    poll that doesn't multiplies it by backoff, up to max_interval, so active players are checked often and idle ones
+    rarely. Polls are spread out so no more than requests_per_minute are made in total, and run in the client's bulk
+    rate limiter lane.
+
+    Iterate over the watcher (or async iterate, with an AsyncOsuClientV1) to get new RecentScores as they're found, or
+    call poll_due() from your own loop.
+
+    Attributes:
+        client: OsuClientV1 or AsyncOsuClientV1 used to make requests
+        targets: dict of (user_id, mode) to WatchTarget
+    """
+
+    def __init__(
+        self,
+        client,
+        targets=(),
+        min_interval: float = 30.0,
+        max_interval: float = 900.0,
+        backoff: float = 2.0,
+        requests_per_minute: float = 60,
+        limit: int = 50,
+        emit_existing: bool = False,
+        clock=time.monotonic,
+    ):
+        """Create a watcher.
+
+        Args:
+            client: client used to make requests
+            targets: user ids, or (user_id, Mode) tuples, to start watching
+            min_interval: seconds between polls of an active player
+            max_interval: longest a player can go between polls
+            backoff: how much a player's interval grows after a poll with no new scores
+            requests_per_minute: most requests made by the watcher in total
+            limit: number of recent scores requested per poll (max 100)
+            emit_existing: whether scores already there on a player's first poll count as new
+            clock: function returning the current time in seconds
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.spacing = 60 / requests_per_minute
+        self.limit = limit
+        self.emit_existing = emit_existing
+        self.clock = clock
+        self.targets = {}
+        self._queue = []
+        self._order = itertools.count()
+        self._next_request = clock()
+        for target in targets:
+            if isinstance(target, tuple):
+                self.add(*target)
+            else:
+                self.add(target)
+
+    def add(self, user_id: int, mode: Mode = Mode.STANDARD):
+        """Start watching a player. Their first poll is made as soon as the rate allows.
+
+        Args:
+            user_id: id of the player
+            mode: gamemode to watch
+        """
+        if (user_id, mode) in self.targets:
+            return
+        target = WatchTarget(user_id, mode, self.min_interval, self.clock())
+        self.targets[(user_id, mode)] = target
+        self._schedule(target)
+
+    def remove(self, user_id: int, mode: Mode = Mode.STANDARD):
+        """Stop watching a player.
+
+        Args:
+            user_id: id of the player
+            mode: gamemode to stop watching
+        """
+        target = self.targets.pop((user_id, mode), None)
+        if target is not None:
+            target.removed = True
+
+    def _schedule(self, target: WatchTarget):
+        heapq.heappush(self._queue, (target.due, next(self._order), target))
+
+    def _head(self):
+        while self._queue and self._queue[0][2].removed:
+            heapq.heappop(self._queue)
+        return self._queue[0][2] if self._queue else None
+
+    def wait_time(self, now: float = None):
+        """Seconds until the next poll can be made.
+
+        Args:
+            now: current clock time, defaults to clock()
+
+        Returns:
+            float: seconds to wait, 0 if a poll is due now
+        """
+        now = self.clock() if now is None else now
+        head = self._head()
+        if head is None:
+            return self.min_interval
+        return max(0.0, head.due - now, self._next_request - now)
+
+    def _next_target(self, now: float):
+        head = self._head()
+        if head is None or head.due > now or self._next_request > now:
+            return None
+        heapq.heappop(self._queue)
+        self._next_request = max(self._next_request, now) + self.spacing
+        return head
+
+    def _query(self, target: WatchTarget):
+        return dict(user_id=target.user_id, mode=target.mode, limit=self.limit)
+
+    def _update(self, target: WatchTarget, scores, error, now: float):
+        """Work out which of a poll's scores are new and reschedule the target."""
+        target.last_error = error
+        new = []
+        if error is None:
+            keys = {score_key(score): score for score in scores}
+            if target.seen is not None or self.emit_existing:
+                seen = target.seen or set()
+                new = [score for key, score in keys.items() if key not in seen]
+            # recent scores only ever drop off the end, so the latest response is all that needs remembering
+            target.seen = set(keys)
+        if new:
+            target.interval = self.min_interval
+        else:
+            target.interval = min(target.interval * self.backoff, self.max_interval)
+        target.due = now + target.interval
+        if not target.removed:
+            self._schedule(target)
+        new.sort(key=lambda score: score.timestamp)
+        return new
+
+    def poll_due(self, now: float = None):
+        """Poll every player that is due, as far as the request rate allows, without waiting.
+
+        Args:
+            now: current clock time, defaults to clock()
+
+        Returns:
+            [RecentScore]: new scores found, oldest first for each player
+        """
+        new = []
+        fixed = now is not None
+        while True:
+            now = now if fixed else self.clock()
+            target = self._next_target(now)
+            if target is None:
+                return new
+            scores, error = None, None
+            try:
+                with lane(Priority.BULK, owner="watcher"):
+                    scores = self.client.fetch_user_recent(**self._query(target))
+            except (Exception, RequestException) as e:
+                error = e
+            new += self._update(target, scores, error, now)
+
+    async def poll_due_async(self, now: float = None):
+        """Same as poll_due(), for an AsyncOsuClientV1.
+
+        Args:
+            now: current clock time, defaults to clock()
+
+        Returns:
+            [RecentScore]: new scores found, oldest first for each player
+        """
+        new = []
+        fixed = now is not None
+        while True:
+            now = now if fixed else self.clock()
+            target = self._next_target(now)
+            if target is None:
+                return new
+            scores, error = None, None
+            try:
+                with lane(Priority.BULK, owner="watcher"):
+                    scores = self.client.fetch_user_recent(**self._query(target))
+                    if inspect.isawaitable(scores):
+                        scores = await scores
+            except asyncio.CancelledError:
+                raise
+            except (Exception, RequestException) as e:
+                error = e
+            new += self._update(target, scores, error, now)
+
+    def __iter__(self):
+        while True:
+            time.sleep(self.wait_time())
+            yield from self.poll_due()
+
+    async def _watch_async(self):
+        while True:
+            await asyncio.sleep(self.wait_time())
+            for score in await self.poll_due_async():
+                yield score
+
+    def __aiter__(self):
+        return self._watch_async()
+
+    def __len__(self):
+        return len(self.targets)
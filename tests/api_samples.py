@@ -0,0 +1,163 @@
+"""Canned osu! api v1 responses, so client features can be tested with a LocalTransport instead of the real api."""
+
+
+def user(user_id=11903239, username="flubb 4"):
+    return {
+        "user_id": str(user_id),
+        "username": username,
+        "join_date": "2018-03-15 17:21:30",
+        "count300": "7049855",
+        "count100": "689614",
+        "count50": "83471",
+        "playcount": "41252",
+        "ranked_score": "18712315386",
+        "total_score": "63826409437",
+        "pp_rank": "8765",
+        "level": "101.462",
+        "pp_raw": "7507.3",
+        "accuracy": "98.4126968383789",
+        "count_rank_ss": "41",
+        "count_rank_ssh": "12",
+        "count_rank_s": "452",
+        "count_rank_sh": "210",
+        "count_rank_a": "1211",
+        "country": "GB",
+        "total_seconds_played": "2893041",
+        "pp_country_rank": "402",
+        "events": [],
+    }
+
+
+def beatmap(beatmap_id=2788620, beatmapset_id=1346543, approved="1", approved_date="2020-07-11 09:20:22"):
+    return {
+        "beatmapset_id": str(beatmapset_id),
+        "beatmap_id": str(beatmap_id),
+        "approved": approved,
+        "total_length": "144",
+        "hit_length": "139",
+        "version": "Nyantiaz's Hard",
+        "file_md5": "ab1a905e925901a2ed1228a998050037",
+        "diff_size": "4",
+        "diff_overall": "7",
+        "diff_approach": "8.5",
+        "diff_drain": "5",
+        "mode": "0",
+        "count_normal": "215",
+        "count_slider": "164",
+        "count_spinner": "1",
+        "submit_date": "2020-06-10 16:33:20",
+        "approved_date": approved_date,
+        "last_update": "2020-07-03 18:52:51",
+        "artist": "Clairo",
+        "artist_unicode": "Clairo",
+        "title": "Sofia",
+        "title_unicode": "Sofia",
+        "creator": "Qiyana",
+        "creator_id": "9320502",
+        "bpm": "125",
+        "source": "",
+        "tags": "immune indie pop",
+        "genre_id": "5",
+        "language_id": "2",
+        "favourite_count": "251",
+        "rating": "9.37013",
+        "storyboard": "0",
+        "video": "0",
+        "download_unavailable": "0",
+        "audio_unavailable": "0",
+        "playcount": "213548",
+        "passcount": "31825",
+        "packs": None,
+        "max_combo": "570",
+        "diff_aim": "2.3921",
+        "diff_speed": "2.29564",
+        "difficultyrating": "4.90187",
+    }
+
+
+def score(score_id=3431543981, beatmap_id=2788620, date="2020-12-27 01:22:05", pp="187.413"):
+    return {
+        "beatmap_id": str(beatmap_id),
+        "score_id": str(score_id),
+        "score": "4924176",
+        "maxcombo": "566",
+        "count50": "0",
+        "count100": "9",
+        "count300": "371",
+        "countmiss": "0",
+        "countkatu": "8",
+        "countgeki": "63",
+        "perfect": "0",
+        "enabled_mods": "72",
+        "user_id": "11903239",
+        "date": date,
+        "rank": "SH",
+        "pp": pp,
+        "replay_available": "0",
+        "username": "flubb 4",
+    }
+
+
+def recent_score(beatmap_id=2788620, date="2020-12-27 01:22:05", score_value="4924176"):
+    return {
+        "beatmap_id": str(beatmap_id),
+        "score": score_value,
+        "maxcombo": "566",
+        "count50": "0",
+        "count100": "9",
+        "count300": "371",
+        "countmiss": "0",
+        "countkatu": "8",
+        "countgeki": "63",
+        "perfect": "0",
+        "enabled_mods": "72",
+        "user_id": "11903239",
+        "date": date,
+        "rank": "SH",
+    }
+
+
+def game(game_id=1, beatmap_id=2788620, end_time="2021-02-13 18:10:40", players=2):
+    return {
+        "game_id": str(game_id),
+        "start_time": "2021-02-13 18:07:30",
+        "end_time": end_time,
+        "beatmap_id": str(beatmap_id),
+        "play_mode": "0",
+        "match_type": "0",
+        "scoring_type": "3",
+        "team_type": "2",
+        "mods": "1",
+        "scores": [
+            {
+                "slot": str(slot),
+                "team": str(1 + slot % 2),
+                "user_id": str(1000 + slot),
+                "score": str(500000 + slot),
+                "maxcombo": "400",
+                "rank": "0",
+                "count50": "1",
+                "count100": "20",
+                "count300": "350",
+                "countmiss": "2",
+                "countgeki": "60",
+                "countkatu": "10",
+                "perfect": "0",
+                "pass": "1",
+                "enabled_mods": "8",
+            }
+            for slot in range(players)
+        ],
+    }
+
+
+def match(match_id=77890000, games=(), end_time=None):
+    return {
+        "match": {
+            "match_id": str(match_id),
+            "name": "OWC: (Team A) vs (Team B)",
+            "start_time": "2021-02-13 18:00:00",
+            "end_time": end_time,
+        },
+        "games": list(games),
+    }
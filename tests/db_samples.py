@@ -0,0 +1,245 @@
+"""Writers for synthetic osu!.db, scores.db, collection.db and .osu files, so the db readers and pp calculation can be
+tested without real ones."""
+import random
+import struct
+from datetime import datetime, timezone
+
+OLD_VERSION = 20131216
+MID_VERSION = 20150203
+NEW_VERSION = 20210520
+
+
+def to_ticks(dt):
+    delta = dt - datetime(1, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 10 ** 7 + delta.microseconds * 10
+
+
+class DbWriter:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack("<" + fmt, *values))
+
+    def string(self, value):
+        if value is None:
+            self.parts.append(b"\x00")
+            return
+        raw = value.encode("utf-8")
+        size = len(raw)
+        leb = bytearray()
+        while True:
+            byte = size & 0x7F
+            size >>= 7
+            if size:
+                leb.append(byte | 0x80)
+            else:
+                leb.append(byte)
+                break
+        self.parts.append(b"\x0b" + bytes(leb) + raw)
+
+    def int_doubles(self, pairs):
+        self.pack("I", len(pairs))
+        for mods, stars in pairs:
+            self.pack("BIBd", 0x08, mods, 0x0D, stars)
+
+    def timing_points(self, points):
+        self.pack("I", len(points))
+        for point in points:
+            self.pack("dd?", *point)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(b"".join(self.parts))
+
+
+def beatmap(beatmap_id, set_id=None, md5=None, title=None, **overrides):
+    info = {
+        "artist": "Clairo",
+        "artist_unicode": "Clairo",
+        "title": title or f"Song {beatmap_id}",
+        "title_unicode": title or f"Song {beatmap_id}",
+        "creator": "Qiyana",
+        "version": "Nyantiaz's Hard",
+        "audio_filename": "audio.mp3",
+        "file_md5": md5 or f"{beatmap_id:032x}",
+        "filename": f"{beatmap_id}.osu",
+        "ranked_status": 4,
+        "count_normal": 200,
+        "count_slider": 150,
+        "count_spinner": 1,
+        "last_mod_time": datetime(2020, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        "diff_approach": 9.0,
+        "diff_size": 4.0,
+        "diff_drain": 5.5,
+        "diff_overall": 8.0,
+        "slider_velocity": 1.8,
+        "star_ratings": [(0, 4.9), (64, 6.8), (16, 5.2)],
+        "drain_time": 120,
+        "total_length": 131000,
+        "preview_start_time": 40000,
+        "timing_points": [(333.33, 0.0, True), (-100.0, 1500.0, False)],
+        "beatmapset_id": set_id or beatmap_id // 10,
+        "thread_id": 0,
+        "grades": (9, 9, 9, 9),
+        "local_offset": 0,
+        "stack_leniency": 0.7,
+        "mode": 0,
+        "source": "",
+        "tags": "pop indie ünïcode",
+        "online_offset": 0,
+        "title_font": None,
+        "unplayed": False,
+        "last_played": 637000000000000000,
+        "is_osz2": False,
+        "folder_name": f"{beatmap_id} Clairo - Sofia",
+        "last_updated": 637000000000000000,
+        "last_mod_time_2": 0,
+        "scroll_speed": 0,
+    }
+    info["beatmap_id"] = beatmap_id
+    info.update(overrides)
+    return info
+
+
+def write_beatmap(writer, version, info):
+    if version < 20191106:
+        writer.pack("I", 1234)
+    for key in ("artist", "artist_unicode", "title", "title_unicode", "creator", "version", "audio_filename",
+                "file_md5", "filename"):
+        writer.string(info[key])
+    writer.pack("BHHHQ", info["ranked_status"], info["count_normal"], info["count_slider"], info["count_spinner"],
+                to_ticks(info["last_mod_time"]))
+    diffs = (info["diff_approach"], info["diff_size"], info["diff_drain"], info["diff_overall"])
+    if version < 20140609:
+        writer.pack("BBBB", *[int(d) for d in diffs])
+    else:
+        writer.pack("ffff", *diffs)
+    writer.pack("d", info["slider_velocity"])
+    if version >= 20140609:
+        for _ in range(4):
+            writer.int_doubles(info["star_ratings"])
+    writer.pack("III", info["drain_time"], info["total_length"], info["preview_start_time"])
+    writer.timing_points(info["timing_points"])
+    writer.pack("III", info["beatmap_id"], info["beatmapset_id"], info["thread_id"])
+    writer.pack("BBBBHfB", *info["grades"], info["local_offset"], info["stack_leniency"], info["mode"])
+    writer.string(info["source"])
+    writer.string(info["tags"])
+    writer.pack("H", info["online_offset"])
+    writer.string(info["title_font"])
+    writer.pack("?Q?", info["unplayed"], info["last_played"], info["is_osz2"])
+    writer.string(info["folder_name"])
+    writer.pack("Q?????", info["last_updated"], False, False, False, False, False)
+    if version < 20140609:
+        writer.pack("H", 0)
+    writer.pack("IB", info["last_mod_time_2"], info["scroll_speed"])
+
+
+def write_osu_db(path, maps, version=NEW_VERSION, player_name="flubb 4"):
+    writer = DbWriter()
+    writer.pack("II?Q", version, 12, True, 0)
+    writer.string(player_name)
+    writer.pack("I", len(maps))
+    for info in maps:
+        write_beatmap(writer, version, info)
+    writer.pack("I", 0)
+    writer.save(path)
+
+
+def score(map_hash, username="flubb 4", score_value=4924176, mods=72, timestamp=None, **overrides):
+    info = {
+        "mode": 0,
+        "version": NEW_VERSION,
+        "map_hash": map_hash,
+        "username": username,
+        "replay_hash": f"{map_hash[:16]}{score_value:016x}",
+        "counts": (371, 9, 0, 63, 8, 0),
+        "score": score_value,
+        "maxcombo": 566,
+        "perfect": False,
+        "mods": mods,
+        "timestamp": timestamp or datetime(2020, 12, 27, 1, 22, 5, tzinfo=timezone.utc),
+        "online_id": 3456789012,
+        "target_practice_acc": 0.5,
+    }
+    info.update(overrides)
+    return info
+
+
+def write_scores_db(path, scores_by_hash, version=NEW_VERSION):
+    writer = DbWriter()
+    writer.pack("II", version, len(scores_by_hash))
+    for md5, scores in scores_by_hash.items():
+        writer.string(md5)
+        writer.pack("I", len(scores))
+        for info in scores:
+            writer.pack("BI", info["mode"], info["version"])
+            writer.string(info["map_hash"])
+            writer.string(info["username"])
+            writer.string(info["replay_hash"])
+            writer.pack("HHHHHHIH?I", *info["counts"], info["score"], info["maxcombo"], info["perfect"], info["mods"])
+            writer.string("")
+            writer.pack("QiQ", to_ticks(info["timestamp"]), -1, info["online_id"])
+            if info["mods"] & 8388608:
+                writer.pack("d", info["target_practice_acc"])
+    writer.save(path)
+
+
+def write_collection_db(path, collections, version=NEW_VERSION):
+    writer = DbWriter()
+    writer.pack("II", version, len(collections))
+    for name, hashes in collections.items():
+        writer.string(name)
+        writer.pack("I", len(hashes))
+        for md5 in hashes:
+            writer.string(md5)
+    writer.save(path)
+
+
+def write_osu_folder(folder, maps, scores_by_hash, collections, version=NEW_VERSION):
+    write_osu_db(folder / "osu!.db", maps, version)
+    write_scores_db(folder / "scores.db", scores_by_hash, version)
+    write_collection_db(folder / "collection.db", collections, version)
+
+
+def osu_file(objects=300, approach_rate=9, overall_difficulty=8, seed=0):
+    """Contents of a standard .osu file with alternating sliders and circles at random positions."""
+    rng = random.Random(seed)
+    lines = [
+        "osu file format v14",
+        "",
+        "[General]",
+        "AudioFilename: audio.mp3",
+        "Mode: 0",
+        "",
+        "[Metadata]",
+        "Title:Test",
+        "Artist:Someone",
+        "Creator:me",
+        "Version:Hard",
+        "",
+        "[Difficulty]",
+        "HPDrainRate:5",
+        "CircleSize:4",
+        f"OverallDifficulty:{overall_difficulty}",
+        f"ApproachRate:{approach_rate}",
+        "SliderMultiplier:1.8",
+        "SliderTickRate:1",
+        "",
+        "[TimingPoints]",
+        "0,333.33,4,2,0,60,1,0",
+        "",
+        "[HitObjects]",
+    ]
+    for i in range(objects):
+        x, y, time = rng.randrange(20, 480), rng.randrange(20, 360), 1000 + i * 180
+        if i % 3 == 0:
+            lines.append(f"{x},{y},{time},2,0,B|{x + 100}:{y}|{x + 150}:{y + 50},1,140")
+        else:
+            lines.append(f"{x},{y},{time},1,0,0:0:0:0:")
+    return "\n".join(lines) + "\n"
+
+
+def write_osu_file(path, **kwargs):
+    path.write_text(osu_file(**kwargs))
+    return path
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+import osutools
+from osutools.transport import LocalTransport, ThreadedTransport
+
+from . import api_samples
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def handler(endpoint, params):
+    if endpoint == "get_user":
+        return [api_samples.user(username=params["u"])]
+    if endpoint == "get_beatmaps":
+        return [api_samples.beatmap(beatmap_id=params["b"])]
+    if endpoint == "get_user_best":
+        return [api_samples.score(score_id=n) for n in range(params["limit"])]
+    if endpoint == "get_match":
+        return api_samples.match(params["mp"], games=[api_samples.game(1), api_samples.game(2)])
+    return []
+
+
+def make_client(latency=0.0, **kwargs):
+    transport = ThreadedTransport(LocalTransport(handler, latency=latency), max_workers=16)
+    return osutools.AsyncOsuClientV1("token", transport=transport, **kwargs)
+
+
+def test_returns_same_models():
+    async def main():
+        async with make_client() as client:
+            user = await client.fetch_user(username="flubb 4")
+            beatmap = await client.fetch_map(2788620)
+            best = await client.fetch_user_best(user_id=1, limit=5)
+            match = await client.fetch_match(77890000)
+            return user, beatmap, best, match
+
+    user, beatmap, best, match = run(main())
+    assert isinstance(user, osutools.User) and user.username == "flubb 4"
+    assert isinstance(beatmap, osutools.Map) and beatmap.beatmap_id == 2788620
+    assert len(best) == 5 and isinstance(best[0], osutools.Score)
+    assert isinstance(match, osutools.Match) and len(match.games) == 2
+
+
+def test_concurrency_is_capped():
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def counting_handler(endpoint, params):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        threading.Event().wait(0.01)
+        with lock:
+            in_flight.pop()
+        return [api_samples.user()]
+
+    transport = ThreadedTransport(LocalTransport(counting_handler), max_workers=16)
+    client = osutools.AsyncOsuClientV1("token", transport=transport, max_concurrency=4)
+
+    async def main():
+        return await asyncio.gather(*[client.fetch_user(user_id=n) for n in range(1, 41)])
+
+    users = run(main())
+    assert len(users) == 40
+    assert max(peak) <= 4
+
+
+def test_per_call_timeout():
+    client = make_client(latency=0.5)
+    with pytest.raises(asyncio.TimeoutError):
+        run(client.fetch_user(user_id=1, timeout=0.05))
@@ -0,0 +1,102 @@
+import threading
+
+import osutools
+from osutools import bulk
+from osutools.bulk import SingleFlight
+from osutools.exceptions import RequestException
+from osutools.transport import LocalTransport, ThreadedTransport
+
+from . import api_samples
+from .test_asyncclient import run
+
+
+def handler(endpoint, params):
+    if endpoint == "get_beatmaps":
+        if int(params["b"]) == 13:
+            return {"error": "unlucky"}
+        if int(params["b"]) > 1000:
+            return []
+        return [api_samples.beatmap(beatmap_id=params["b"])]
+    if endpoint == "get_user":
+        if params["type"] == "string":
+            return [api_samples.user(username=params["u"])]
+        return [api_samples.user(user_id=params["u"])]
+    return []
+
+
+def test_fetch_maps_many_keeps_order_and_isolates_errors():
+    transport = LocalTransport(handler)
+    client = osutools.OsuClientV1("token", transport=transport)
+    results = client.fetch_maps_many([5, 13, 7, 5, 2000])
+    assert [result.key for result in results] == [5, 13, 7, 5, 2000]
+    assert results[0].value.beatmap_id == 5
+    assert isinstance(results[1].error, RequestException)
+    assert results[2].value.beatmap_id == 7
+    assert results[3] is results[0]
+    assert results[4].ok and results[4].value is None
+    assert transport.calls == 4
+
+
+def test_fetch_users_many_by_id_and_name():
+    client = osutools.OsuClientV1("token", transport=LocalTransport(handler))
+    results = client.fetch_users_many([2, "flubb 4"])
+    assert results[0].unwrap().id == 2
+    assert results[1].unwrap().username == "flubb 4"
+
+
+def test_concurrent_identical_requests_are_merged(monkeypatch):
+    waiting = threading.Semaphore(0)
+
+    class CountedEvent(threading.Event):
+        def wait(self, timeout=None):
+            waiting.release()
+            return super().wait(timeout)
+
+    class CountedCall(bulk._Call):
+        def __init__(self):
+            super().__init__()
+            self.done = CountedEvent()
+
+    monkeypatch.setattr(bulk, "_Call", CountedCall)
+
+    def slow_handler(endpoint, params):
+        # only answer once every other caller is waiting on this request
+        for _ in range(7):
+            assert waiting.acquire(timeout=5)
+        return handler(endpoint, params)
+
+    transport = LocalTransport(slow_handler)
+    client = osutools.OsuClientV1("token", transport=transport)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.fetch_map(5))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive()
+    assert transport.calls == 1
+    assert len(results) == 8
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    try:
+        flight.do("key", lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    assert len(flight) == 0
+    assert flight.do("key", lambda: 2) == 2
+
+
+def test_async_bulk():
+    transport = LocalTransport(handler, latency=0.01)
+    client = osutools.AsyncOsuClientV1("token", transport=ThreadedTransport(transport))
+
+    async def main():
+        return await client.fetch_maps_many([1, 2, 3, 13, 2, 1], concurrency=4)
+
+    results = run(main())
+    assert [result.key for result in results] == [1, 2, 3, 13, 2, 1]
+    assert results[3].error is not None
+    assert results[5].value.beatmap_id == 1
+    assert transport.calls == 4
@@ -0,0 +1,75 @@
+import time
+
+import osutools
+from osutools.cache import CachePolicy, CacheState, ResponseCache, beatmaps_ttl, DAY
+from osutools.transport import LocalTransport
+
+from . import api_samples
+
+
+def handler(endpoint, params):
+    if endpoint == "get_beatmaps":
+        return [api_samples.beatmap(beatmap_id=params["b"])]
+    if endpoint == "get_user":
+        return [api_samples.user(user_id=params["u"])]
+    if endpoint == "get_user_recent":
+        return [api_samples.recent_score()]
+    return []
+
+
+def make_client(cache):
+    transport = LocalTransport(handler)
+    return osutools.OsuClientV1("token", transport=transport, cache=cache), transport
+
+
+def test_repeated_requests_are_cached():
+    client, transport = make_client(ResponseCache())
+    for _ in range(3):
+        assert client.fetch_map(2788620).beatmap_id == 2788620
+    assert transport.calls == 1
+    assert client.cache.stats.hits == 2
+    assert client.cache.stats.misses == 1
+
+
+def test_key_ignores_api_key_and_value_types():
+    assert ResponseCache.key("get_user", {"u": 2, "k": "a"}) == ResponseCache.key("get_user", {"k": "b", "u": "2"})
+
+
+def test_ranked_maps_live_longer():
+    assert beatmaps_ttl([api_samples.beatmap(approved="1")]) == 7 * DAY
+    assert beatmaps_ttl([api_samples.beatmap(approved="1"), api_samples.beatmap(approved="0")]) < DAY
+
+
+def test_lru_eviction():
+    client, transport = make_client(ResponseCache(max_entries=2))
+    for user_id in (1, 2, 3, 1):
+        client.fetch_user(user_id=user_id)
+    assert transport.calls == 4
+    assert client.cache.stats.evictions == 2
+    assert len(client.cache) == 2
+
+
+def test_short_ttl_endpoint_expires():
+    client, transport = make_client(ResponseCache({"get_user_recent": CachePolicy(0.05)}))
+    client.fetch_user_recent(user_id=1)
+    client.fetch_user_recent(user_id=1)
+    time.sleep(0.06)
+    client.fetch_user_recent(user_id=1)
+    assert transport.calls == 2
+    assert client.cache.stats.expirations == 1
+
+
+def test_stale_while_revalidate():
+    cache = ResponseCache({"get_user": CachePolicy(0.05, stale_ttl=10)})
+    client, transport = make_client(cache)
+    client.fetch_user(user_id=1)
+    time.sleep(0.06)
+    key = cache.key("get_user", {"m": 0, "u": 1, "type": "id"})
+    assert cache.lookup(key)[0] == CacheState.STALE
+    # served from the stale entry straight away, then refreshed in the background
+    assert client.fetch_user(user_id=1).id == 1
+    deadline = time.monotonic() + 1
+    while transport.calls < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert transport.calls == 2
+    assert cache.stats.stale_hits == 2
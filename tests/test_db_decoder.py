@@ -0,0 +1,466 @@
+import gc
+import json
+import os
+import struct
+import sys
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+import osutools
+from osutools.db import BEATMAP
+from osutools.dbschema import decode_string, gc_paused
+
+from . import db_samples
+
+
+@pytest.fixture
+def client():
+    return osutools.OsuClientV1("token")
+
+
+@pytest.mark.parametrize("version", [db_samples.OLD_VERSION, db_samples.MID_VERSION, db_samples.NEW_VERSION])
+def test_osu_db_versions(tmp_path, client, version):
+    maps = [db_samples.beatmap(n) for n in range(10, 30)]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps, version=version)
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db")
+    assert osu_db.version == version
+    assert osu_db.player_name == "flubb 4"
+    assert osu_db.account_unlocked
+    assert osu_db.number_of_beatmaps == len(osu_db.maps) == 20
+    info = osu_db.map_dicts[17]
+    assert info["title"] == "Song 17"
+    assert info["tags"] == "pop indie ünïcode"
+    assert info["title_font"] is None
+    assert info["approved"] == 1
+    assert info["beatmapset_id"] == 1
+    assert info["last_mod_time"] == datetime(2020, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+    assert info["timing_points"] == [(333.33, 0.0, True), (-100.0, 1500.0, False)]
+    assert info["scroll_speed"] == 0
+    assert info["file_size"] == (1234 if version < 20191106 else -1)
+    if version < 20140609:
+        assert info["diff_drain"] == 5
+        assert "standard_star_ratings" not in info
+    else:
+        assert info["diff_drain"] == 5.5
+        assert info["mania_star_ratings"] == [(0, 4.9), (64, 6.8), (16, 5.2)]
+    local_map = osu_db.maps[f"{17:032x}"]
+    assert local_map.beatmap_id == 17
+    assert local_map.folder_name == "17 Clairo - Sofia"
+
+
+def test_versions_compile_once():
+    assert BEATMAP.compile(db_samples.NEW_VERSION) is BEATMAP.compile(db_samples.NEW_VERSION)
+    assert BEATMAP.compile(db_samples.NEW_VERSION) is not BEATMAP.compile(db_samples.OLD_VERSION)
+
+
+def test_strings():
+    long_title = "x" * 300
+    writer = db_samples.DbWriter()
+    writer.string(long_title)
+    writer.string(None)
+    writer.string("")
+    buf = b"".join(writer.parts)
+    value, offset = decode_string(buf, 0)
+    assert value == long_title and offset == 303
+    assert decode_string(buf, offset) == (None, offset + 1)
+    assert decode_string(buf, offset + 1) == ("", offset + 3)
+    buf = b"\x0b\x04caf\xe9"
+    assert decode_string(buf, 0) == ("café", 6)
+
+
+def test_scores_and_collections(tmp_path, client):
+    maps = [db_samples.beatmap(n) for n in range(10, 13)]
+    hashes = [info["file_md5"] for info in maps]
+    scores = {
+        hashes[0]: [db_samples.score(hashes[0]), db_samples.score(hashes[0], username="ito", score_value=12)],
+        hashes[1]: [db_samples.score(hashes[1], mods=8388608 | 8)],
+        "0" * 32: [db_samples.score("0" * 32)],
+    }
+    db_samples.write_osu_folder(tmp_path, maps, scores, {"0 stream warmup": hashes[:2], "empty": []})
+    client.set_osu_folder(tmp_path)
+    first = client.scores_db.score_by_map[10][0]
+    assert first.username == "flubb 4"
+    assert first.score == 4924176
+    assert first.map.beatmap_id == 10
+    assert first.timestamp == datetime(2020, 12, 27, 1, 22, 5, tzinfo=timezone.utc)
+    assert first.online_id == 3456789012
+    assert client.scores_db.score_by_map[10][1].username == "ito"
+    assert client.scores_db.score_by_map[11][0].mods == osutools.utils.Mods.Target | osutools.utils.Mods.HD
+    assert len(client.scores_db.maps["0" * 32]) == 1
+    assert client.collections_db.collections == {"0 stream warmup": hashes[:2], "empty": []}
+    assert client.collections_db.no_collections == 2
+
+
+@pytest.mark.parametrize("version", [db_samples.OLD_VERSION, db_samples.NEW_VERSION])
+def test_lazy_osu_db_matches_eager(tmp_path, client, version):
+    maps = [db_samples.beatmap(n, title="x" * (n * 7)) for n in range(10, 60)]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps, version=version)
+    eager = osutools.OsuDB(client, tmp_path / "osu!.db")
+    lazy = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True)
+    assert lazy.maps.cached == 0
+    assert list(lazy.maps) == list(eager.maps)
+    assert lazy.id_to_hash == eager.id_to_hash
+    assert lazy.map_dicts[33] == eager.map_dicts[33]
+    local_map = lazy.maps[f"{33:032x}"]
+    assert local_map.song_title == eager.maps[f"{33:032x}"].song_title
+    assert lazy.maps[f"{33:032x}"] is local_map
+    assert lazy.maps.cached == 1
+    assert "missing" not in lazy.maps
+    assert lazy.get_map_from_hash("missing") is None
+
+
+def test_lazy_osu_db_lru_bound(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", [db_samples.beatmap(n) for n in range(10, 30)])
+    client.set_osu_db(tmp_path / "osu!.db", lazy=True, max_cached=5)
+    assert len(client.osu_db.map_list()) == 20
+    assert client.osu_db.maps.cached == 5
+    assert client.get_local_map(f"{12:032x}").beatmap_id == 12
+
+
+def test_lazy_osu_folder_decodes_nothing_up_front(tmp_path, client, monkeypatch):
+    maps = [db_samples.beatmap(n) for n in range(10, 60)]
+    scores = {info["file_md5"]: [db_samples.score(info["file_md5"])] for info in maps[::2]}
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    decoded = []
+    decode = osutools.OsuDB._decode
+    monkeypatch.setattr(osutools.OsuDB, "_decode", lambda self, md5: decoded.append(md5) or decode(self, md5))
+    client.set_osu_folder(tmp_path, lazy=True, max_cached=5)
+    assert decoded == []
+    assert sorted(client.scores_db.score_by_map) == list(range(10, 60, 2))
+    score = client.scores_db.score_by_map[12][0]
+    assert score.map.beatmap_id == 12
+    assert len(decoded) == 1
+
+
+def test_export_lazy_osu_db(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", [db_samples.beatmap(n) for n in range(10, 13)])
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True)
+    osu_db.export(tmp_path / "osu_db.json")
+    with open(tmp_path / "osu_db.json") as f:
+        exported = json.load(f)
+    assert exported["player_name"] == "flubb 4"
+    assert exported["map_dicts"]["11"]["title"] == "Song 11"
+
+
+def test_gc_is_restored(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", [db_samples.beatmap(n) for n in range(10, 13)])
+    (tmp_path / "broken.db").write_bytes(b"\x01\x00")
+    osutools.OsuDB(client, tmp_path / "osu!.db")
+    with pytest.raises(struct.error):
+        osutools.OsuDB(client, tmp_path / "broken.db")
+    assert gc.isenabled()
+
+
+def test_overlapping_gc_pauses():
+    first, second = gc_paused(), gc_paused()
+    first.__enter__()
+    second.__enter__()
+    # the first pause ending, e.g. on another thread, doesn't turn the collector back on under the second
+    first.__exit__(None, None, None)
+    assert not gc.isenabled()
+    second.__exit__(None, None, None)
+    assert gc.isenabled()
+
+    gc.disable()
+    try:
+        with gc_paused():
+            pass
+        # a caller that had turned it off keeps it off
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+def test_snapshot_cache(tmp_path, client, monkeypatch):
+    maps = [db_samples.beatmap(n) for n in range(10, 20)]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    cache = tmp_path / "cache"
+    client.set_osu_db(tmp_path / "osu!.db", lazy=True, cache_dir=cache)
+    assert len(list(cache.iterdir())) == 1
+
+    with monkeypatch.context() as m:
+        m.setattr(osutools.db.OsuDB, "_read", lambda *args: pytest.fail("scanned instead of using the snapshot"))
+        lazy = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True, cache_dir=cache)
+    assert lazy.player_name == "flubb 4"
+    assert lazy.maps[maps[3]["file_md5"]].song_title == "Song 13"
+    assert lazy.map_dicts[13] == client.osu_db.map_dicts[13]
+
+    # a changed db is scanned again rather than read from the stale snapshot
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps[:4])
+    os.utime(tmp_path / "osu!.db", ns=(1, 1))
+    assert len(osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True, cache_dir=cache).maps) == 4
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", [db_samples.beatmap(n) for n in range(10, 20)])
+    cache = tmp_path / "cache"
+    osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True, cache_dir=cache)
+    for snapshot in cache.iterdir():
+        snapshot.write_bytes(b"not a pickle")
+    assert len(osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True, cache_dir=cache).maps) == 10
+
+
+def test_osu_folder_snapshots(tmp_path, monkeypatch):
+    maps = [db_samples.beatmap(n) for n in range(1, 6)]
+    scores = {
+        info["file_md5"]: [db_samples.score(info["file_md5"], score_value=value, mods=mods)
+                           for value, mods in enumerate([0, 72], 1000 * info["beatmap_id"])]
+        for info in maps
+    }
+    collections = {"farm": [maps[0]["file_md5"], maps[2]["file_md5"]], "empty": []}
+    db_samples.write_osu_folder(tmp_path, maps, scores, collections)
+    cache = tmp_path / "cache"
+    decoded = osutools.OsuClientV1("token")
+    with pytest.raises(ValueError):
+        decoded.set_osu_folder(tmp_path, lazy=False, cache_dir=cache)
+    decoded.set_osu_folder(tmp_path, cache_dir=cache)
+    assert decoded.osu_db.lazy
+    assert len(list(cache.iterdir())) == 3
+
+    client = osutools.OsuClientV1("token")
+    with monkeypatch.context() as m:
+        m.setattr(osutools.db.ScoresDB, "reload", lambda *args: pytest.fail("decoded instead of using the snapshot"))
+        m.setattr(osutools.db.Collections, "_read", lambda *args: pytest.fail("decoded instead of using the snapshot"))
+        client.set_osu_folder(tmp_path, lazy=True, cache_dir=cache)
+    assert client.collections_db.collections == decoded.collections_db.collections
+    assert client.collections_db.version == decoded.collections_db.version
+    restored = client.scores_db.by_time.scores
+    expected = decoded.scores_db.by_time.scores
+    assert [vars(score).keys() for score in restored] == [vars(score).keys() for score in expected]
+    assert [score.score for score in restored] == [score.score for score in expected]
+    assert all(score.client is client for score in restored)
+    assert restored[0].map.song_title == "Song 1"
+    assert sorted(client.scores_db.score_by_map) == [1, 2, 3, 4, 5]
+    assert client.scores_db.get_score_by_replay_hash(restored[-1].md5_hash) is restored[-1]
+    assert not client.scores_db.changed_on_disk()
+
+    # a changed scores.db is decoded again rather than read from the stale snapshot
+    md5 = maps[0]["file_md5"]
+    scores[md5].append(db_samples.score(md5, score_value=5000, mods=16))
+    db_samples.write_scores_db(tmp_path / "scores.db", scores)
+    os.utime(tmp_path / "scores.db", ns=(1, 1))
+    assert len(osutools.ScoresDB(client, tmp_path / "scores.db", cache).maps[md5]) == 3
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_reload_osu_db(tmp_path, client, lazy):
+    maps = [db_samples.beatmap(n) for n in range(10, 20)]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=lazy)
+    kept = osu_db.maps[maps[1]["file_md5"]]
+    edited = osu_db.maps[maps[2]["file_md5"]]
+    before = osutools.OsuDB(client, tmp_path / "osu!.db")
+    assert not osu_db.changed_on_disk()
+
+    maps = maps[1:] + [db_samples.beatmap(20)]
+    maps[1] = dict(maps[1], title="Edited", last_mod_time=datetime(2021, 1, 1, tzinfo=timezone.utc))
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    os.utime(tmp_path / "osu!.db", ns=(1, 1))
+    assert osu_db.changed_on_disk()
+    changes = osu_db.reload()
+    assert changes.added == [f"{20:032x}"]
+    assert changes.removed == [f"{10:032x}"]
+    assert changes.changed == [f"{12:032x}"]
+    assert not osu_db.changed_on_disk()
+    assert len(osu_db.maps) == 10
+    assert osu_db.number_of_beatmaps == 10
+    assert osu_db.maps[maps[0]["file_md5"]] is kept
+    assert osu_db.maps[maps[1]["file_md5"]] is not edited
+    assert osu_db.maps[maps[1]["file_md5"]].song_title == "Edited"
+    assert osu_db.map_dicts[12]["title"] == "Edited"
+    assert 10 not in osu_db.id_to_hash
+    assert osu_db.maps[osu_db.id_to_hash[20]].beatmap_id == 20
+    assert not osu_db.reload()
+
+    changes = osutools.db.diff(before, osu_db)
+    assert (changes.added, changes.removed, changes.changed) == ([f"{20:032x}"], [f"{10:032x}"], [f"{12:032x}"])
+
+
+def test_decoding_during_reload(tmp_path, client):
+    # the maps move around between the two files, so decoding with one file's offsets and the other's bytes breaks
+    for name, title in (("a.db", "A"), ("b.db", "Much longer title B")):
+        maps = [db_samples.beatmap(n, title=f"{title} {n}", last_mod_time=datetime(2020 + len(title), 1, 1,
+                                                                                  tzinfo=timezone.utc))
+                for n in range(10, 40)]
+        db_samples.write_osu_db(tmp_path / name, maps)
+    osu_db = osutools.OsuDB(client, tmp_path / "a.db", lazy=True)
+    errors = []
+    stop = threading.Event()
+
+    def decode():
+        while not stop.is_set():
+            for beatmap_id in range(10, 40):
+                try:
+                    info = osu_db.map_dicts[beatmap_id]
+                    assert info["beatmap_id"] == beatmap_id and info["title"].endswith(f" {beatmap_id}")
+                except Exception as e:
+                    errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=decode)
+    thread.start()
+    try:
+        for i in range(200):
+            osu_db.path = tmp_path / ("b.db" if i % 2 == 0 else "a.db")
+            osu_db.reload()
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+
+def test_failed_reload_changes_nothing(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", [db_samples.beatmap(n) for n in range(10, 13)])
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db")
+    (tmp_path / "osu!.db").write_bytes((tmp_path / "osu!.db").read_bytes()[:200])
+    with pytest.raises((struct.error, IndexError)):
+        osu_db.reload()
+    assert len(osu_db.maps) == 3
+    assert osu_db.changed_on_disk()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_reload_osu_db_updates_scores(tmp_path, client, lazy):
+    maps = [db_samples.beatmap(n, ranked_status=4 if n != 11 else 7) for n in range(10, 13)]
+    hashes = [info["file_md5"] for info in maps]
+    scores = {md5: [db_samples.score(md5, score_value=n)] for n, md5 in enumerate(hashes, 1)}
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    client.set_osu_folder(tmp_path, lazy=lazy)
+    scores_db = client.scores_db
+    score = scores_db.maps[hashes[1]][0]
+    assert score.map.song_title == "Song 11"
+    assert not scores_db.is_ranked(hashes[1]) and scores_db.is_ranked(hashes[2])
+
+    maps[1] = dict(maps[1], title="Edited", ranked_status=4, last_mod_time=datetime(2021, 1, 1, tzinfo=timezone.utc))
+    del maps[2]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    os.utime(tmp_path / "osu!.db", ns=(1, 1))
+    client.osu_db.reload()
+    assert score.map.song_title == "Edited"
+    assert scores_db.is_ranked(hashes[1]) and not scores_db.is_ranked(hashes[2])
+    assert sorted(scores_db.score_by_map) == [10, 11]
+
+
+def test_reload_scores_db(tmp_path, client):
+    maps = [db_samples.beatmap(n) for n in range(10, 13)]
+    hashes = [info["file_md5"] for info in maps]
+    scores = {
+        hashes[0]: [db_samples.score(hashes[0])],
+        hashes[1]: [db_samples.score(hashes[1], score_value=56, mods=8388608 | 8)],
+    }
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    client.set_osu_folder(tmp_path)
+    scores_db = client.scores_db
+    kept = scores_db.score_by_map[11][0]
+    kept.pp = 123.4
+
+    new = db_samples.score(hashes[0], username="ito", score_value=12)
+    scores[hashes[0]].append(new)
+    scores[hashes[2]] = [db_samples.score(hashes[2], score_value=34, mods=8388608)]
+    db_samples.write_scores_db(tmp_path / "scores.db", scores)
+    os.utime(tmp_path / "scores.db", ns=(1, 1))
+    changes = scores_db.reload()
+    assert sorted(changes.added) == sorted([new["replay_hash"], scores[hashes[2]][0]["replay_hash"]])
+    assert changes.removed == changes.changed == []
+    assert scores_db.score_by_map[11][0] is kept
+    assert kept.pp == 123.4
+    assert [score.username for score in scores_db.score_by_map[10]] == ["flubb 4", "ito"]
+    assert scores_db.score_by_map[12][0].mods == osutools.utils.Mods.Target
+
+
+def test_watch(tmp_path, client, monkeypatch):
+    maps = [db_samples.beatmap(n) for n in range(10, 13)]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True)
+    polls = iter(["untouched", "half written", "written"])
+
+    def sleep(seconds):
+        poll = next(polls)
+        if poll == "untouched":
+            return
+        db_samples.write_osu_db(tmp_path / "osu!.db", maps[:1])
+        if poll == "half written":
+            (tmp_path / "osu!.db").write_bytes((tmp_path / "osu!.db").read_bytes()[:60])
+        os.utime(tmp_path / "osu!.db", ns=(len(poll), len(poll)))
+
+    monkeypatch.setattr(osutools.db.time, "sleep", sleep)
+    changes = next(osu_db.watch(interval=0))
+    assert changes.removed == [f"{11:032x}", f"{12:032x}"]
+    assert list(osu_db.maps) == [f"{10:032x}"]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_secondary_indexes(tmp_path, client, lazy):
+    maps = [
+        db_samples.beatmap(n, set_id=n // 3, creator="Qiyana" if n % 2 else "someone", mode=n % 4,
+                           ranked_status=4 if n < 15 else 7, folder_name=f"{n // 3} Clairo - Sofia ")
+        for n in range(10, 20)
+    ]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=lazy)
+    if lazy:
+        # and again from the snapshot
+        osutools.OsuDB(client, tmp_path / "osu!.db", cache_dir=tmp_path / "cache")
+        osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", cache_dir=tmp_path / "cache")
+        assert osu_db.lazy
+    assert osu_db.get_map_from_id(13).beatmap_id == 13
+    assert osu_db.get_map_from_id(99) is None
+    mapset = osu_db.get_mapset(4)
+    assert [local_map.beatmap_id for local_map in mapset.maps] == [12, 13, 14]
+    assert mapset.song_title == "Song 12"
+    assert len(mapset) == 3
+    assert osu_db.get_mapset(99) is None
+    assert [m.mapset_id for m in osu_db.mapsets()] == [3, 4, 5, 6]
+    assert [m.beatmap_id for m in osu_db.get_maps_by_creator("QIYANA")] == [11, 13, 15, 17, 19]
+    assert [m.beatmap_id for m in osu_db.get_maps_by_mode(osutools.utils.Mode.TAIKO)] == [13, 17]
+    assert [m.beatmap_id for m in osu_db.get_maps_by_approval(osutools.utils.Approval.LOVED)] == [15, 16, 17, 18, 19]
+    assert [m.beatmap_id for m in osu_db.get_maps_in_folder("5 Clairo - Sofia")] == [15, 16, 17]
+
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps[3:] + [db_samples.beatmap(20, set_id=4, mode=1)])
+    os.utime(tmp_path / "osu!.db", ns=(1, 1))
+    osu_db.reload()
+    assert [local_map.beatmap_id for local_map in osu_db.get_mapset(4).maps] == [13, 14, 20]
+    assert osu_db.get_mapset(3) is None
+    assert [m.beatmap_id for m in osu_db.get_maps_by_mode(osutools.utils.Mode.TAIKO)] == [13, 17, 20]
+
+
+def test_score_indexes(tmp_path, client):
+    maps = [db_samples.beatmap(n, ranked_status=4 if n != 11 else 7) for n in range(10, 13)]
+    hashes = [info["file_md5"] for info in maps]
+
+    def played(day, **kwargs):
+        return db_samples.score(timestamp=datetime(2020, 1, day, tzinfo=timezone.utc), score_value=day * 1000, **kwargs)
+
+    scores = {
+        hashes[0]: [played(5, map_hash=hashes[0]), played(1, map_hash=hashes[0], username="ito", online_id=0)],
+        hashes[1]: [played(2, map_hash=hashes[1])],
+        hashes[2]: [played(9, map_hash=hashes[2], online_id=77), played(3, map_hash=hashes[2], username="ito")],
+        "0" * 32: [played(4, map_hash="0" * 32)],
+    }
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    client.set_osu_folder(tmp_path)
+    scores_db = client.scores_db
+    assert len(scores_db.by_time) == 6
+    assert [score.score for score in scores_db.by_user["ito"].scores] == [1000, 3000]
+
+    def summary(by_map):
+        return {md5[-2:]: [score.score for score in found] for md5, found in by_map.items()}
+
+    before = datetime(2020, 1, 5, tzinfo=timezone.utc)
+    assert summary(scores_db.get_scores_before(before)) == {"0a": [1000], "0b": [2000], "0c": [3000], "00": [4000]}
+    assert summary(scores_db.get_scores_before(before, names=["flubb 4", "ito"], ranked_only=True)) == {
+        "0a": [1000],
+        "0c": [3000],
+    }
+    assert summary(scores_db.get_scores_between(before, names=["flubb 4", "nobody"])) == {"0a": [5000], "0c": [9000]}
+    # scores of a map stay in scores.db order
+    assert summary(scores_db.get_scores_between(names=["ito", "flubb 4"]))["0a"] == [5000, 1000]
+    assert scores_db.get_score_by_online_id(77).score == 9000
+    assert scores_db.get_score_by_online_id(0) is None
+    replay_hash = scores[hashes[1]][0]["replay_hash"]
+    assert scores_db.get_score_by_replay_hash(replay_hash).score == 2000
+    assert scores_db.is_ranked(hashes[0]) and not scores_db.is_ranked(hashes[1]) and not scores_db.is_ranked("0" * 32)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import osutools
+from osutools.filecache import OsuFileCache
+from osutools.map import Map
+from osutools.oppai import Oppai
+from osutools.utils import Mods
+
+from . import api_samples, db_samples
+
+
+@pytest.fixture
+def server():
+    """A stand-in for osu.ppy.sh/osu/{id}, serving synthetic .osu files and counting the downloads."""
+    files = {}
+    downloads = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            beatmap_id = int(self.path.rsplit("/", 1)[1])
+            downloads.append(beatmap_id)
+            if beatmap_id not in files:
+                self.send_error(404)
+                return
+            body = files[beatmap_id].encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    httpd.files = files
+    httpd.downloads = downloads
+    httpd.url = lambda beatmap_id: f"http://127.0.0.1:{httpd.server_port}/osu/{beatmap_id}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def md5(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def test_fetch(tmp_path, server):
+    server.files[1] = db_samples.osu_file(seed=1)
+    cache = OsuFileCache(tmp_path)
+    path = cache.fetch(1, md5(server.files[1]), server.url(1))
+    assert path == cache.path(1, md5(server.files[1]))
+    assert path.read_text() == server.files[1]
+    assert cache.fetch(1, md5(server.files[1]), server.url(1)) == path
+    assert server.downloads == [1]
+
+    # the map was updated, so the old version is replaced
+    server.files[1] = db_samples.osu_file(seed=1, approach_rate=8)
+    new_path = cache.fetch(1, md5(server.files[1]), server.url(1))
+    assert server.downloads == [1, 1]
+    assert not path.exists() and new_path.exists() and len(cache) == 1
+
+    # still there after a restart
+    assert OsuFileCache(tmp_path).get(1, md5(server.files[1])) == new_path
+
+
+def test_eviction(tmp_path):
+    data = {i: db_samples.osu_file(objects=20, seed=i).encode() for i in range(4)}
+    size = max(len(contents) for contents in data.values())
+    cache = OsuFileCache(tmp_path, max_bytes=size * 2)
+    for i in range(3):
+        cache.put(i, data[i])
+    assert (0, hashlib.md5(data[0]).hexdigest()) not in cache
+    assert cache.get(1, hashlib.md5(data[1]).hexdigest()) is not None
+    cache.put(3, data[3])
+    assert (1, hashlib.md5(data[1]).hexdigest()) in cache
+    assert (2, hashlib.md5(data[2]).hexdigest()) not in cache
+    assert len(cache) == 2 and cache.size <= size * 2
+    assert sorted(os.listdir(tmp_path)) == sorted(cache.path(*key).name for key in cache._files)
+    cache.clear()
+    assert len(cache) == 0 and os.listdir(tmp_path) == []
+
+
+def test_calculate_pp_from_data(tmp_path):
+    filename = db_samples.write_osu_file(tmp_path / "map.osu")
+    data = filename.read_bytes()
+    for inputs in [{}, {"mods": 72, "misses": 2, "accuracy": 97.0}, {"mods": 16, "num_100": 20, "num_50": 2}]:
+        with Oppai.handle(filename) as handle:
+            assert Oppai.calculate_pp_from_data(data, **inputs) == handle.calculate(**inputs)
+    with pytest.raises(ValueError):
+        Oppai.calculate_pp_from_data(b"not a beatmap")
+
+
+def test_map_get_pp(tmp_path, server):
+    server.files[2788620] = db_samples.osu_file(seed=5)
+    client = osutools.OsuClientV1("token")
+    beatmap = Map({**api_samples.beatmap(), "file_md5": md5(server.files[2788620])}, client)
+    beatmap.download_url = server.url(2788620)
+    uncached = beatmap.get_pp(mods=Mods.HD)
+    assert server.downloads == [2788620]
+
+    client.set_osu_file_cache(tmp_path / "osu files")
+    assert [beatmap.get_pp(mods=Mods.HD) for _ in range(20)] == [uncached] * 20
+    assert server.downloads == [2788620, 2788620]
@@ -0,0 +1,92 @@
+import math
+from datetime import datetime, timezone
+
+import pytest
+
+import osutools
+
+from . import db_samples
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def client():
+    return osutools.OsuClientV1("token")
+
+
+def sample_maps():
+    return [
+        db_samples.beatmap(
+            n,
+            diff_approach=n % 10,
+            total_length=1000 * (n % 7),
+            mode=n % 4,
+            ranked_status=4 if n % 2 else 2,
+            star_ratings=[(64, n / 2), (0, n / 10)],
+            last_played=db_samples.to_ticks(datetime(2021, 1, n % 28 + 1, tzinfo=timezone.utc)) if n % 3 else 0,
+        )
+        for n in range(10, 50)
+    ]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_columns(tmp_path, client, lazy):
+    db_samples.write_osu_db(tmp_path / "osu!.db", sample_maps())
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=lazy)
+    table = osu_db.table()
+    assert len(table) == 40
+    assert table is osu_db.table()
+    assert list(table.md5) == list(osu_db.maps)
+    assert table["beatmap_id"].tolist() == list(range(10, 50))
+    assert table["mode"][3] == osutools.utils.Mode.TAIKO.value
+    assert table["approval"][1] == osutools.utils.Approval.RANKED.value
+    assert table["approval"][0] == osutools.utils.Approval.GRAVEYARD.value
+    assert table["star_rating"][5] == pytest.approx(1.5)
+    assert table["total_objects"][0] == 351
+    assert table["length"].mean() == pytest.approx(sum(m.length for m in osu_db.map_list()) / 40)
+    assert table["last_played"][1] == np.datetime64("2021-01-12")
+    assert np.isnat(table["last_played"][2])
+    assert table["last_mod_time"][0] == np.datetime64("2020-01-02T03:04:05.678901")
+
+
+def test_lazy_and_eager_match(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", sample_maps())
+    eager = osutools.OsuDB(client, tmp_path / "osu!.db").table()
+    lazy = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True).table()
+    for name, column in eager.columns.items():
+        assert column.dtype == lazy[name].dtype
+        np.testing.assert_array_equal(column, lazy[name])
+
+
+def test_filter_sort_and_map_back(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", sample_maps())
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db")
+    table = osu_db.table()
+    hard = table[(table["approach_rate"] >= 8) & (table["mode"] == 0)]
+    assert hard["beatmap_id"].tolist() == [28, 48]
+    longest = table.sort("length", descending=True)
+    assert longest["length"][0] == 6000
+    assert longest["beatmap_id"][:2].tolist() == [13, 20]  # ties keep their order
+    assert table.sort("length")["beatmap_id"][:2].tolist() == [14, 21]
+    assert longest.map(0) is osu_db.maps[f"{13:032x}"]
+    assert [local_map.beatmap_id for local_map in hard.maps()] == [28, 48]
+    recent = table.sort("last_played", descending=True)
+    assert np.isnat(recent["last_played"][-1])
+    assert not np.isnat(recent["last_played"][0])
+
+
+def test_old_db_has_no_star_ratings(tmp_path, client):
+    db_samples.write_osu_db(tmp_path / "osu!.db", sample_maps()[:3], version=db_samples.OLD_VERSION)
+    table = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=True).table()
+    assert all(math.isnan(stars) for stars in table["star_rating"])
+
+
+def test_reload_rebuilds_table(tmp_path, client):
+    maps = sample_maps()
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db")
+    assert len(osu_db.table()) == 40
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps[:5])
+    osu_db.reload()
+    assert len(osu_db.table()) == 5
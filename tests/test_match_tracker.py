@@ -0,0 +1,74 @@
+import asyncio
+
+import osutools
+from osutools.match import MatchEventType, MatchTracker
+from osutools.transport import LocalTransport, ThreadedTransport
+
+from . import api_samples
+
+
+class LiveMatch:
+    def __init__(self):
+        self.games = []
+        self.end_time = None
+
+    def start_game(self, game_id):
+        self.games.append(api_samples.game(game_id, end_time=None))
+
+    def finish_game(self):
+        self.games[-1] = dict(self.games[-1], end_time="2021-02-13 18:10:40")
+
+    def __call__(self, endpoint, params):
+        return api_samples.match(games=self.games, end_time=self.end_time)
+
+
+def event_types(events):
+    return [(event.type, event.game.game_id if event.game else None) for event in events]
+
+
+def test_events_and_game_reuse():
+    live = LiveMatch()
+    tracker = MatchTracker(osutools.OsuClientV1("token", transport=LocalTransport(live)), 77890000)
+    assert tracker.update() == []
+    live.start_game(1)
+    assert event_types(tracker.update()) == [(MatchEventType.GAME_STARTED, 1)]
+    live.finish_game()
+    events = tracker.update()
+    assert event_types(events) == [(MatchEventType.GAME_FINISHED, 1)]
+    first_game = events[0].game
+    assert len(first_game.scores) == 2
+    live.start_game(2)
+    assert event_types(tracker.update()) == [(MatchEventType.GAME_STARTED, 2)]
+    assert tracker.match.games[0] is first_game
+    assert tracker.update() == []
+    live.finish_game()
+    live.end_time = "2021-02-13 19:00:00"
+    assert event_types(tracker.update()) == [(MatchEventType.GAME_FINISHED, 2), (MatchEventType.MATCH_ENDED, None)]
+    assert tracker.ended
+    assert tracker.match.name == "OWC: (Team A) vs (Team B)"
+
+
+def test_first_poll_of_finished_games():
+    live = LiveMatch()
+    live.start_game(1)
+    live.finish_game()
+    tracker = MatchTracker(osutools.OsuClientV1("token", transport=LocalTransport(live)), 77890000)
+    assert event_types(tracker.update()) == [(MatchEventType.GAME_STARTED, 1), (MatchEventType.GAME_FINISHED, 1)]
+
+
+def test_async_iteration_stops_when_match_ends():
+    live = LiveMatch()
+    live.start_game(1)
+    live.finish_game()
+    live.end_time = "2021-02-13 19:00:00"
+    client = osutools.AsyncOsuClientV1("token", transport=ThreadedTransport(LocalTransport(live)))
+
+    async def collect():
+        return [event async for event in MatchTracker(client, 77890000, interval=0)]
+
+    loop = asyncio.new_event_loop()
+    try:
+        events = loop.run_until_complete(collect())
+    finally:
+        loop.close()
+    assert [event.type for event in events][-1] == MatchEventType.MATCH_ENDED
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import osutools
+from osutools.cache import ResponseCache
+from osutools.mirror import BeatmapMirror
+from osutools.transport import LocalTransport, ThreadedTransport
+
+from . import api_samples
+
+
+def make_pool(sets, start=datetime(2010, 1, 1)):
+    pool = []
+    for set_id in range(1, sets + 1):
+        approved_date = (start + timedelta(hours=set_id)).strftime("%Y-%m-%d %H:%M:%S")
+        for diff in range(7):
+            pool.append(api_samples.beatmap(beatmap_id=set_id * 10 + diff, beatmapset_id=set_id, approved_date=approved_date))
+    return pool
+
+
+class PoolHandler:
+    """Mimics get_beatmaps' since/limit paging over a fake pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __call__(self, endpoint, params):
+        maps = sorted(self.pool, key=lambda m: (m["approved_date"], int(m["beatmap_id"])))
+        if "since" in params:
+            maps = [m for m in maps if m["approved_date"] > params["since"]]
+        return maps[: int(params["limit"])]
+
+
+def test_full_then_incremental_sync(tmp_path):
+    handler = PoolHandler(make_pool(150))
+    transport = LocalTransport(handler)
+    client = osutools.OsuClientV1("token", transport=transport)
+    mirror = BeatmapMirror(client, tmp_path / "maps.sqlite")
+    mirror.sync()
+    assert len(mirror) == 1050
+    assert mirror.get_map(1203).beatmap_id == 1203
+    assert [m.beatmap_id for m in mirror.get_mapset(7)] == list(range(70, 77))
+    assert mirror.cursor == datetime(2010, 1, 1) + timedelta(hours=150)
+
+    calls = transport.calls
+    handler.pool = make_pool(160)
+    mirror.sync()
+    assert len(mirror) == 1120
+    # only the new maps (plus the overlap second) are requested
+    assert transport.calls == calls + 1
+
+
+def test_resume_from_checkpoint(tmp_path):
+    handler = PoolHandler(make_pool(150))
+    client = osutools.OsuClientV1("token", transport=LocalTransport(handler))
+    path = tmp_path / "maps.sqlite"
+    BeatmapMirror(client, path).sync(max_pages=1)
+    mirror = BeatmapMirror(client, path)
+    assert 0 < len(mirror) < 1050
+    mirror.sync()
+    assert len(mirror) == 1050
+    assert [m.beatmap_id for m in mirror.iter_maps()][:3] == [10, 11, 12]
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_sync_skips_response_cache(tmp_path, asynchronous):
+    handler = PoolHandler(make_pool(150))
+    if asynchronous:
+        client = osutools.AsyncOsuClientV1("token", transport=ThreadedTransport(LocalTransport(handler)),
+                                           cache=ResponseCache())
+    else:
+        client = osutools.OsuClientV1("token", transport=LocalTransport(handler), cache=ResponseCache())
+    mirror = BeatmapMirror(client, tmp_path / "maps.sqlite")
+    loop = asyncio.new_event_loop()
+
+    def sync():
+        return loop.run_until_complete(mirror.sync_async()) if asynchronous else mirror.sync()
+
+    try:
+        sync()
+        # nothing new, which a cache would keep answering with for the same cursor
+        assert sync() == 0
+        handler.pool = make_pool(160)
+        assert sync() >= 70
+    finally:
+        loop.close()
+    assert len(mirror) == 1120
+
+
+def test_sync_async(tmp_path):
+    transport = ThreadedTransport(LocalTransport(PoolHandler(make_pool(150))))
+    client = osutools.AsyncOsuClientV1("token", transport=transport)
+    mirror = BeatmapMirror(client, tmp_path / "maps.sqlite")
+    with pytest.raises(TypeError):
+        mirror.sync()
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(mirror.sync_async()) >= 1050
+    finally:
+        loop.close()
+    assert len(mirror) == 1050
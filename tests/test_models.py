@@ -0,0 +1,58 @@
+import osutools
+from osutools.match import Match
+from osutools.map import Map
+from osutools.score import Score, RecentScore
+from osutools.user import User
+from osutools.transport import LocalTransport
+
+from . import api_samples
+
+
+def public_attributes(model):
+    return {name: getattr(model, name) for name in type(model)._fields}
+
+
+def same_fields(eager, lazy):
+    for name, value in public_attributes(eager).items():
+        lazy_value = getattr(lazy, name)
+        if isinstance(value, list) and value and hasattr(value[0], "_fields"):
+            for a, b in zip(value, lazy_value):
+                same_fields(a, b)
+        elif name == "playtime":
+            assert value.seconds == lazy_value.seconds
+        else:
+            assert value == lazy_value, name
+
+
+def test_lazy_models_match_eager():
+    match_info = api_samples.match(games=[api_samples.game(1), api_samples.game(2, players=4)])
+    for model, args in (
+        (Map, (api_samples.beatmap(), None)),
+        (User, (api_samples.user(), None)),
+        (Score, (api_samples.score(), None, 2788620)),
+        (RecentScore, (api_samples.recent_score(), None, 2788620)),
+        (Match, (match_info, None)),
+    ):
+        same_fields(model(*args), model(*args, lazy=True))
+
+
+def test_lazy_fields_convert_on_first_read():
+    beatmap = Map(api_samples.beatmap(), None, lazy=True)
+    assert "star_rating" not in beatmap.__dict__
+    assert beatmap.star_rating == 4.90187
+    assert beatmap.__dict__["star_rating"] == 4.90187
+    assert "date_submitted" not in beatmap.__dict__
+
+
+def test_unknown_attribute_still_raises():
+    beatmap = Map(api_samples.beatmap(), None, lazy=True)
+    assert not hasattr(beatmap, "nonsense")
+
+
+def test_client_lazy_models():
+    transport = LocalTransport(lambda endpoint, params: [api_samples.beatmap(beatmap_id=n) for n in range(500)])
+    client = osutools.OsuClientV1("token", transport=transport, lazy_models=True)
+    maps = client.fetch_maps()
+    assert len(maps) == 500
+    assert maps[123].beatmap_id == 123
+    assert maps[123].total_objects == 380
@@ -0,0 +1,144 @@
+import os
+import random
+
+import pytest
+
+from osutools.oppai import HandlePool, Oppai, OppaiHandle
+
+from . import db_samples
+
+
+def fresh_pp(filename, mods=0, max_combo=None, misses=None, num_100=None, num_50=None, accuracy=None):
+    """pp from a brand new ezpp handle that parses the map for this one play, the way calculate_pp used to work."""
+    dll = Oppai.dll
+    ez = dll.ezpp_new()
+    try:
+        dll.ezpp_set_mods(ez, mods)
+        dll.ezpp_set_combo(ez, -1 if max_combo is None else max_combo)
+        dll.ezpp_set_nmiss(ez, misses or 0)
+        if accuracy is not None:
+            dll.ezpp_set_accuracy_percent(ez, accuracy)
+        elif num_100 is not None and num_50 is not None:
+            dll.ezpp_set_accuracy(ez, num_100, num_50)
+        assert dll.ezpp_dup(ez, str(filename).encode()) >= 0
+        return dll.ezpp_pp(ez)
+    finally:
+        dll.ezpp_free(ez)
+
+
+def random_inputs(rng):
+    inputs = {"mods": rng.choice([0, 8, 16, 64, 72, 2, 24, 12, 20]), "misses": rng.choice([None, 0, 1, 5])}
+    inputs["max_combo"] = rng.choice([None, 50, 200, 350])
+    if rng.random() < 0.5:
+        inputs["accuracy"] = rng.uniform(85, 100)
+    else:
+        inputs["num_100"], inputs["num_50"] = rng.randrange(30), rng.randrange(5)
+    return inputs
+
+
+def test_reused_handle_matches_fresh_handles(tmp_path):
+    filename = db_samples.write_osu_file(tmp_path / "map.osu")
+    rng = random.Random(4)
+    with Oppai.handle(filename) as handle:
+        for _ in range(100):
+            inputs = random_inputs(rng)
+            assert handle.calculate(**inputs) == fresh_pp(filename, **inputs)
+    assert handle.closed
+    with pytest.raises(ValueError):
+        handle.calculate()
+
+
+def test_map_parsed_once(tmp_path):
+    filename = db_samples.write_osu_file(tmp_path / "map.osu", objects=100)
+    inputs = [{"mods": 8}, {"mods": 8, "max_combo": 50}, {"mods": 8, "accuracy": 93.5},
+              {"mods": 0, "num_100": 12, "num_50": 3}, {"mods": 8, "max_combo": 120, "accuracy": 97.0}]
+    expected = [fresh_pp(filename, **play) for play in inputs]
+    with OppaiHandle(filename) as handle:
+        assert handle.calculate(**inputs[0]) == expected[0]
+        # garbage with the same size and mtime, which oppai would fail to parse if it read the file again
+        stat = os.stat(filename)
+        filename.write_bytes(b"\0" * stat.st_size)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert [handle.calculate(**play) for play in inputs[1:]] == expected[1:]
+
+
+def test_results_forgotten_when_file_changes(tmp_path):
+    filename = db_samples.write_osu_file(tmp_path / "map.osu", approach_rate=9)
+    with OppaiHandle(filename) as handle:
+        before = handle.calculate(mods=8)
+        assert handle.calculate(mods=8) == before
+        db_samples.write_osu_file(filename, approach_rate=7)
+        os.utime(filename, ns=(1, 1))
+        assert handle.calculate(mods=8) == fresh_pp(filename, mods=8) != before
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError):
+        Oppai.calculate_pp(tmp_path / "missing.osu")
+    with OppaiHandle(tmp_path / "missing.osu") as handle:
+        with pytest.raises(ValueError):
+            handle.calculate()
+
+
+def test_pool(tmp_path):
+    files = [db_samples.write_osu_file(tmp_path / f"{i}.osu", seed=i) for i in range(3)]
+    pool = HandlePool(max_handles=2)
+    first = pool.get(files[0])
+    assert pool.get(str(files[0])) is first
+    second = pool.get(files[1])
+    pool.get(files[0])
+    third = pool.get(files[2])
+    assert len(pool) == 2
+    assert second.closed and not first.closed and not third.closed
+    assert files[1] not in pool and files[0] in pool
+    pool.clear()
+    assert first.closed and third.closed and len(pool) == 0
+
+
+def test_calculate_pp_uses_pool(tmp_path):
+    filename = db_samples.write_osu_file(tmp_path / "map.osu")
+    pp = Oppai.calculate_pp(filename, mods=16, max_combo=200, num_100=10, num_50=1)
+    assert filename in Oppai.handles
+    assert pp == fresh_pp(filename, mods=16, max_combo=200, num_100=10, num_50=1)
+    assert Oppai.calculate_pp(filename) == fresh_pp(filename)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_calculate_many(tmp_path, workers):
+    files = [db_samples.write_osu_file(tmp_path / f"{i}.osu", objects=100, seed=i) for i in range(5)]
+    rng = random.Random(9)
+    requests = [(rng.choice(files), random_inputs(rng)) for _ in range(120)]
+    requests.append((tmp_path / "missing.osu", {}))
+    arrived = {}
+    results = Oppai.calculate_many(requests, workers, on_result=arrived.__setitem__)
+    assert results[:-1] == [fresh_pp(filename, **inputs) for filename, inputs in requests[:-1]]
+    assert results[-1] is None
+    assert arrived == dict(enumerate(results[:-1]))
+    assert Oppai.calculate_many([], workers) == []
+
+
+def test_load_pp(tmp_path):
+    import osutools
+
+    maps = [db_samples.beatmap(n) for n in range(1, 5)]
+    for info in maps[:3]:
+        (tmp_path / "Songs" / info["folder_name"]).mkdir(parents=True)
+        db_samples.write_osu_file(tmp_path / "Songs" / info["folder_name"] / info["filename"], seed=info["beatmap_id"])
+    scores = {
+        info["file_md5"]: [
+            db_samples.score(info["file_md5"], score_value=value, mods=mods, counts=(180, 15, 2, 0, 0, misses),
+                             maxcombo=combo)
+            for value, (mods, misses, combo) in enumerate([(0, 0, 300), (8, 2, 120), (72, 1, 200), (16, 0, 90)], 1000)
+        ]
+        for info in maps
+    }
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    expected = osutools.OsuClientV1("token")
+    expected.set_osu_folder(tmp_path)
+    expected.scores_db.load_pp()
+    client = osutools.OsuClientV1("token")
+    client.set_osu_folder(tmp_path)
+    client.scores_db.load_pp(workers=3)
+    pps = [[score.pp for score in client.scores_db.maps[info["file_md5"]]] for info in maps]
+    assert pps == [[score.pp for score in expected.scores_db.maps[info["file_md5"]]] for info in maps]
+    assert all(pp > 0 for pp in pps[0]) and pps[3] == [None] * 4
@@ -0,0 +1,87 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import osutools
+from osutools.pphistory import PPHistory
+
+from . import db_samples
+
+
+class FakeScore:
+    def __init__(self, map_hash, pp, timestamp):
+        self.map_hash = map_hash
+        self.pp = pp
+        self.timestamp = timestamp
+
+
+def brute_force(scores, limit=100):
+    best = {}
+    for score in scores:
+        best[score.map_hash] = max(best.get(score.map_hash, 0), score.pp)
+    top = sorted(best.values(), reverse=True)[:limit]
+    return sum(pp * 0.95 ** i for i, pp in enumerate(top))
+
+
+def test_matches_recalculating_every_time():
+    rng = random.Random(7)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    scores = [
+        FakeScore(f"map{rng.randrange(60)}", rng.uniform(10, 400), start + timedelta(hours=i)) for i in range(400)
+    ]
+    history = PPHistory(limit=25)
+    for i, score in enumerate(scores):
+        history.add(score)
+        assert history.total == pytest.approx(brute_force(scores[: i + 1], 25))
+        if i % 37 == 0:
+            extra = FakeScore(f"map{rng.randrange(70)}", rng.uniform(10, 400), None)
+            assert history.what_if(extra.pp, extra.map_hash) == pytest.approx(
+                brute_force(scores[: i + 1] + [extra], 25)
+            )
+    assert len(history.top) == 25
+    assert [score.pp for score in history.top] == sorted((score.pp for score in history.top), reverse=True)
+    for timestamp, total in history.series:
+        assert history.total_at(timestamp) == total
+    assert history.total_at(start - timedelta(days=1)) == 0
+    assert history.total_at(scores[200].timestamp) == pytest.approx(brute_force(scores[:201], 25))
+
+
+def test_what_if():
+    history = PPHistory(limit=3)
+    for i, pp in enumerate([300, 200, 100]):
+        history.add(FakeScore(f"map{i}", pp, None))
+    assert history.total == pytest.approx(300 + 200 * 0.95 + 100 * 0.95 ** 2)
+    assert history.what_if(250) == pytest.approx(300 + 250 * 0.95 + 200 * 0.95 ** 2)
+    assert history.what_if(50) == history.total
+    assert history.what_if(150, "map0") == history.total
+    assert history.what_if(350, "map1") == pytest.approx(350 + 300 * 0.95 + 100 * 0.95 ** 2)
+
+
+def test_from_scores_db(tmp_path):
+    client = osutools.OsuClientV1("token")
+    maps = [db_samples.beatmap(n, ranked_status=4 if n != 12 else 7) for n in range(10, 13)]
+    hashes = [info["file_md5"] for info in maps]
+
+    def played(md5, day, username="flubb 4"):
+        return db_samples.score(md5, username=username, score_value=day,
+                                timestamp=datetime(2020, 1, day, tzinfo=timezone.utc))
+
+    scores = {
+        hashes[0]: [played(hashes[0], 1), played(hashes[0], 4, "ito")],
+        hashes[1]: [played(hashes[1], 2), played(hashes[1], 5, "someone else")],
+        hashes[2]: [played(hashes[2], 3)],
+    }
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    client.set_osu_folder(tmp_path)
+    for score in client.scores_db.by_time.scores:
+        score.pp = score.score * 100.0
+
+    history = client.scores_db.pp_history(names=["flubb 4", "ito"])
+    assert history.series == [
+        (datetime(2020, 1, 1, tzinfo=timezone.utc), 100),
+        (datetime(2020, 1, 2, tzinfo=timezone.utc), pytest.approx(200 + 100 * 0.95)),
+        (datetime(2020, 1, 4, tzinfo=timezone.utc), pytest.approx(400 + 200 * 0.95)),
+    ]
+    assert len(client.scores_db.pp_history().series) == 2
+    assert len(PPHistory.from_scores_db(client.scores_db, ranked_only=False).series) == 5
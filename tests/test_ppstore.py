@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import osutools
+from osutools.oppai import Oppai
+from osutools.ppstore import PPStore
+
+from . import db_samples
+
+
+def test_store(tmp_path):
+    inputs = {"mods": 72, "max_combo": 300, "misses": 1, "num_100": 10, "num_50": 0}
+    with PPStore(tmp_path / "pp.sqlite") as store:
+        assert store.version == Oppai.version()
+        assert store.get("a" * 32, inputs) is None
+        store.put("a" * 32, inputs, 123.5)
+        store.put("a" * 32, {"mods": 0}, 50.0)
+        store.put("b" * 32, {"mods": 0, "accuracy": 99.5}, 60.0)
+        assert store.get("a" * 32, inputs) == 123.5
+        assert store.get("a" * 32, {**inputs, "misses": 2}) is None
+        assert store.get("b" * 32, {"mods": 0, "accuracy": 99.5}) == 60.0
+        assert store.get_many(["a" * 32]) == {
+            PPStore.key("a" * 32, inputs): 123.5,
+            PPStore.key("a" * 32, {"mods": 0}): 50.0,
+        }
+    with PPStore(tmp_path / "pp.sqlite", version="0.0.1") as store:
+        assert store.get("a" * 32, inputs) is None
+        store.put("a" * 32, inputs, 1.0)
+        assert store.prune() == 3
+    with PPStore(tmp_path / "pp.sqlite", version="0.0.1") as store:
+        assert len(store) == 1
+
+
+@pytest.fixture
+def osu_folder(tmp_path):
+    maps = [db_samples.beatmap(n) for n in range(1, 4)]
+    for info in maps:
+        (tmp_path / "Songs" / info["folder_name"]).mkdir(parents=True)
+        db_samples.write_osu_file(tmp_path / "Songs" / info["folder_name"] / info["filename"], seed=info["beatmap_id"])
+    scores = {
+        info["file_md5"]: [db_samples.score(info["file_md5"], score_value=value, mods=mods)
+                           for value, mods in enumerate([0, 8, 72], 1000)]
+        for info in maps
+    }
+    db_samples.write_osu_folder(tmp_path, maps, scores, {})
+    return tmp_path, maps, scores
+
+
+def load(folder, store_path):
+    client = osutools.OsuClientV1("token")
+    client.set_osu_folder(folder)
+    client.set_pp_store(store_path)
+    return client
+
+
+def test_load_pp_only_calculates_new_scores(osu_folder, tmp_path, monkeypatch):
+    folder, maps, scores = osu_folder
+    calculated = []
+    calculate_many = Oppai.calculate_many
+
+    def counting(requests, *args, **kwargs):
+        requests = list(requests)
+        calculated.append(len(requests))
+        return calculate_many(requests, *args, **kwargs)
+
+    monkeypatch.setattr(Oppai, "calculate_many", counting)
+    first = load(folder, tmp_path / "pp.sqlite")
+    first.scores_db.load_pp()
+    expected = [score.pp for score in first.scores_db.by_time.scores]
+    assert calculated == [9] and len(first.pp_store) == 9
+
+    second = load(folder, tmp_path / "pp.sqlite")
+    second.scores_db.load_pp(workers=2)
+    assert [score.pp for score in second.scores_db.by_time.scores] == expected
+    assert calculated == [9, 0]
+
+    md5 = maps[0]["file_md5"]
+    scores[md5].append(db_samples.score(md5, score_value=2000, mods=16))
+    db_samples.write_scores_db(folder / "scores.db", scores)
+    os.utime(folder / "scores.db", ns=(1, 1))
+    third = load(folder, tmp_path / "pp.sqlite")
+    third.scores_db.load_pp()
+    assert calculated == [9, 0, 1]
+    assert third.scores_db.get_score_by_replay_hash(f"{md5[:16]}{2000:016x}").pp > 0
+
+
+def test_get_pp_uses_store(osu_folder, tmp_path):
+    folder, maps, _ = osu_folder
+    client = load(folder, tmp_path / "pp.sqlite")
+    score = client.scores_db.maps[maps[1]["file_md5"]][0]
+    pp = score.get_pp()
+    assert len(client.pp_store) == 1
+    local_map = client.get_local_map(score.map_hash)
+    client.pp_store.put(score.map_hash, local_map.pp_request(score)[1], pp + 1)
+    assert local_map.get_pp(score) == pp + 1
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import osutools
+from osutools.query import Query, parse_query
+
+from . import db_samples
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def osu_db(tmp_path):
+    now = datetime.now(timezone.utc)
+    maps = [
+        db_samples.beatmap(1, title="Sofia", artist="Clairo", creator="Qiyana", diff_approach=9.3,
+                           star_ratings=[(0, 5.6)], total_length=95000, ranked_status=4,
+                           last_played=db_samples.to_ticks(now - timedelta(days=2))),
+        db_samples.beatmap(2, title="Sofia", artist="Clairo", creator="Someone Else", diff_approach=8.0,
+                           star_ratings=[(0, 3.2)], total_length=95000, ranked_status=7),
+        db_samples.beatmap(3, title="Uso no Hibana", artist="96neko", creator="qiyana", diff_approach=9.7,
+                           star_ratings=[(0, 6.1)], total_length=200000, ranked_status=4, mode=1,
+                           last_played=db_samples.to_ticks(now - timedelta(days=60))),
+        db_samples.beatmap(4, title="Harumachi Clover", artist="Hanatan", creator="Qiyana", diff_approach=9.0,
+                           star_ratings=[(0, 5.5)], total_length=110000, ranked_status=5, tags="swing arrangement"),
+    ]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    return osutools.OsuDB(osutools.OsuClientV1("token"), tmp_path / "osu!.db")
+
+
+def ids(table):
+    return table["beatmap_id"].tolist()
+
+
+def test_parse():
+    query = Query('AR>9 stars>=5.5 length<120 mode=osu status=ranked creator="Some One" "title words" hard ar>x')
+    assert [repr(f) for f in query.filters] == [
+        "approach_rate>9.0",
+        "star_rating>=5.5",
+        "length<120000.0",
+        "mode=0",
+        "approval=1",
+        "creator_name=some one",
+    ]
+    assert query.words == ["title words", "hard", "ar>x"]
+    assert parse_query("ar>9") is parse_query("ar>9")
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("ar>9 stars>=5.5 length<120 mode=osu status=ranked creator=qiyana", [1]),
+        ("creator=QIYANA", [1, 3, 4]),
+        ("creator!=qiyana", [2]),
+        ("sofia", [1, 2]),
+        ('"uso no"', [3]),
+        ("clairo sofia ar<9", [2]),
+        ("ar=9", [4]),
+        ("mode=taiko", [3]),
+        ("status=loved", [2]),
+        ("status>=ranked length>=100", [3, 4]),
+        ("swing", [4]),
+        ("played<30", [1]),
+        ("played>30", [2, 3, 4]),
+        ("id=3", [3]),
+        ("id=99", []),
+        ("nothing matches this", []),
+        ("", [1, 2, 3, 4]),
+    ],
+)
+def test_search(osu_db, text, expected):
+    assert ids(osu_db.search(text)) == expected
+
+
+def test_sort(osu_db):
+    assert ids(osu_db.search("creator=qiyana", sort="stars", descending=True)) == [3, 1, 4]
+    assert ids(osu_db.search("", sort="length")) == [1, 2, 4, 3]
+    assert osu_db.search("uso").map(0).song_title == "Uso no Hibana"
+
+
+def test_index(osu_db):
+    index = osu_db.table().index("creator_name")
+    assert index["qiyana"].tolist() == [0, 2, 3]
+    assert index["someone else"].tolist() == [1]
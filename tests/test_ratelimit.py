@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import osutools
+from osutools.exceptions import RateLimitException
+from osutools.ratelimit import Priority, RequestScheduler, TokenBucket, lane
+from osutools.transport import LocalTransport
+
+from . import api_samples
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    start = time.monotonic()
+    assert bucket.take(now=start) == 0
+    assert bucket.take(now=start) == 0
+    assert bucket.take(now=start) == pytest.approx(0.1)
+    assert bucket.take(now=start + 0.11) == 0
+
+
+def test_bulk_leaves_reserve_for_interactive():
+    bucket = TokenBucket(rate=1, capacity=4)
+    now = time.monotonic()
+    assert bucket.take(reserve=2, now=now) == 0
+    assert bucket.take(reserve=2, now=now) == 0
+    assert bucket.take(reserve=2, now=now) > 0
+    assert bucket.take(now=now) == 0
+
+
+def test_client_is_rate_limited():
+    transport = LocalTransport(lambda endpoint, params: [api_samples.user()])
+    client = osutools.OsuClientV1("token", transport=transport, scheduler=RequestScheduler(600, burst=1))
+    start = time.monotonic()
+    for n in range(1, 6):
+        client.fetch_user(user_id=n)
+    # 10 requests a second with no burst, so the last four each wait ~0.1s
+    assert time.monotonic() - start >= 0.35
+    assert client.scheduler.stats[Priority.INTERACTIVE].granted == 5
+
+
+def test_interactive_jumps_bulk_queue():
+    scheduler = RequestScheduler(1200, burst=1, bulk_reserve=0)
+    order = []
+    lock = threading.Lock()
+
+    def request(priority, name):
+        scheduler.acquire(priority)
+        with lock:
+            order.append(name)
+
+    scheduler.acquire()  # empty the bucket so everything below queues up
+    bulk = [threading.Thread(target=request, args=(Priority.BULK, f"bulk{n}")) for n in range(5)]
+    for thread in bulk:
+        thread.start()
+    time.sleep(0.01)
+    interactive = threading.Thread(target=request, args=(Priority.INTERACTIVE, "interactive"))
+    interactive.start()
+    for thread in bulk + [interactive]:
+        thread.join()
+    assert order.index("interactive") <= 1
+    assert scheduler.stats[Priority.BULK].granted == 5
+    assert scheduler.stats[Priority.BULK].queue_depth == 0
+
+
+def test_owners_take_turns():
+    scheduler = RequestScheduler(1200, burst=1, bulk_reserve=0)
+    order = []
+    lock = threading.Lock()
+
+    def request(owner):
+        with lane(Priority.BULK, owner):
+            scheduler.acquire()
+        with lock:
+            order.append(owner)
+
+    scheduler.acquire()
+    threads = [threading.Thread(target=request, args=("crawler",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    other = threading.Thread(target=request, args=("leaderboard",))
+    other.start()
+    for thread in threads + [other]:
+        thread.join()
+    assert order.index("leaderboard") <= 1
+
+
+def test_acquire_timeout():
+    scheduler = RequestScheduler(60, burst=1)
+    scheduler.acquire()
+    with pytest.raises(RateLimitException):
+        scheduler.acquire(timeout=0.05)
+    assert scheduler.stats[Priority.INTERACTIVE].queue_depth == 0
+
+
+def test_async_waiters_sleep_until_their_turn():
+    scheduler = RequestScheduler(6000, burst=1, bulk_reserve=0)
+    polls = []
+    poll = scheduler._poll
+
+    def counting(ticket):
+        polls.append(ticket)
+        return poll(ticket)
+
+    scheduler._poll = counting
+    order = []
+
+    async def request(n, priority=Priority.BULK):
+        await scheduler.acquire_async(priority)
+        order.append(n)
+
+    async def main():
+        scheduler.acquire()
+        waiting = [asyncio.ensure_future(request(n)) for n in range(40)]
+        await asyncio.sleep(0.02)
+        waiting[5].cancel()
+        waiting.append(asyncio.ensure_future(request("interactive", Priority.INTERACTIVE)))
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+    assert len(order) == 40 and 5 not in order
+    assert order.index("interactive") <= 3
+    # each ticket polls when queued and a few times once it's at the head, rather than every few ms while queued
+    assert len(polls) < 41 * 5
+    assert scheduler.stats[Priority.BULK].queue_depth == 0
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+import osutools
+from osutools.textindex import INDEXED, TextIndex, normalize, tokenize
+
+from . import db_samples
+
+
+@pytest.fixture
+def client():
+    return osutools.OsuClientV1("token")
+
+
+def sample_maps():
+    return [
+        db_samples.beatmap(1, title="Uso no Hibana", artist="96neko", creator="Qiyana", tags="vocaloid"),
+        db_samples.beatmap(2, title="Harumachi Clover", artist="Hanatan", creator="Someone", tags="swing",
+                           title_unicode="ハルマチクローバー"),
+        db_samples.beatmap(3, title="Sofia", artist="Clairo", creator="Qiyana", tags="indie"),
+        db_samples.beatmap(4, title="Sofía Remix", artist="Clairo", creator="Someone", tags="indie remix"),
+    ]
+
+
+def test_normalize():
+    assert normalize("Sofía") == "sofia"
+    assert normalize("ＦＵＬＬ") == "full"
+    assert tokenize("Uso no Hibana (TV Size)") == ("uso", "no", "hibana", "tv", "size")
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_search(tmp_path, client, lazy):
+    db_samples.write_osu_db(tmp_path / "osu!.db", sample_maps())
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=lazy)
+    index = osu_db.text_index()
+    assert len(index) == 4
+
+    def found(query, **kwargs):
+        return [osu_db.maps[md5].beatmap_id for md5, _ in index.search(query, **kwargs)]
+
+    assert found("sofia") == [3, 4]
+    assert found("SOFÍA clairo") == [3, 4]
+    assert found("sofia remix") == [4]
+    assert found("clover") == [2]
+    assert found("ハルマチクローバー") == [2]
+    assert found("hiba") == [1]
+    assert found("hiba", prefix=False, fuzzy=False) == []
+    assert found("qiyana indie") == [3]
+    assert found("remi") == [4]
+    assert found("hanatn") == [2]
+    assert found("hanatn", fuzzy=False) == []
+    assert found("sofai") == [3, 4]
+    assert found("nothing") == []
+    assert found("") == []
+    assert found("qiyana", limit=1) == [1]
+    assert [local_map.beatmap_id for local_map in osu_db.find_maps("hibana")] == [1]
+
+
+def test_ranking():
+    index = TextIndex()
+    index.add("a", ["Camellia", "Ghost"])
+    index.add("b", ["Camellias Ghost"])
+    index.add("c", ["Camelia", "Ghost"])
+    results = index.search("camellia ghost")
+    assert [md5 for md5, _ in results] == ["a", "b", "c"]
+    assert results[0][1] == 2.0
+    assert results[0][1] > results[1][1] > results[2][1]
+
+
+def test_add_and_remove():
+    index = TextIndex()
+    index.add("a", ["Sofia"])
+    index.add("b", ["Sofia Remix"])
+    index.remove("a")
+    index.remove("missing")
+    assert [md5 for md5, _ in index.search("sofia")] == ["b"]
+    index.add("b", ["Something else"])
+    assert index.search("sofia") == []
+    assert index.search("remix") == []
+    index.add("c", ["Sofia"])
+    assert [md5 for md5, _ in index.search("sofia")] == ["c"]
+    assert len(index) == 2
+    usage = index.memory_usage()
+    assert usage["total"] == usage["postings"] + usage["trigrams"] + usage["documents"] > 0
+
+
+def test_reload_updates_index(tmp_path, client):
+    maps = sample_maps()
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db")
+    index = osu_db.text_index()
+    maps = maps[1:] + [db_samples.beatmap(5, title="Brand New", artist="Clairo")]
+    db_samples.write_osu_db(tmp_path / "osu!.db", maps)
+    os.utime(tmp_path / "osu!.db", ns=(1, 1))
+    osu_db.reload()
+    assert osu_db.text_index() is index
+    assert index.search("hibana") == []
+    assert [md5 for md5, _ in index.search("brand")] == [f"{5:032x}"]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_built_index_matches_added_one(tmp_path, client, lazy):
+    db_samples.write_osu_db(tmp_path / "osu!.db", sample_maps())
+    osu_db = osutools.OsuDB(client, tmp_path / "osu!.db", lazy=lazy)
+    built = TextIndex.from_osu_db(osu_db)
+    added = TextIndex()
+    for info in reversed(sample_maps()):
+        added.add(info["file_md5"], [info[field] for field in INDEXED])
+    assert built._vocabulary == sorted(built._vocabulary) == added._vocabulary
+    for query in ["s", "hi", "clairo", "remi", "hanatn"]:
+        assert sorted(built.search(query)) == sorted(added.search(query))
+    # words added after the build still go in order
+    built.add("new", ["Aaa zzz middle"])
+    assert built._vocabulary == sorted(built._vocabulary)
+    assert [md5 for md5, _ in built.search("mid")] == ["new"]
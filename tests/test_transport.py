@@ -0,0 +1,44 @@
+import pytest
+
+import osutools
+from osutools.exceptions import RequestException
+from osutools.transport import HTTPTransport, LocalTransport
+
+from . import api_samples
+
+
+def handler(endpoint, params):
+    if endpoint == "get_user":
+        return [api_samples.user(username=params["u"])]
+    return {"error": "Please provide a valid API key."}
+
+
+def test_local_transport_answers_requests():
+    transport = LocalTransport(handler)
+    client = osutools.OsuClientV1("token", transport=transport)
+    user = client.fetch_user(username="flubb 4")
+    assert user.username == "flubb 4"
+    assert transport.calls == 1
+
+
+def test_api_key_is_sent():
+    seen = []
+    transport = LocalTransport(lambda endpoint, params: seen.append(params) or [])
+    client = osutools.OsuClientV1("token", transport=transport)
+    client.fetch_user(user_id=2)
+    assert seen[0]["k"] == "token"
+
+
+def test_error_response_raises():
+    client = osutools.OsuClientV1("token", transport=LocalTransport(handler))
+    with pytest.raises(RequestException):
+        client.fetch_maps(map_id=1)
+
+
+def test_http_transport_pool_settings():
+    transport = HTTPTransport(pool_size=32, timeout=3.0, gzip=False)
+    adapter = transport.session.get_adapter("https://osu.ppy.sh/api/get_user")
+    assert adapter._pool_maxsize == 32
+    assert transport.session.headers["Accept-Encoding"] == "identity"
+    assert transport.session.headers["Connection"] == "keep-alive"
+    transport.close()
@@ -0,0 +1,26 @@
+import io
+import struct
+from datetime import datetime, timedelta, timezone
+
+from osutools.utils import format_timestamp, parse_timestamp, read_datetime
+
+
+def test_parse_timestamp_matches_strptime():
+    for timestamp in ("2020-05-04 12:34:56", "2007-10-06 00:00:00", "2021-12-31 23:59:59"):
+        assert parse_timestamp(timestamp) == datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    assert parse_timestamp(None) is None
+    assert parse_timestamp("") is None
+
+
+def test_format_timestamp_converts_to_utc():
+    assert format_timestamp(datetime(2020, 5, 4, 12, 0, 0)) == "2020-05-04 12:00:00"
+    plus_two = timezone(timedelta(hours=2))
+    assert format_timestamp(datetime(2020, 5, 4, 12, 0, 0, tzinfo=plus_two)) == "2020-05-04 10:00:00"
+
+
+def test_read_datetime_is_exact():
+    expected = datetime(2019, 3, 14, 15, 9, 26, 535897, tzinfo=timezone.utc)
+    delta = expected - datetime(1, 1, 1, tzinfo=timezone.utc)
+    ticks = (delta.days * 86400 + delta.seconds) * 10 ** 7 + delta.microseconds * 10 + 9
+    assert read_datetime(io.BytesIO(struct.pack("<Q", ticks))) == expected
+    assert read_datetime(io.BytesIO(bytes(8))) == datetime(1, 1, 1, tzinfo=timezone.utc)
@@ -0,0 +1,107 @@
+import asyncio
+
+import osutools
+from osutools.transport import LocalTransport, ThreadedTransport
+from osutools.utils import Mode
+from osutools.watcher import RecentScoreWatcher
+
+from . import api_samples
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecentHandler:
+    def __init__(self):
+        self.scores = {}
+        self.polled = []
+
+    def play(self, user_id, beatmap_id, date):
+        self.scores.setdefault(user_id, []).insert(0, api_samples.recent_score(beatmap_id=beatmap_id, date=date))
+
+    def __call__(self, endpoint, params):
+        self.polled.append(int(params["u"]))
+        return self.scores.get(int(params["u"]), [])
+
+
+def make_watcher(handler, clock, **kwargs):
+    client = osutools.OsuClientV1("token", transport=LocalTransport(handler))
+    return RecentScoreWatcher(client, clock=clock, **kwargs)
+
+
+def test_only_new_scores_are_yielded():
+    handler = RecentHandler()
+    handler.play(1, 100, "2021-01-01 10:00:00")
+    clock = Clock()
+    watcher = make_watcher(handler, clock, targets=[1], min_interval=10, requests_per_minute=6000)
+    assert watcher.poll_due() == []
+    handler.play(1, 101, "2021-01-01 10:05:00")
+    handler.play(1, 102, "2021-01-01 10:06:00")
+    clock.now = 20
+    assert [score.map_id for score in watcher.poll_due()] == ["101", "102"]
+    clock.now = 30
+    assert watcher.poll_due() == []
+    assert watcher.targets[(1, Mode.STANDARD)].last_error is None
+
+
+def test_idle_players_back_off_and_active_ones_reset():
+    handler = RecentHandler()
+    clock = Clock()
+    watcher = make_watcher(handler, clock, targets=[(1, Mode.TAIKO)], min_interval=10, max_interval=35,
+                           requests_per_minute=6000)
+    watcher.poll_due()
+    target = watcher.targets[(1, Mode.TAIKO)]
+    assert target.interval == 20
+    clock.now = 20
+    watcher.poll_due()
+    clock.now = 60
+    watcher.poll_due()
+    assert target.interval == 35
+    handler.play(1, 100, "2021-01-01 10:00:00")
+    clock.now = 95
+    assert len(watcher.poll_due()) == 1
+    assert target.interval == 10
+
+
+def test_total_request_rate_is_bounded():
+    handler = RecentHandler()
+    clock = Clock()
+    watcher = make_watcher(handler, clock, targets=range(1, 101), requests_per_minute=60)
+    watcher.poll_due()
+    assert len(handler.polled) == 1
+    assert watcher.wait_time() == 1
+    clock.now = 5
+    watcher.poll_due()
+    assert len(handler.polled) == 2
+
+
+def test_removed_players_are_not_polled():
+    handler = RecentHandler()
+    clock = Clock()
+    watcher = make_watcher(handler, clock, targets=[1, 2], requests_per_minute=6000)
+    watcher.remove(1)
+    watcher.poll_due()
+    assert handler.polled == [2]
+    assert len(watcher) == 1
+
+
+def test_async_iteration():
+    handler = RecentHandler()
+    handler.play(1, 100, "2021-01-01 10:00:00")
+    client = osutools.AsyncOsuClientV1("token", transport=ThreadedTransport(LocalTransport(handler)))
+    watcher = RecentScoreWatcher(client, targets=[1], emit_existing=True, requests_per_minute=6000)
+
+    async def first():
+        async for score in watcher:
+            return score
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(first()).map_id == "100"
+    finally:
+        loop.close()